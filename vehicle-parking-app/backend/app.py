@@ -66,6 +66,7 @@ try:
     import tasks.daily_reminders
     import tasks.monthly_reports
     import tasks.export_csv
+    import tasks.maintenance
     
     app.celery = celery  # Make Celery available to the Flask app
     print("✅ Celery initialized with Flask app!")
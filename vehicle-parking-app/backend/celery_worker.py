@@ -19,6 +19,7 @@ from tasks.celery_app import celery
 import tasks.daily_reminders
 import tasks.monthly_reports
 import tasks.export_csv
+import tasks.maintenance
 
 # Update the ContextTask to use Flask app context
 class ContextTask(celery.Task):
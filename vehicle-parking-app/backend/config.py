@@ -44,6 +44,11 @@ class Config:
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER') or 'noreply@parkingapp.local'
+    MAIL_POOL_SIZE = int(os.environ.get('MAIL_POOL_SIZE', 4))  # Persistent SMTP sessions per process
+    MAIL_BATCH_SIZE = int(os.environ.get('MAIL_BATCH_SIZE', 50))  # Messages sent per session checkout
+    
+    # Compiled report templates (None = a per-user directory under the system temp dir)
+    TEMPLATE_BYTECODE_CACHE_DIR = os.environ.get('TEMPLATE_BYTECODE_CACHE_DIR')
     
     # Google Chat Webhook (for notifications)
     GOOGLE_CHAT_WEBHOOK_URL = os.environ.get('GOOGLE_CHAT_WEBHOOK_URL')
@@ -0,0 +1,126 @@
+"""
+Shared fixtures for the self-contained backend tests.
+
+The other test_*.py scripts in this folder talk to a running dev server. The
+fixtures here instead build a throwaway Flask app on a temporary SQLite file,
+so those suites never touch instance/parking2.db and need no server, Redis or
+Celery worker.
+"""
+
+import os
+import sys
+
+import pytest
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+from sqlalchemy import event
+
+backend_dir = os.path.dirname(os.path.abspath(__file__))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from database import db
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Flask app with all blueprints registered on a fresh SQLite database"""
+    from routes import register_routes
+    import models  # noqa: F401 - registers models and flush hooks
+
+    app = Flask(__name__)
+    app.config.update(
+        TESTING=True,
+        SECRET_KEY='test-secret-key-for-the-backend-suite',
+        JWT_SECRET_KEY='test-secret-key-for-the-backend-suite',
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'test.db'}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+    )
+    db.init_app(app)
+    JWTManager(app)
+    register_routes(app)
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    """Create and commit a user; returns the User"""
+    from models.user import User
+
+    def _make_user(username='driver', role='user', **fields):
+        user = User(username=username, email=f'{username}@example.com', role=role, **fields)
+        user.set_password('password123')
+        db.session.add(user)
+        db.session.commit()
+        return user
+
+    return _make_user
+
+
+@pytest.fixture
+def make_lot(app):
+    """Create and commit a parking lot with ``spots`` available spots"""
+    from models.parking_lot import ParkingLot
+    from models.parking_spot import ParkingSpot
+
+    def _make_lot(name='Test Lot', spots=5, price=10.0):
+        lot = ParkingLot(
+            prime_location_name=name,
+            price=price,
+            address='1 Test Road',
+            pin_code='600001',
+            number_of_spots=spots,
+        )
+        db.session.add(lot)
+        db.session.flush()
+        for i in range(1, spots + 1):
+            db.session.add(ParkingSpot(lot_id=lot.id, spot_number=f'P{i:03d}', status='A'))
+        db.session.commit()
+        return lot
+
+    return _make_lot
+
+
+@pytest.fixture
+def auth_headers(app):
+    """Bearer headers for a user, matching routes/auth.py token claims"""
+    def _auth_headers(user):
+        token = create_access_token(identity=str(user.id), additional_claims={'role': user.role})
+        return {'Authorization': f'Bearer {token}'}
+
+    return _auth_headers
+
+
+
+@pytest.fixture
+def count_queries(app):
+    """Record the SQL statements issued while the returned list is live.
+
+    Usage: ``with count_queries() as statements: ...`` then ``len(statements)``.
+    """
+    from contextlib import contextmanager
+
+    @contextmanager
+    def _count_queries():
+        statements = []
+
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', _record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', _record)
+
+    return _count_queries
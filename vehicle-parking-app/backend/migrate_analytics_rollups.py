@@ -0,0 +1,58 @@
+"""
+Database migration script to add the analytics rollup tables
+lot_hourly_rollups and lot_daily_rollups are maintained from reservation
+changes (models/analytics.py) and read by /api/admin/analytics; after creating
+them the script backfills both from the existing reservations. Re-running it
+rebuilds the rollups, e.g. after reservations were changed with raw SQL.
+"""
+
+import os
+import sqlite3
+
+ROLLUP_TABLES = ('lot_hourly_rollups', 'lot_daily_rollups')
+
+def migrate_analytics_rollup_tables():
+    conn = sqlite3.connect('instance/parking2.db')
+    cursor = conn.cursor()
+
+    try:
+        for table in ROLLUP_TABLES:
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    id INTEGER NOT NULL PRIMARY KEY,
+                    lot_id INTEGER NOT NULL REFERENCES parking_lots (id) ON DELETE CASCADE,
+                    bucket_start DATETIME NOT NULL,
+                    reservations INTEGER NOT NULL DEFAULT 0,
+                    completed_reservations INTEGER NOT NULL DEFAULT 0,
+                    revenue NUMERIC(12, 2) NOT NULL DEFAULT 0,
+                    occupancy_minutes FLOAT NOT NULL DEFAULT 0,
+                    CONSTRAINT uq_{table}_bucket UNIQUE (lot_id, bucket_start)
+                )
+            """)
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_bucket ON {table} (bucket_start)")
+            print(f"Created {table} table")
+
+        conn.commit()
+
+    except Exception as e:
+        print(f"Migration failed: {e}")
+        conn.rollback()
+        return False
+    finally:
+        conn.close()
+
+    return True
+
+def backfill_analytics_rollups():
+    from app import app
+    from models.analytics import rebuild_analytics_rollups
+
+    with app.app_context():
+        count = rebuild_analytics_rollups()
+    print(f"Backfilled rollups from {count} reservations")
+
+if __name__ == "__main__":
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    if migrate_analytics_rollup_tables():
+        backfill_analytics_rollups()
+        print("Migration completed successfully!")
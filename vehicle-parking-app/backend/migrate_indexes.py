@@ -0,0 +1,41 @@
+"""
+Database migration script to add the query indexes to existing databases
+This script adds the composite indexes declared on Reservation and ParkingSpot
+(see __table_args__ in models/reservation.py and models/parking_spot.py)
+"""
+
+import sqlite3
+
+INDEXES = {
+    'ix_reservations_user_created_at': 'reservations (user_id, created_at)',
+    'ix_reservations_user_status': 'reservations (user_id, status)',
+    'ix_reservations_spot_status': 'reservations (spot_id, status)',
+    'ix_reservations_spot_leaving': 'reservations (spot_id, leaving_timestamp)',
+    'ix_reservations_created_at': 'reservations (created_at)',
+    'ix_reservations_open_parked': "reservations (parking_timestamp) WHERE status = 'active' AND leaving_timestamp IS NULL",
+    'ix_parking_spots_lot_status_active': 'parking_spots (lot_id, status, is_active)',
+}
+
+def migrate_indexes():
+    conn = sqlite3.connect('instance/parking2.db')
+    cursor = conn.cursor()
+
+    try:
+        for name, definition in INDEXES.items():
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {definition}")
+            print(f"Ensured index {name}")
+
+        # Refresh planner statistics so the new indexes are picked up
+        cursor.execute("ANALYZE")
+
+        conn.commit()
+        print("Migration completed successfully!")
+
+    except Exception as e:
+        print(f"Migration failed: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    migrate_indexes()
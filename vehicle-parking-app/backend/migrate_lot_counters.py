@@ -0,0 +1,50 @@
+"""
+Database migration script to add occupancy counters to parking_lots table
+This script adds: available_count, reserved_count, occupied_count fields
+and backfills them from the current parking_spots statuses
+"""
+
+import sqlite3
+
+COUNTER_COLUMNS = {
+    'available_count': 'A',
+    'reserved_count': 'R',
+    'occupied_count': 'O',
+}
+
+def migrate_parking_lots_table():
+    conn = sqlite3.connect('instance/parking2.db')
+    cursor = conn.cursor()
+
+    try:
+        # Check if the new columns already exist
+        cursor.execute("PRAGMA table_info(parking_lots)")
+        columns = [column[1] for column in cursor.fetchall()]
+
+        for column in COUNTER_COLUMNS:
+            if column not in columns:
+                cursor.execute(f"ALTER TABLE parking_lots ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0")
+                print(f"Added {column} column")
+
+        # Backfill (or re-sync) counters from the spots table
+        for column, status in COUNTER_COLUMNS.items():
+            cursor.execute(f"""
+                UPDATE parking_lots SET {column} = (
+                    SELECT COUNT(*) FROM parking_spots
+                    WHERE parking_spots.lot_id = parking_lots.id
+                    AND parking_spots.status = ?
+                )
+            """, (status,))
+        print("Backfilled occupancy counters from parking_spots")
+
+        conn.commit()
+        print("Migration completed successfully!")
+
+    except Exception as e:
+        print(f"Migration failed: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    migrate_parking_lots_table()
@@ -0,0 +1,39 @@
+"""
+Database migration script to add the monthly_reports table
+Stored reports of closed months are served by /api/user/monthly-report and
+/api/admin/preview-monthly-report; the table starts empty and is filled by the
+monthly report job and on first request
+"""
+
+import sqlite3
+
+def migrate_monthly_reports_table():
+    conn = sqlite3.connect('instance/parking2.db')
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS monthly_reports (
+                id INTEGER NOT NULL PRIMARY KEY,
+                user_id INTEGER NOT NULL REFERENCES users (id),
+                year INTEGER NOT NULL,
+                month INTEGER NOT NULL,
+                report_data TEXT NOT NULL,
+                html TEXT NOT NULL,
+                generated_at DATETIME NOT NULL,
+                CONSTRAINT uq_monthly_reports_user_month UNIQUE (user_id, year, month)
+            )
+        """)
+        print("Created monthly_reports table")
+
+        conn.commit()
+        print("Migration completed successfully!")
+
+    except Exception as e:
+        print(f"Migration failed: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    migrate_monthly_reports_table()
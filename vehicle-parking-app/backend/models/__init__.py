@@ -4,5 +4,8 @@ from .user import User
 from .parking_lot import ParkingLot
 from .parking_spot import ParkingSpot
 from .reservation import Reservation
+from .monthly_report import MonthlyReport  # also registers the stale report hook
+from . import occupancy  # registers the lot counter flush hooks
+from . import analytics  # registers the analytics rollup flush hooks
 
-__all__ = ['db', 'User', 'ParkingLot', 'ParkingSpot', 'Reservation']
\ No newline at end of file
+__all__ = ['db', 'User', 'ParkingLot', 'ParkingSpot', 'Reservation', 'MonthlyReport']
\ No newline at end of file
@@ -0,0 +1,97 @@
+"""
+Race-safe parking spot allocation.
+
+Reservations used to pick "the first available spot" with a SELECT and then
+flip its status through the ORM. Two concurrent requests could read the same
+row and both book it. ``claim_spot`` instead claims a spot with a conditional
+UPDATE (compare-and-set on ``status = 'A'``): the UPDATE only succeeds for the
+request that still sees the spot available, and the loser simply retries with
+another candidate. No table lock is held and no spot can be booked twice.
+As before, a spot that an open ('reserved' or 'active') reservation still
+points at is never handed out, even if its status says 'A'.
+
+The claim is a Core statement, so the lot counters are adjusted explicitly
+(see models/occupancy.py) inside the same transaction.
+"""
+
+import random
+from datetime import datetime
+from sqlalchemy import exists, select, update
+
+from database import db
+from .occupancy import adjust_lot_counters
+from .parking_lot import ParkingLot
+from .parking_spot import ParkingSpot
+from .reservation import Reservation
+
+# Candidates fetched per round; a small window spreads concurrent claimers
+# over different rows instead of having them all race for the first one
+CANDIDATE_WINDOW = 8
+
+# Reservation statuses that hold on to their spot
+OPEN_RESERVATION_STATUSES = ('reserved', 'active')
+
+
+def _claimable(spots):
+    """WHERE clause of a spot that is free and no open reservation points at"""
+    reservations = Reservation.__table__
+    return (
+        (spots.c.status == 'A')
+        & (spots.c.is_active == True)
+        & ~exists().where(
+            reservations.c.spot_id == spots.c.id,
+            reservations.c.status.in_(OPEN_RESERVATION_STATUSES)
+        )
+    )
+
+
+def _candidate_spot_ids(session, lot_id, lost=()):
+    """Up to CANDIDATE_WINDOW available spots, skipping ones already lost to others"""
+    spots = ParkingSpot.__table__
+    query = select(spots.c.id).where(spots.c.lot_id == lot_id, _claimable(spots))
+    if lost:
+        query = query.where(spots.c.id.notin_(lost))
+    return session.execute(query.limit(CANDIDATE_WINDOW)).scalars().all()
+
+
+def _compare_and_set(session, spot_id, to_status):
+    """Flip one spot from 'A' to ``to_status``; True if this caller won it"""
+    spots = ParkingSpot.__table__
+    result = session.execute(
+        update(spots).where(spots.c.id == spot_id, _claimable(spots)).values(status=to_status, updated_at=datetime.utcnow())
+    )
+    return result.rowcount == 1
+
+
+def claim_spot(lot_id, to_status='R', session=None):
+    """Atomically claim an available spot in ``lot_id``.
+
+    Returns the claimed ParkingSpot (already in ``to_status``) or None when the
+    lot has no available spot. The claim is part of the session's current
+    transaction: commit it together with the reservation, or roll back to
+    release the spot.
+    """
+    session = session or db.session
+
+    # Counters are maintained transactionally, so a full lot is rejected
+    # without touching parking_spots at all
+    available = session.execute(
+        select(ParkingLot.__table__.c.available_count).where(ParkingLot.__table__.c.id == lot_id)
+    ).scalar()
+    if not available:
+        return None
+
+    # Keep going while free spots remain: every lost race excludes that spot,
+    # so the windows move on and the loop ends once the lot is really full
+    lost = set()
+    while True:
+        candidates = _candidate_spot_ids(session, lot_id, lost)
+        if not candidates:
+            return None
+
+        random.shuffle(candidates)
+        for spot_id in candidates:
+            if _compare_and_set(session, spot_id, to_status):
+                adjust_lot_counters(lot_id, 'A', to_status, session=session)
+                return session.get(ParkingSpot, spot_id, populate_existing=True)
+            lost.add(spot_id)
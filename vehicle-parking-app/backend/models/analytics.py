@@ -0,0 +1,323 @@
+"""
+Pre-aggregated per-lot usage rollups behind /api/admin/analytics.
+
+Two tables hold the same measures at hourly and daily grain, keyed by lot and
+UTC bucket start:
+
+  reservations            reservations created in the bucket
+  completed_reservations  reservations that ended (were completed) in the bucket
+  revenue                 parking_cost of those completed reservations
+  occupancy_minutes       minutes of completed stays falling inside the bucket
+
+Every ORM insert, update or delete of a Reservation is turned into the
+difference between its new and old contribution and applied as relative
+upserts (``measure = measure + delta``) inside the same flush, so the rollups
+commit or roll back together with the reservation. Charts for any date range
+are then sums over at most (days x lots) or (hours x lots) rows, never a scan
+of reservations.
+
+Code that changes reservations with Core statements bypasses the hook;
+``rebuild_analytics_rollups`` recomputes both tables from reservations, with
+the occupancy minutes of all stays computed in vectorized passes over
+month-sized windows (utils/histogram.py).
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import delete, event, insert, select, update
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import Session, declared_attr
+
+from database import db
+from .parking_spot import ParkingSpot
+from .reservation import Reservation
+
+MEASURES = ('reservations', 'completed_reservations', 'revenue', 'occupancy_minutes')
+
+# Reservation attributes a rollup contribution depends on
+CONTRIBUTION_FIELDS = ('spot_id', 'created_at', 'parking_timestamp', 'leaving_timestamp', 'status', 'parking_cost')
+
+# Reservations read per batch by rebuild_analytics_rollups
+REBUILD_BATCH_SIZE = 5000
+
+# Hours per occupancy grid built by bulk_hourly_occupancy
+OCCUPANCY_WINDOW_HOURS = 31 * 24
+
+
+class _LotRollup:
+    id = db.Column(db.Integer, primary_key=True)
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    reservations = db.Column(db.Integer, default=0, nullable=False)
+    completed_reservations = db.Column(db.Integer, default=0, nullable=False)
+    revenue = db.Column(db.Numeric(12, 2), default=0, nullable=False)
+    occupancy_minutes = db.Column(db.Float, default=0, nullable=False)
+
+    @declared_attr
+    def lot_id(cls):
+        return db.Column(db.Integer, db.ForeignKey('parking_lots.id', ondelete='CASCADE'), nullable=False)
+
+
+class LotHourlyRollup(_LotRollup, db.Model):
+    __tablename__ = 'lot_hourly_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('lot_id', 'bucket_start', name='uq_lot_hourly_rollups_bucket'),
+        db.Index('ix_lot_hourly_rollups_bucket', 'bucket_start'),
+    )
+
+
+class LotDailyRollup(_LotRollup, db.Model):
+    __tablename__ = 'lot_daily_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('lot_id', 'bucket_start', name='uq_lot_daily_rollups_bucket'),
+        db.Index('ix_lot_daily_rollups_bucket', 'bucket_start'),
+    )
+
+
+def hour_start(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def day_start(moment):
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _empty_measures():
+    return {'reservations': 0, 'completed_reservations': 0, 'revenue': Decimal('0'), 'occupancy_minutes': 0.0}
+
+
+def hourly_occupancy(parking_timestamp, leaving_timestamp):
+    """Yield (hour bucket, minutes) of a stay split at hour boundaries"""
+    current = parking_timestamp
+    while current < leaving_timestamp:
+        bucket = hour_start(current)
+        boundary = min(bucket + timedelta(hours=1), leaving_timestamp)
+        yield bucket, (boundary - current).total_seconds() / 60
+        current = boundary
+
+
+def add_contribution(hourly, lot_id, values, sign=1, occupancy=True):
+    """Add (``sign=-1``: subtract) one reservation's measures to ``hourly``
+
+    ``hourly`` maps (lot_id, hour bucket) to measures; ``values`` holds the
+    CONTRIBUTION_FIELDS of the reservation. ``occupancy=False`` leaves out the
+    occupancy minutes, for callers that compute them in bulk.
+    """
+    created_at = values['created_at']
+    if lot_id is None or created_at is None:
+        return
+    hourly[(lot_id, hour_start(created_at))]['reservations'] += sign
+
+    if values['status'] != 'completed':
+        return
+    parked, left = values['parking_timestamp'], values['leaving_timestamp']
+    ended = hourly[(lot_id, hour_start(left or created_at))]
+    ended['completed_reservations'] += sign
+    ended['revenue'] += sign * Decimal(str(values['parking_cost'] or 0))
+    if occupancy and parked and left:
+        for bucket, minutes in hourly_occupancy(parked, left):
+            hourly[(lot_id, bucket)]['occupancy_minutes'] += sign * minutes
+
+
+def daily_from_hourly(hourly):
+    """Fold (lot_id, hour) measures into (lot_id, day) measures"""
+    daily = defaultdict(_empty_measures)
+    for (lot_id, bucket), measures in hourly.items():
+        day = daily[(lot_id, day_start(bucket))]
+        for measure in MEASURES:
+            day[measure] += measures[measure]
+    return daily
+
+
+def _upsert_statement(connection, table):
+    """INSERT ... ON CONFLICT (lot_id, bucket_start) DO UPDATE measure = measure + excluded.measure"""
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        return None
+    statement = dialect_insert(table)
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.lot_id, table.c.bucket_start],
+        set_={measure: table.c[measure] + statement.excluded[measure] for measure in MEASURES}
+    )
+
+
+def apply_rollup_deltas(connection, hourly):
+    """Apply {(lot_id, hour): measures} deltas to the hourly and daily tables"""
+    for model, deltas in ((LotHourlyRollup, hourly), (LotDailyRollup, daily_from_hourly(hourly))):
+        table = model.__table__
+        rows = [
+            dict(measures, lot_id=lot_id, bucket_start=bucket)
+            for (lot_id, bucket), measures in deltas.items()
+            if any(measures[measure] for measure in MEASURES)
+        ]
+        if not rows:
+            continue
+        upsert = _upsert_statement(connection, table)
+        if upsert is not None:
+            connection.execute(upsert, rows)
+            continue
+        for row in rows:
+            key = (table.c.lot_id == row['lot_id']) & (table.c.bucket_start == row['bucket_start'])
+            result = connection.execute(update(table).where(key).values(
+                **{measure: table.c[measure] + row[measure] for measure in MEASURES}
+            ))
+            if result.rowcount == 0:
+                connection.execute(insert(table).values(**row))
+
+
+# Old values are needed to subtract a reservation's previous contribution,
+# so make the ORM load them when these attributes are overwritten
+for _field in CONTRIBUTION_FIELDS:
+    event.listen(getattr(Reservation, _field), 'set', lambda *args: None, active_history=True)
+
+
+def _current_values(state):
+    return {field: state.dict.get(field) for field in CONTRIBUTION_FIELDS}
+
+
+def _previous_values(state):
+    values = {}
+    for field in CONTRIBUTION_FIELDS:
+        history = state.attrs[field].history
+        values[field] = history.deleted[0] if history.deleted else state.dict.get(field)
+    return values
+
+
+def _changed(state):
+    return any(state.attrs[field].history.has_changes() for field in CONTRIBUTION_FIELDS)
+
+
+@event.listens_for(Session, 'before_flush')
+def _load_deleted_reservations(session, flush_context, instances):
+    """Deleted rows can't be read after the flush; load what the hook needs now"""
+    for obj in session.deleted:
+        if isinstance(obj, Reservation):
+            for field in CONTRIBUTION_FIELDS:
+                getattr(obj, field)
+
+
+@event.listens_for(Session, 'after_flush')
+def _maintain_rollups(session, flush_context):
+    """Fold this flush's reservation changes into the analytics rollups"""
+    changes = []  # (values, sign)
+    for obj in session.new:
+        if isinstance(obj, Reservation):
+            changes.append((_current_values(sa_inspect(obj)), 1))
+    for obj in session.deleted:
+        if isinstance(obj, Reservation):
+            changes.append((_current_values(sa_inspect(obj)), -1))
+    for obj in session.dirty:
+        if isinstance(obj, Reservation):
+            state = sa_inspect(obj)
+            if _changed(state):
+                changes.append((_previous_values(state), -1))
+                changes.append((_current_values(state), 1))
+    if not changes:
+        return
+
+    connection = session.connection()
+    spot_ids = {values['spot_id'] for values, _ in changes if values['spot_id'] is not None}
+    spot_lots = dict(connection.execute(
+        select(ParkingSpot.__table__.c.id, ParkingSpot.__table__.c.lot_id).where(
+            ParkingSpot.__table__.c.id.in_(spot_ids)
+        )
+    ).all()) if spot_ids else {}
+
+    hourly = defaultdict(_empty_measures)
+    for values, sign in changes:
+        add_contribution(hourly, spot_lots.get(values['spot_id']), values, sign)
+    apply_rollup_deltas(connection, hourly)
+
+
+def bulk_hourly_occupancy(hourly, lot_ids, parking_timestamps, leaving_timestamps):
+    """Add the occupancy minutes of many stays to ``hourly`` with NumPy
+
+    The hours from the first stay to the last are cut into windows of
+    OCCUPANCY_WINDOW_HOURS, and only the windows some stay touches get a
+    (lots x hours) grid, one at a time: stays years apart, or one bogus
+    timestamp, no longer size a single grid. A stay crossing a window edge
+    is counted in each window it touches, clipped to it.
+    """
+    if not lot_ids:
+        return
+    import numpy as np
+    from utils.histogram import MINUTES_PER_HOUR, hourly_occupancy_histogram, to_epoch_minutes
+
+    lots, groups = np.unique(np.asarray(lot_ids), return_inverse=True)
+    starts = to_epoch_minutes(parking_timestamps)
+    ends = to_epoch_minutes(leaving_timestamps)
+    origin = np.floor(starts.min() / MINUTES_PER_HOUR) * MINUTES_PER_HOUR
+    window = OCCUPANCY_WINDOW_HOURS * MINUTES_PER_HOUR
+
+    # (stay, window) pairs: first to last window of each stay
+    first = ((starts - origin) // window).astype(np.int64)
+    last = np.maximum(np.ceil((ends - origin) / window).astype(np.int64) - 1, first)
+    spans = last - first + 1
+    stays = np.repeat(np.arange(len(starts)), spans)
+    windows = np.repeat(first, spans) + np.arange(len(stays)) - np.repeat(np.cumsum(spans) - spans, spans)
+
+    order = np.argsort(windows, kind='stable')
+    stays, windows = stays[order], windows[order]
+    window_ids, bounds = np.unique(windows, return_index=True)
+    for window_id, members in zip(window_ids, np.split(stays, bounds[1:])):
+        window_origin = origin + int(window_id) * window
+        minutes = hourly_occupancy_histogram(groups[members], starts[members], ends[members],
+                                             len(lots), window_origin, OCCUPANCY_WINDOW_HOURS)
+        first_hour = datetime(1970, 1, 1) + timedelta(minutes=float(window_origin))
+        for group, hour in zip(*np.nonzero(minutes)):
+            bucket = first_hour + timedelta(hours=int(hour))
+            hourly[(int(lots[group]), bucket)]['occupancy_minutes'] += float(minutes[group, hour])
+
+
+def rebuild_analytics_rollups():
+    """Recompute both rollup tables from reservations (backfill / repair).
+
+    Returns the number of reservations read.
+    """
+    reservations = Reservation.__table__
+    spots = ParkingSpot.__table__
+    query = select(
+        spots.c.lot_id,
+        *(reservations.c[field] for field in CONTRIBUTION_FIELDS)
+    ).join(spots, reservations.c.spot_id == spots.c.id)
+
+    hourly = defaultdict(_empty_measures)
+    stays = ([], [], [])  # lot ids, parking and leaving timestamps of completed stays
+    count = 0
+    result = db.session.execute(query.execution_options(yield_per=REBUILD_BATCH_SIZE))
+    for row in result:
+        values = row._mapping
+        add_contribution(hourly, values['lot_id'], values, occupancy=False)
+        if values['status'] == 'completed' and values['parking_timestamp'] and values['leaving_timestamp']:
+            for column, value in zip(stays, (values['lot_id'], values['parking_timestamp'], values['leaving_timestamp'])):
+                column.append(value)
+        count += 1
+    bulk_hourly_occupancy(hourly, *stays)
+
+    connection = db.session.connection()
+    connection.execute(delete(LotHourlyRollup.__table__))
+    connection.execute(delete(LotDailyRollup.__table__))
+    apply_rollup_deltas(connection, hourly)
+    db.session.commit()
+    return count
+
+
+def rollup_rows(model, start, end, *group_by):
+    """Summed measures of ``model`` rows with start <= bucket_start < end, grouped by ``group_by`` columns"""
+    from sqlalchemy import func
+
+    columns = [getattr(model, name) for name in group_by]
+    return db.session.execute(
+        select(
+            *columns,
+            *(func.coalesce(func.sum(getattr(model, measure)), 0).label(measure) for measure in MEASURES)
+        ).where(
+            model.bucket_start >= start,
+            model.bucket_start < end
+        ).group_by(*columns).order_by(*columns)
+    ).all()
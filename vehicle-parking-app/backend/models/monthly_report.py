@@ -0,0 +1,88 @@
+"""
+Persisted monthly reports for closed months.
+
+A report only covers reservations created in its month, so once the month is
+over it is served from this table instead of being rebuilt on every request.
+The monthly job stores the reports it sends; the report endpoints store the
+rest the first time they are asked for.
+
+A reservation of a closed month can still change afterwards (a stay that was
+active at the turn of the month completes later, or an admin edits it). Any
+ORM flush that inserts, updates or deletes such a reservation deletes the
+stored report of its user and month in the same transaction, so the next
+request rebuilds it.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import delete, event, tuple_
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import Session
+
+from database import db
+from .reservation import Reservation
+
+
+class MonthlyReport(db.Model):
+    __tablename__ = 'monthly_reports'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'year', 'month', name='uq_monthly_reports_user_month'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)
+    report_data = db.Column(db.Text, nullable=False)  # JSON, as returned by /api/user/monthly-report
+    html = db.Column(db.Text, nullable=False)
+    generated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<MonthlyReport(user_id={self.user_id}, {self.month}/{self.year})>"
+
+
+def month_start(now=None):
+    """First instant of the current (UTC) month; earlier months are closed"""
+    now = now or datetime.utcnow()
+    return datetime(now.year, now.month, 1)
+
+
+def _closed_report_keys(session):
+    """(user_id, year, month) of closed-month reports touched by this flush"""
+    current = month_start()
+    keys = set()
+
+    def add(user_id, created_at):
+        if user_id is not None and created_at is not None and created_at < current:
+            keys.add((user_id, created_at.year, created_at.month))
+
+    for obj in list(session.new) + list(session.deleted) + list(session.dirty):
+        if not isinstance(obj, Reservation):
+            continue
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        # Loaded values only: never lazy-load inside a flush
+        state = sa_inspect(obj)
+        user_id, created_at = state.dict.get('user_id'), state.dict.get('created_at')
+        add(user_id, created_at)
+        # A reservation moved between users or months invalidates both reports
+        user_history = state.attrs.user_id.history
+        created_history = state.attrs.created_at.history
+        if user_history.deleted or created_history.deleted:
+            add(user_history.deleted[0] if user_history.deleted else user_id,
+                created_history.deleted[0] if created_history.deleted else created_at)
+    return keys
+
+
+@event.listens_for(Session, 'after_flush')
+def _delete_stale_reports(session, flush_context):
+    """Drop stored reports whose reservations changed in this flush"""
+    keys = _closed_report_keys(session)
+    if not keys:
+        return
+    table = MonthlyReport.__table__
+    session.connection().execute(
+        delete(table).where(
+            tuple_(table.c.user_id, table.c.year, table.c.month).in_(list(keys))
+        )
+    )
@@ -0,0 +1,191 @@
+"""
+Denormalized per-lot occupancy counters.
+
+ParkingLot carries available/reserved/occupied counters so listing lots does
+not need a COUNT(*) per lot. Every ORM change to ParkingSpot.status (or to a
+spot's lot_id, or inserting/deleting spots) is turned into an atomic
+``counter = counter + delta`` UPDATE inside the same flush, so the counters
+commit or roll back together with the spot rows.
+
+Code that changes spot status with Core statements (bulk inserts, conditional
+UPDATEs) bypasses the ORM and must call ``adjust_lot_counters`` itself.
+``reconcile_lot_counters`` recomputes the counters from parking_spots and
+repairs any drift.
+"""
+
+from collections import defaultdict
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy import inspect as sa_inspect
+
+from database import db
+from .parking_lot import ParkingLot
+from .parking_spot import ParkingSpot
+
+# Spot status -> ParkingLot counter column
+STATUS_COUNTER_COLUMNS = {
+    'A': 'available_count',
+    'R': 'reserved_count',
+    'O': 'occupied_count',
+}
+
+_TOUCHED_LOTS_KEY = '_occupancy_touched_lots'
+
+
+def _add_delta(deltas, lot_id, status, amount):
+    column = STATUS_COUNTER_COLUMNS.get(status)
+    if lot_id is None or column is None:
+        return
+    deltas[lot_id][column] += amount
+
+
+def apply_counter_deltas(connection, deltas):
+    """Apply {lot_id: {counter_column: delta}} as relative UPDATEs"""
+    table = ParkingLot.__table__
+    touched = []
+    for lot_id, columns in deltas.items():
+        values = {
+            column: table.c[column] + delta
+            for column, delta in columns.items() if delta
+        }
+        if not values:
+            continue
+        # Keep updated_at: counter maintenance is not an edit of the lot
+        values['updated_at'] = table.c.updated_at
+        connection.execute(update(table).where(table.c.id == lot_id).values(**values))
+        touched.append(lot_id)
+    return touched
+
+
+def adjust_lot_counters(lot_id, from_status=None, to_status=None, count=1, session=None):
+    """Move ``count`` spots of a lot between status counters.
+
+    For status changes made outside the ORM unit of work (Core UPDATE/INSERT/
+    DELETE). Pass ``from_status=None`` for newly created spots and
+    ``to_status=None`` for removed spots. Runs on the session's connection so
+    it shares the caller's transaction.
+    """
+    session = session or db.session
+    deltas = defaultdict(lambda: defaultdict(int))
+    _add_delta(deltas, lot_id, from_status, -count)
+    _add_delta(deltas, lot_id, to_status, count)
+    touched = apply_counter_deltas(session.connection(), deltas)
+    _expire_lot_counters(session, touched)
+
+
+def _expire_lot_counters(session, lot_ids):
+    """Expire cached counter attributes so the next access re-reads them"""
+    for lot_id in lot_ids:
+        lot = session.identity_map.get(identity_key(ParkingLot, lot_id))
+        if lot is not None:
+            session.expire(lot, list(STATUS_COUNTER_COLUMNS.values()))
+
+
+def _collect_spot_deltas(session):
+    deltas = defaultdict(lambda: defaultdict(int))
+
+    for obj in session.new:
+        if isinstance(obj, ParkingSpot):
+            _add_delta(deltas, obj.lot_id, obj.status or 'A', 1)
+
+    for obj in session.deleted:
+        if isinstance(obj, ParkingSpot):
+            state = sa_inspect(obj)
+            status_history = state.attrs.status.history
+            lot_history = state.attrs.lot_id.history
+            status = status_history.deleted[0] if status_history.deleted else obj.status
+            lot_id = lot_history.deleted[0] if lot_history.deleted else obj.lot_id
+            _add_delta(deltas, lot_id, status, -1)
+
+    for obj in session.dirty:
+        if not isinstance(obj, ParkingSpot):
+            continue
+        state = sa_inspect(obj)
+        status_history = state.attrs.status.history
+        lot_history = state.attrs.lot_id.history
+        if not status_history.has_changes() and not lot_history.has_changes():
+            continue
+        old_status = status_history.deleted[0] if status_history.deleted else obj.status
+        old_lot_id = lot_history.deleted[0] if lot_history.deleted else obj.lot_id
+        _add_delta(deltas, old_lot_id, old_status, -1)
+        _add_delta(deltas, obj.lot_id, obj.status, 1)
+
+    return deltas
+
+
+@event.listens_for(Session, 'after_flush')
+def _maintain_lot_counters(session, flush_context):
+    """Fold this flush's spot status transitions into the lot counters"""
+    deltas = _collect_spot_deltas(session)
+    if not deltas:
+        return
+    touched = apply_counter_deltas(session.connection(), deltas)
+    session.info.setdefault(_TOUCHED_LOTS_KEY, set()).update(touched)
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _expire_touched_lots(session, flush_context):
+    touched = session.info.pop(_TOUCHED_LOTS_KEY, None)
+    if touched:
+        _expire_lot_counters(session, touched)
+
+
+def reconcile_lot_counters(repair=True):
+    """Detect (and optionally repair) drift between counters and parking_spots.
+
+    Returns a summary with one entry per drifted lot. Repairs are a single
+    set-based UPDATE with correlated COUNT subqueries, so they are correct even
+    if spots change while the reconciliation runs.
+    """
+    actual = defaultdict(lambda: {column: 0 for column in STATUS_COUNTER_COLUMNS.values()})
+    rows = db.session.query(
+        ParkingSpot.lot_id,
+        ParkingSpot.status,
+        func.count(ParkingSpot.id)
+    ).group_by(ParkingSpot.lot_id, ParkingSpot.status).all()
+    for lot_id, status, count in rows:
+        column = STATUS_COUNTER_COLUMNS.get(status)
+        if column:
+            actual[lot_id][column] = count
+
+    stored = db.session.query(
+        ParkingLot.id,
+        ParkingLot.available_count,
+        ParkingLot.reserved_count,
+        ParkingLot.occupied_count
+    ).all()
+
+    drift = []
+    for lot_id, available, reserved, occupied in stored:
+        expected = actual[lot_id]
+        current = {
+            'available_count': available,
+            'reserved_count': reserved,
+            'occupied_count': occupied
+        }
+        if current != expected:
+            drift.append({'lot_id': lot_id, 'stored': current, 'actual': dict(expected)})
+
+    if repair and drift:
+        lots = ParkingLot.__table__
+        spots = ParkingSpot.__table__
+        values = {
+            column: select(func.count(spots.c.id)).where(
+                spots.c.lot_id == lots.c.id,
+                spots.c.status == status
+            ).scalar_subquery()
+            for status, column in STATUS_COUNTER_COLUMNS.items()
+        }
+        values['updated_at'] = lots.c.updated_at
+        drifted_ids = [entry['lot_id'] for entry in drift]
+        db.session.execute(update(lots).where(lots.c.id.in_(drifted_ids)).values(**values))
+        db.session.commit()
+        _expire_lot_counters(db.session, drifted_ids)
+
+    return {
+        'lots_checked': len(stored),
+        'lots_drifted': len(drift),
+        'repaired': bool(repair and drift),
+        'drift': drift
+    }
@@ -14,6 +14,10 @@ class ParkingLot(db.Model):
     latitude = db.Column(db.Float, nullable=True)
     longitude = db.Column(db.Float, nullable=True)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
+    # Denormalized spot counters, maintained by models/occupancy.py
+    available_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    reserved_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    occupied_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
@@ -22,23 +26,19 @@ class ParkingLot(db.Model):
     
     def get_available_spots_count(self):
         """Return count of available parking spots"""
-        from .parking_spot import ParkingSpot
-        return ParkingSpot.query.filter_by(
-            lot_id=self.id, 
-            status='A'
-        ).count()
+        return self.available_count or 0
+    
+    def get_reserved_spots_count(self):
+        """Return count of reserved parking spots"""
+        return self.reserved_count or 0
     
     def get_occupied_spots_count(self):
         """Return count of occupied parking spots"""
-        from .parking_spot import ParkingSpot
-        return ParkingSpot.query.filter_by(
-            lot_id=self.id, 
-            status='O'
-        ).count()
+        return self.occupied_count or 0
     
     def can_be_deleted(self):
         """Check if parking lot can be deleted (all spots must be available)"""
-        return self.get_occupied_spots_count() == 0
+        return self.get_occupied_spots_count() == 0 and self.get_reserved_spots_count() == 0
     
     def to_dict(self):
         return {
@@ -53,6 +53,7 @@ class ParkingLot(db.Model):
             'longitude': self.longitude,
             'is_active': self.is_active,
             'available_spots': self.get_available_spots_count(),
+            'reserved_spots': self.get_reserved_spots_count(),
             'occupied_spots': self.get_occupied_spots_count(),
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
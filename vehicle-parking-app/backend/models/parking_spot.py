@@ -3,6 +3,10 @@ from datetime import datetime
 
 class ParkingSpot(db.Model):
     __tablename__ = 'parking_spots'
+    __table_args__ = (
+        # Free-spot search and per-lot status listings; covers the allocation candidate query
+        db.Index('ix_parking_spots_lot_status_active', 'lot_id', 'status', 'is_active'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     spot_number = db.Column(db.String(10), nullable=False)  # e.g., "A1", "B2", etc.
@@ -4,6 +4,22 @@ from decimal import Decimal
 
 class Reservation(db.Model):
     __tablename__ = 'reservations'
+    __table_args__ = (
+        # "Has this user booked since <cutoff>?" probes (daily reminders, monthly reports)
+        db.Index('ix_reservations_user_created_at', 'user_id', 'created_at'),
+        # A user's reservations by status (dashboards, active/completed counts)
+        db.Index('ix_reservations_user_status', 'user_id', 'status'),
+        # Active/pending reservations of a spot or lot (release, occupancy screens)
+        db.Index('ix_reservations_spot_status', 'spot_id', 'status'),
+        # Current reservation of a spot: leaving_timestamp IS NULL
+        db.Index('ix_reservations_spot_leaving', 'spot_id', 'leaving_timestamp'),
+        # Date-range reports and analytics
+        db.Index('ix_reservations_created_at', 'created_at'),
+        # Open stays only, longest parked first (occupied spots board)
+        db.Index('ix_reservations_open_parked', 'parking_timestamp',
+                 sqlite_where=db.text("status = 'active' AND leaving_timestamp IS NULL"),
+                 postgresql_where=db.text("status = 'active' AND leaving_timestamp IS NULL")),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     spot_id = db.Column(db.Integer, db.ForeignKey('parking_spots.id'), nullable=False)
@@ -22,6 +38,15 @@ class Reservation(db.Model):
     user = db.relationship('User', backref='reservations')
     parking_spot = db.relationship('ParkingSpot', backref='reservations')
     
+    @classmethod
+    def query_with_spot_and_lot(cls):
+        """Reservation query that loads the parking spot and its lot in the same SELECT"""
+        from sqlalchemy.orm import joinedload
+        from .parking_spot import ParkingSpot
+        return cls.query.options(
+            joinedload(cls.parking_spot).joinedload(ParkingSpot.parking_lot)
+        )
+    
     def calculate_parking_duration(self):
         """Calculate parking duration in hours"""
         if self.leaving_timestamp:
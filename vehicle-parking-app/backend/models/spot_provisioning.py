@@ -0,0 +1,115 @@
+"""
+Set-based parking spot provisioning.
+
+Creating or resizing a lot used to add spots one ORM object at a time and
+delete them row by row, which for a multi-thousand spot garage meant seconds
+of flushing and a bloated session. These helpers insert spots with a single
+executemany INSERT and remove them with one guarded DELETE.
+
+Both are Core statements, so they update the lot counters themselves (see
+models/occupancy.py) within the caller's transaction.
+"""
+
+from datetime import datetime
+from sqlalchemy import Integer, and_, cast, delete, exists, func, insert, select
+
+from database import db
+from .occupancy import adjust_lot_counters
+from .parking_spot import ParkingSpot
+from .reservation import Reservation
+
+# Rows per executemany batch
+INSERT_BATCH_SIZE = 5000
+
+
+class SpotProvisioningError(Exception):
+    """Raised when a lot cannot be shrunk without touching booked spots"""
+
+
+def _next_spot_number(session, lot_id):
+    spots = ParkingSpot.__table__
+    # Spot numbers are "P" + zero padded sequence (P001, P002, ...)
+    highest = session.execute(
+        select(func.max(cast(func.substr(spots.c.spot_number, 2), Integer))).where(
+            spots.c.lot_id == lot_id
+        )
+    ).scalar()
+    return (highest or 0) + 1
+
+
+def add_spots(lot_id, count, session=None):
+    """Insert ``count`` available spots into ``lot_id``, numbered after the last one"""
+    session = session or db.session
+    if count <= 0:
+        return 0
+
+    first = _next_spot_number(session, lot_id)
+    now = datetime.utcnow()
+    rows = [
+        {
+            'lot_id': lot_id,
+            'spot_number': f'P{number:03d}',
+            'status': 'A',
+            'is_active': True,
+            'created_at': now,
+            'updated_at': now
+        }
+        for number in range(first, first + count)
+    ]
+
+    table = ParkingSpot.__table__
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        session.execute(insert(table), rows[start:start + INSERT_BATCH_SIZE])
+
+    adjust_lot_counters(lot_id, None, 'A', count, session=session)
+    return count
+
+
+def remove_spots(lot_id, count, session=None):
+    """Delete ``count`` free spots from ``lot_id``, highest spot ids first.
+
+    Only spots that are available and have no reservation history are
+    removed, and that guard is part of the DELETE itself, so a spot booked
+    concurrently is never deleted. Raises SpotProvisioningError if fewer than
+    ``count`` spots qualify; the caller should roll back.
+    """
+    session = session or db.session
+    if count <= 0:
+        return 0
+
+    spots = ParkingSpot.__table__
+    reservations = Reservation.__table__
+    removable = and_(
+        spots.c.lot_id == lot_id,
+        spots.c.status == 'A',
+        ~exists().where(reservations.c.spot_id == spots.c.id)
+    )
+
+    victims = select(spots.c.id).where(removable).order_by(spots.c.id.desc()).limit(count)
+    result = session.execute(
+        delete(spots).where(spots.c.id.in_(victims), removable)
+    )
+
+    if result.rowcount != count:
+        raise SpotProvisioningError(
+            'Cannot reduce spots: some spots are reserved, occupied or have reservation history'
+        )
+
+    adjust_lot_counters(lot_id, 'A', None, count, session=session)
+    return count
+
+
+def resize_lot_spots(lot, new_total, session=None):
+    """Grow or shrink ``lot`` to ``new_total`` spots with set-based statements"""
+    session = session or db.session
+    spots = ParkingSpot.__table__
+    current = session.execute(
+        select(func.count(spots.c.id)).where(spots.c.lot_id == lot.id)
+    ).scalar()
+
+    if new_total > current:
+        add_spots(lot.id, new_total - current, session=session)
+    elif new_total < current:
+        remove_spots(lot.id, current - new_total, session=session)
+
+    lot.number_of_spots = new_total
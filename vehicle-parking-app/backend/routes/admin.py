@@ -38,48 +38,29 @@ def admin_dashboard():
     try:
         from models.user import User
         from models.parking_lot import ParkingLot
-        from models.parking_spot import ParkingSpot
-        from models.reservation import Reservation
-        from database import db
+        from utils.status_counts import get_reservation_status_counts, get_spot_status_counts
         
         # Get statistics
         total_users = User.query.filter_by(role='user').count()
         total_parking_lots = ParkingLot.query.filter_by(is_active=True).count()
-        total_spots = ParkingSpot.query.count()
-        
-        # Get spot statistics
-        available_spots = ParkingSpot.query.filter_by(status='A').count()
-        occupied_spots = ParkingSpot.query.filter_by(status='O').count()
-        reserved_spots = ParkingSpot.query.filter_by(status='R').count()
-        
-        # Get reservation statistics
-        total_reservations = Reservation.query.count()
-        active_reservations = Reservation.query.filter_by(status='active').count()
-        completed_reservations = Reservation.query.filter_by(status='completed').count()
-        
-        # Calculate total revenue from completed reservations
-        from sqlalchemy import func
-        total_revenue_result = db.session.query(
-            func.sum(Reservation.parking_cost)
-        ).filter(
-            Reservation.status == 'completed',
-            Reservation.parking_cost.isnot(None)
-        ).scalar()
         
-        total_revenue = float(total_revenue_result) if total_revenue_result else 0.0
+        # Spot and reservation statistics (one grouped query per table)
+        spots = get_spot_status_counts()['spots']
+        reservation_counts = get_reservation_status_counts()
+        reservations = reservation_counts['reservations']
         
         dashboard_data = {
             'statistics': {
                 'total_users': total_users,
                 'total_parking_lots': total_parking_lots,
-                'total_spots': total_spots,
-                'available_spots': available_spots,
-                'occupied_spots': occupied_spots,
-                'reserved_spots': reserved_spots,
-                'total_reservations': total_reservations,
-                'active_reservations': active_reservations,
-                'completed_reservations': completed_reservations,
-                'total_revenue': total_revenue
+                'total_spots': spots['total'],
+                'available_spots': spots['A'],
+                'occupied_spots': spots['O'],
+                'reserved_spots': spots['R'],
+                'total_reservations': reservations['total'],
+                'active_reservations': reservations['active'],
+                'completed_reservations': reservations['completed'],
+                'total_revenue': reservation_counts['completed_revenue']
             }
         }
         
@@ -109,50 +90,50 @@ def create_parking_lot():
     """Create a new parking lot"""
     try:
         from models.parking_lot import ParkingLot
-        from models.parking_spot import ParkingSpot
+        from models.spot_provisioning import add_spots
         from database import db
         
         data = request.get_json()
         
         # Validate required fields
-        required_fields = ['location', 'total_spots', 'price_per_hour']
+        required_fields = ['prime_location_name', 'address', 'pin_code', 'price', 'number_of_spots']
         for field in required_fields:
-            if field not in data:
+            if field not in data or data[field] in (None, ''):
                 return jsonify({'error': f'{field} is required'}), 400
         
         # Validate data types
         try:
-            total_spots = int(data['total_spots'])
-            price_per_hour = float(data['price_per_hour'])
-        except ValueError:
+            number_of_spots = int(data['number_of_spots'])
+            price = float(data['price'])
+        except (TypeError, ValueError):
             return jsonify({'error': 'Invalid data format'}), 400
         
-        if total_spots <= 0:
-            return jsonify({'error': 'Total spots must be positive'}), 400
-        if price_per_hour <= 0:
+        if number_of_spots <= 0:
+            return jsonify({'error': 'Number of spots must be positive'}), 400
+        if price <= 0:
             return jsonify({'error': 'Price per hour must be positive'}), 400
         
         # Create the parking lot
         new_lot = ParkingLot(
-            location=data['location'],
-            total_spots=total_spots,
-            price_per_hour=price_per_hour,
+            prime_location_name=data['prime_location_name'],
+            address=data['address'],
+            pin_code=str(data['pin_code']),
+            price=price,
+            number_of_spots=number_of_spots,
+            description=data.get('description'),
+            latitude=data.get('latitude'),
+            longitude=data.get('longitude'),
             is_active=True
         )
         
         db.session.add(new_lot)
         db.session.flush()  # To get the ID
         
-        # Create parking spots for this lot
-        for i in range(1, total_spots + 1):
-            spot = ParkingSpot(
-                lot_id=new_lot.id,
-                spot_number=f'P{i:03d}',  # P001, P002, etc.
-                status='A'  # Available
-            )
-            db.session.add(spot)
+        # Create parking spots for this lot (P001, P002, etc.) in bulk
+        add_spots(new_lot.id, number_of_spots)
         
         db.session.commit()
+        invalidate_cache('lot_created', lot_id=new_lot.id)
         
         return jsonify({
             'message': 'Parking lot created successfully',
@@ -170,7 +151,7 @@ def update_parking_lot(lot_id):
     """Update a parking lot"""
     try:
         from models.parking_lot import ParkingLot
-        from models.parking_spot import ParkingSpot
+        from models.spot_provisioning import resize_lot_spots, SpotProvisioningError
         from database import db
         
         lot = ParkingLot.query.get(lot_id)
@@ -180,56 +161,42 @@ def update_parking_lot(lot_id):
         data = request.get_json()
         
         # Update fields if provided
-        if 'location' in data:
-            lot.location = data['location']
+        for field in ['prime_location_name', 'address', 'description', 'latitude', 'longitude']:
+            if field in data:
+                setattr(lot, field, data[field])
         
-        if 'price_per_hour' in data:
+        if 'pin_code' in data:
+            lot.pin_code = str(data['pin_code'])
+        
+        if 'price' in data:
             try:
-                price_per_hour = float(data['price_per_hour'])
-                if price_per_hour <= 0:
+                price = float(data['price'])
+                if price <= 0:
                     return jsonify({'error': 'Price per hour must be positive'}), 400
-                lot.price_per_hour = price_per_hour
-            except ValueError:
+                lot.price = price
+            except (TypeError, ValueError):
                 return jsonify({'error': 'Invalid price format'}), 400
         
-        if 'total_spots' in data:
+        if 'number_of_spots' in data:
             try:
-                new_total_spots = int(data['total_spots'])
-                if new_total_spots <= 0:
-                    return jsonify({'error': 'Total spots must be positive'}), 400
-                
-                current_spots = ParkingSpot.query.filter_by(lot_id=lot_id).count()
-                
-                if new_total_spots > current_spots:
-                    # Add new spots
-                    for i in range(current_spots + 1, new_total_spots + 1):
-                        spot = ParkingSpot(
-                            lot_id=lot_id,
-                            spot_number=f'P{i:03d}',
-                            status='A'
-                        )
-                        db.session.add(spot)
-                elif new_total_spots < current_spots:
-                    # Check if any spots to be removed are occupied
-                    spots_to_remove = ParkingSpot.query.filter_by(lot_id=lot_id).offset(new_total_spots).all()
-                    occupied_spots = [spot for spot in spots_to_remove if spot.status in ['R', 'O']]
-                    
-                    if occupied_spots:
-                        return jsonify({'error': 'Cannot reduce spots: some spots are reserved or occupied'}), 400
-                    
-                    # Remove excess spots
-                    for spot in spots_to_remove:
-                        db.session.delete(spot)
-                
-                lot.total_spots = new_total_spots
-                
-            except ValueError:
-                return jsonify({'error': 'Invalid total spots format'}), 400
+                new_total_spots = int(data['number_of_spots'])
+            except (TypeError, ValueError):
+                return jsonify({'error': 'Invalid number of spots format'}), 400
+            if new_total_spots <= 0:
+                return jsonify({'error': 'Number of spots must be positive'}), 400
+            
+            # Grows with one bulk INSERT, shrinks with one guarded DELETE
+            try:
+                resize_lot_spots(lot, new_total_spots)
+            except SpotProvisioningError as e:
+                db.session.rollback()
+                return jsonify({'error': str(e)}), 400
         
         if 'is_active' in data:
             lot.is_active = bool(data['is_active'])
         
         db.session.commit()
+        invalidate_cache('lot_updated', lot_id=lot.id)
         
         return jsonify({
             'message': 'Parking lot updated successfully',
@@ -270,6 +237,7 @@ def delete_parking_lot(lot_id):
         # Soft delete by setting is_active to False
         lot.is_active = False
         db.session.commit()
+        invalidate_cache('lot_deleted', lot_id=lot_id)
         
         return jsonify({'message': 'Parking lot deleted successfully'}), 200
         
@@ -367,6 +335,8 @@ def complete_reservation(reservation_id):
             spot.status = 'A'  # Available
         
         db.session.commit()
+        invalidate_cache('reservation_updated', user_id=reservation.user_id,
+                         lot_id=spot.lot_id if spot else None)
         
         return jsonify({
             'message': 'Reservation completed successfully',
@@ -402,6 +372,8 @@ def cancel_reservation(reservation_id):
         # Update reservation status
         reservation.status = 'cancelled'
         db.session.commit()
+        invalidate_cache('reservation_deleted', user_id=reservation.user_id,
+                         lot_id=spot.lot_id if spot else None)
         
         return jsonify({
             'message': 'Reservation cancelled successfully',
@@ -501,6 +473,7 @@ def update_user_role(user_id):
         
         user.role = new_role
         db.session.commit()
+        invalidate_cache('user_updated')
         
         return jsonify({
             'message': f'User role updated to {new_role} successfully',
@@ -624,7 +597,8 @@ def get_task_status(task_id):
                 'state': task.state,
                 'status': task.info.get('status', ''),
                 'current': task.info.get('current', 0),
-                'total': task.info.get('total', 1)
+                'total': task.info.get('total', 1),
+                'rows_per_second': task.info.get('rows_per_second')
             }
         elif task.state == 'SUCCESS':
             response = {
@@ -642,6 +616,59 @@ def get_task_status(task_id):
     except Exception as e:
         return jsonify({'error': f'Failed to get task status: {str(e)}'}), 500
 
+@admin_bp.route('/export-csv', methods=['POST'])
+@jwt_required()
+@admin_required
+def export_reservations():
+    """Export all reservations (async job; poll /task-status/<task_id>)"""
+    try:
+        from tasks.export_csv import generate_admin_csv_export, export_format_available
+        
+        data = request.get_json(silent=True) or {}
+        
+        # csv (default), csv.gz or parquet
+        export_format = data.get('format', 'csv')
+        if not export_format_available(export_format):
+            return jsonify({'error': f'Unsupported export format: {export_format}'}), 400
+        
+        filters = {key: data[key] for key in ('start_date', 'end_date', 'status') if data.get(key)}
+        
+        task = generate_admin_csv_export.delay(filters, export_format=export_format)
+        
+        return jsonify({
+            'message': 'Reservation export started',
+            'task_id': task.id,
+            'format': export_format,
+            'status': 'processing'
+        }), 202
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/download-csv/<filename>', methods=['GET'])
+@jwt_required()
+@admin_required
+def download_export(filename):
+    """Download a generated reservation export"""
+    try:
+        import os
+        
+        # Only admin exports, and no directory traversal
+        if '..' in filename or '/' in filename or not filename.startswith('admin_reservations_export_'):
+            return jsonify({'error': 'Invalid filename'}), 400
+        
+        exports_dir = os.path.join(os.path.dirname(__file__), '..', 'exports')
+        file_path = os.path.join(exports_dir, filename)
+        
+        if not os.path.exists(file_path):
+            return jsonify({'error': 'File not found or has expired'}), 404
+        
+        from utils.downloads import send_export_file
+        return send_export_file(file_path, filename)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @admin_bp.route('/test-monthly-reports', methods=['POST'])
 @jwt_required()
 @admin_required
@@ -768,7 +795,7 @@ def preview_monthly_report(user_id):
     """Preview monthly report HTML for a specific user"""
     try:
         from models.user import User
-        from tasks.monthly_reports import generate_monthly_report_data, generate_monthly_report_html
+        from tasks.monthly_reports import get_monthly_report
         from datetime import datetime
         
         user = User.query.get(user_id)
@@ -779,11 +806,11 @@ def preview_monthly_report(user_id):
         month = int(request.args.get('month', datetime.now().month))
         year = int(request.args.get('year', datetime.now().year))
         
-        # Generate report data
-        report_data = generate_monthly_report_data(user.id, month, year)
+        if not (1 <= month <= 12):
+            return jsonify({'error': 'Invalid month. Must be between 1 and 12'}), 400
         
-        # Generate HTML
-        html_content = generate_monthly_report_html(user, report_data, month, year)
+        # Stored for closed months, built live for the current one
+        html_content = get_monthly_report(user, month, year, 'html')
         
         # Return HTML for preview
         return html_content, 200, {'Content-Type': 'text/html'}
@@ -801,7 +828,7 @@ def get_cache_stats():
     """Get Redis cache statistics"""
     try:
         from utils.cache_enhanced import cache_manager
-        stats = cache_manager.get_cache_stats()
+        stats = cache_manager.get_stats()
         return jsonify({
             'success': True,
             'stats': stats
@@ -821,7 +848,7 @@ def clear_cache():
         from utils.cache_enhanced import cache_manager
         pattern = request.json.get('pattern', '*') if request.json else '*'
         
-        cleared_count = cache_manager.clear_cache(pattern)
+        cleared_count = cache_manager.delete_pattern(pattern)
         
         return jsonify({
             'success': True,
@@ -865,6 +892,23 @@ def warm_cache():
             'error': str(e)
         }), 500
 
+@admin_bp.route('/occupancy/reconcile', methods=['POST'])
+@jwt_required()
+@admin_required
+def reconcile_occupancy():
+    """Check per-lot occupancy counters against parking spots and repair drift"""
+    try:
+        from tasks.maintenance import reconcile_occupancy_counters_sync
+
+        repair = request.json.get('repair', True) if request.json else True
+        result = reconcile_occupancy_counters_sync(repair=bool(repair))
+
+        status_code = 500 if result.get('status') == 'failed' else 200
+        return jsonify(result), status_code
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # ===== PARKING SPOT MANAGEMENT ENDPOINTS =====
 
 @admin_bp.route('/parking-spots/status', methods=['GET'])
@@ -942,10 +986,10 @@ def get_all_parking_spots_status():
             spots_data.append(spot_info)
         
         # Get summary statistics
-        total_spots = ParkingSpot.query.count()
-        available_spots = ParkingSpot.query.filter_by(status='A').count()
-        occupied_spots = ParkingSpot.query.filter_by(status='O').count()
-        reserved_spots = ParkingSpot.query.filter_by(status='R').count()
+        from utils.status_counts import get_spot_status_counts
+        spot_counts = get_spot_status_counts()['spots']
+        total_spots = spot_counts['total']
+        occupied_spots = spot_counts['O']
         
         return jsonify({
             'spots': spots_data,
@@ -957,9 +1001,9 @@ def get_all_parking_spots_status():
             },
             'summary': {
                 'total_spots': total_spots,
-                'available': available_spots,
+                'available': spot_counts['A'],
                 'occupied': occupied_spots,
-                'reserved': reserved_spots,
+                'reserved': spot_counts['R'],
                 'occupancy_rate': round((occupied_spots / total_spots * 100), 2) if total_spots > 0 else 0
             }
         }), 200
@@ -1041,54 +1085,23 @@ def get_parking_spot_details(spot_id):
 @admin_required
 @cached_endpoint('admin_occupied_spots', timeout=30)
 def get_occupied_spots():
-    """Get all currently occupied parking spots with vehicle details"""
+    """Get currently occupied parking spots with vehicle details, longest parked first
+    
+    Paginated with ?limit=&after=<next_cursor of the previous page>; ?lot_id=
+    narrows the board to one lot.
+    """
     try:
-        from models.parking_spot import ParkingSpot
-        from models.parking_lot import ParkingLot
-        from models.reservation import Reservation
-        from models.user import User
+        from utils.occupied_spots import DEFAULT_PAGE_SIZE, decode_cursor, occupied_spots_page
         
-        # Get all occupied spots
-        occupied_spots = ParkingSpot.query.filter_by(status='O').all()
-        
-        occupied_details = []
-        for spot in occupied_spots:
-            lot = ParkingLot.query.get(spot.lot_id)
-            current_reservation = spot.get_current_reservation()
-            
-            if current_reservation:
-                user = User.query.get(current_reservation.user_id)
-                duration = current_reservation.calculate_parking_duration()
-                estimated_cost = current_reservation.calculate_cost(lot.hourly_rate) if lot else 0
-                
-                occupied_details.append({
-                    'spot_id': spot.id,
-                    'spot_number': spot.spot_number,
-                    'lot_name': lot.name if lot else 'Unknown',
-                    'lot_location': lot.location if lot else 'Unknown',
-                    'vehicle_number': current_reservation.vehicle_number,
-                    'user_details': {
-                        'id': user.id,
-                        'full_name': user.full_name,
-                        'phone_number': user.phone_number,
-                        'email': user.email
-                    } if user else None,
-                    'parking_since': current_reservation.parking_timestamp.isoformat(),
-                    'duration_hours': duration,
-                    'estimated_cost': float(estimated_cost),
-                    'hourly_rate': float(lot.hourly_rate) if lot else 0,
-                    'status': current_reservation.status,
-                    'overstay_alert': duration > 24  # Flag if parked for more than 24 hours
-                })
-        
-        # Sort by parking duration (longest first)
-        occupied_details.sort(key=lambda x: x['duration_hours'], reverse=True)
+        limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+        lot_id = request.args.get('lot_id', type=int)
+        after = request.args.get('after')
+        try:
+            after = decode_cursor(after) if after else None
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
         
-        return jsonify({
-            'occupied_spots': occupied_details,
-            'total_occupied': len(occupied_details),
-            'long_term_parked': len([spot for spot in occupied_details if spot['overstay_alert']])
-        }), 200
+        return jsonify(occupied_spots_page(after=after, limit=limit, lot_id=lot_id)), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1126,8 +1139,8 @@ def force_release_parking_spot(spot_id):
         db.session.commit()
         
         # Invalidate cache
-        invalidate_cache('admin_*')
-        invalidate_cache('user_*')
+        invalidate_cache('spot_status_changed', lot_id=spot.lot_id,
+                         user_id=current_reservation.user_id if current_reservation else None)
         
         return jsonify({
             'success': True,
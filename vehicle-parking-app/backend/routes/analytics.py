@@ -1,21 +1,92 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from database import db
 from models.user import User
 from models.parking_lot import ParkingLot
-from models.parking_spot import ParkingSpot
-from models.reservation import Reservation
 from datetime import datetime, timedelta
-from sqlalchemy import func, cast, Date
+from utils.cache_enhanced import cached_endpoint
+from utils.status_counts import get_reservation_status_counts, get_spot_status_counts
 import logging
 
 analytics_bp = Blueprint('analytics', __name__)
 logger = logging.getLogger(__name__)
 
+# Days shown when no range is given
+DEFAULT_ANALYTICS_DAYS = 7
+
+def _analytics_range(args):
+    """[start, end) datetimes from ?start=YYYY-MM-DD&end=YYYY-MM-DD (both days inclusive)"""
+    today = datetime.utcnow().date()
+    end_day = datetime.strptime(args['end'], '%Y-%m-%d').date() if args.get('end') else today
+    start_day = (datetime.strptime(args['start'], '%Y-%m-%d').date() if args.get('start')
+                 else end_day - timedelta(days=DEFAULT_ANALYTICS_DAYS - 1))
+    if start_day > end_day:
+        raise ValueError('start must not be after end')
+    return (datetime.combine(start_day, datetime.min.time()),
+            datetime.combine(end_day + timedelta(days=1), datetime.min.time()))
+
+def build_analytics_charts(start, end):
+    """Chart data for [start, end) from the hourly/daily rollups (see models/analytics.py)"""
+    from models.analytics import LotDailyRollup, LotHourlyRollup, rollup_rows
+    
+    days = (end - start).days
+    
+    # Revenue per day, zero-filled so every day of the range has a point
+    daily = {row.bucket_start.date(): row for row in rollup_rows(LotDailyRollup, start, end, 'bucket_start')}
+    dates, amounts = [], []
+    weekly = {}
+    for offset in range(days):
+        day = (start + timedelta(days=offset)).date()
+        amount = float(daily[day].revenue) if day in daily else 0.0
+        dates.append(day.strftime('%m/%d'))
+        amounts.append(round(amount, 2))
+        week = f"Week {day.isocalendar()[1]}"
+        weekly[week] = weekly.get(week, 0) + amount
+    
+    # Share of each lot's spot-minutes that were occupied
+    lots = {lot.id: lot for lot in ParkingLot.query.order_by(ParkingLot.id).all()}
+    lot_minutes = {row.lot_id: row.occupancy_minutes for row in rollup_rows(LotDailyRollup, start, end, 'lot_id')}
+    lot_names, utilization_rates = [], []
+    for lot_id, lot in lots.items():
+        capacity = lot.number_of_spots * days * 24 * 60
+        lot_names.append(lot.prime_location_name)
+        utilization_rates.append(round(lot_minutes.get(lot_id, 0) / capacity * 100, 1) if capacity else 0)
+    
+    # Average spots occupied at each hour of the day
+    hour_minutes = [0.0] * 24
+    for row in rollup_rows(LotHourlyRollup, start, end, 'bucket_start'):
+        hour_minutes[row.bucket_start.hour] += row.occupancy_minutes
+    
+    totals = rollup_rows(LotDailyRollup, start, end)[0]
+    completed = int(totals.completed_reservations)
+    
+    return {
+        'range': {'start': start.date().isoformat(), 'end': (end - timedelta(days=1)).date().isoformat()},
+        'daily_revenue': {'dates': dates, 'amounts': amounts},
+        'lot_utilization': {'lot_names': lot_names, 'utilization_rates': utilization_rates},
+        'weekly_revenue': {
+            'weeks': list(weekly),
+            'amounts': [round(amount, 2) for amount in weekly.values()]
+        },
+        'peak_hours': {
+            'hours': [f"{hour:02d}:00" for hour in range(24)],
+            'occupancy': [round(minutes / 60 / days, 2) for minutes in hour_minutes]
+        },
+        'summary_stats': {
+            'total_reservations': int(totals.reservations),
+            'total_completed_reservations': completed,
+            'total_revenue': round(float(totals.revenue), 2),
+            'average_parking_duration': round(totals.occupancy_minutes / 60 / completed, 2) if completed else 0
+        }
+    }
+
 @analytics_bp.route('/admin/analytics', methods=['GET'])
 @jwt_required()
 def get_analytics_data():
-    """Get comprehensive analytics data for admin dashboard"""
+    """Get comprehensive analytics data for admin dashboard
+    
+    Charts cover ?start=YYYY-MM-DD&end=YYYY-MM-DD (default: the last 7 days)
+    and are summed from the analytics rollups, not from raw reservations.
+    """
     try:
         current_user_id = int(get_jwt_identity())
         
@@ -24,53 +95,20 @@ def get_analytics_data():
         if not user or user.role != 'admin':
             return jsonify({'error': 'Admin access required'}), 403
         
-        # Get current parking status (simplified)
-        parking_status = {
-            'available': ParkingSpot.query.filter_by(status='A').count(),
-            'occupied': ParkingSpot.query.filter_by(status='O').count(),
-            'reserved': ParkingSpot.query.filter_by(status='R').count()
-        }
-        
-        # Generate simple mock data for testing
-        daily_revenue = {
-            'dates': ['07/01', '07/02', '07/03', '07/04', '07/05', '07/06', '07/07'],
-            'amounts': [120.50, 89.25, 156.75, 203.40, 95.60, 178.90, 145.30]
-        }
+        try:
+            start, end = _analytics_range(request.args)
+        except ValueError as e:
+            return jsonify({'error': f'Invalid date range: {str(e)}'}), 400
         
-        # Get parking lot utilization (simplified with mock data for now)
-        lot_utilization = {
-            'lot_names': ['Downtown', 'Mall', 'Airport', 'Stadium'],
-            'utilization_rates': [85, 67, 92, 45]
-        }
-        
-        # Simple mock data for other charts
-        weekly_revenue = {
-            'weeks': ['Week 28', 'Week 29', 'Week 30', 'Week 31'],
-            'amounts': [850.75, 920.40, 1120.85, 995.60]
-        }
-        
-        peak_hours = {
-            'hours': ['06:00', '07:00', '08:00', '09:00', '10:00', '11:00', '12:00', '13:00', '14:00', '15:00', '16:00', '17:00', '18:00', '19:00', '20:00', '21:00'],
-            'occupancy': [5, 12, 25, 35, 28, 22, 30, 28, 25, 20, 24, 32, 28, 15, 8, 3]
+        # Get current parking status
+        spot_counts = get_spot_status_counts()['spots']
+        parking_status = {
+            'available': spot_counts['A'],
+            'occupied': spot_counts['O'],
+            'reserved': spot_counts['R']
         }
         
-        # Get basic statistics
-        total_completed = Reservation.query.filter_by(status='completed').count()
-        total_revenue_result = db.session.query(func.sum(Reservation.parking_cost)).filter_by(status='completed').scalar()
-        total_revenue = float(total_revenue_result) if total_revenue_result else 0
-        
-        analytics_data = {
-            'parking_status': parking_status,
-            'daily_revenue': daily_revenue,
-            'lot_utilization': lot_utilization,
-            'weekly_revenue': weekly_revenue,
-            'peak_hours': peak_hours,
-            'summary_stats': {
-                'total_completed_reservations': total_completed,
-                'total_revenue': total_revenue,
-                'average_parking_duration': 2.5
-            }
-        }
+        analytics_data = dict(build_analytics_charts(start, end), parking_status=parking_status)
         
         return jsonify(analytics_data)
         
@@ -82,14 +120,16 @@ def get_analytics_data():
         return jsonify({'error': f'Failed to fetch analytics data: {str(e)}'}), 500
 
 @analytics_bp.route('/public/stats', methods=['GET'])
+@cached_endpoint('public_stats')
 def get_public_stats():
     """Get public statistics for home page (no authentication required)"""
     try:
         # Get basic public statistics
+        spots = get_spot_status_counts()['spots']
         total_parking_lots = ParkingLot.query.count()
-        total_parking_spots = ParkingSpot.query.count()
-        available_spots = ParkingSpot.query.filter_by(status='A').count()
-        total_reservations = Reservation.query.count()
+        total_parking_spots = spots['total']
+        available_spots = spots['A']
+        total_reservations = get_reservation_status_counts()['reservations']['total']
         
         # Calculate utilization rate
         utilization_rate = 0
@@ -56,6 +56,10 @@ def register():
         db.session.add(new_user)
         db.session.commit()
         
+        # New users show up in the cached admin views
+        from utils.cache_enhanced import invalidate_cache
+        invalidate_cache('user_registered')
+        
         # Generate token
         token = generate_token(new_user.id, new_user.role)
         
@@ -37,29 +37,11 @@ def get_parking_lots():
     """Get all available parking lots (public endpoint) - CACHED"""
     try:
         from models.parking_lot import ParkingLot
-        from models.parking_spot import ParkingSpot
         
         lots = ParkingLot.query.filter_by(is_active=True).all()
         
-        # Add availability information with optimized queries
-        lots_data = []
-        for lot in lots:
-            lot_data = lot.to_dict()
-            
-            # Check cache for available spots count first
-            cache_key = f'spots:lot_{lot.id}:available'
-            available_spots = cache_manager.get(cache_key)
-            
-            if available_spots is None:
-                # Calculate and cache available spots
-                available_spots = ParkingSpot.query.filter_by(
-                    lot_id=lot.id, 
-                    status='A'
-                ).count()
-                cache_manager.set(cache_key, available_spots, 60)  # Cache for 1 minute
-            
-            lot_data['available_spots'] = available_spots
-            lots_data.append(lot_data)
+        # Availability comes from the lot's maintained counters (no per-lot COUNT)
+        lots_data = [lot.to_dict() for lot in lots]
         
         return jsonify(lots_data)
         
@@ -136,16 +118,6 @@ def reserve_parking_spot():
         if not lot:
             return jsonify({'error': 'Parking lot not found or inactive'}), 404
         
-        # Find first available spot
-        available_spot = ParkingSpot.query.filter_by(
-            lot_id=lot_id,
-            status='A',
-            is_active=True
-        ).first()
-        
-        if not available_spot:
-            return jsonify({'error': 'No available parking spots'}), 400
-        
         # Check if user already has an active reservation
         active_reservation = Reservation.query.filter_by(
             user_id=request.current_user_id,
@@ -158,6 +130,15 @@ def reserve_parking_spot():
                 'active_reservation': active_reservation.to_dict()
             }), 400
         
+        # Claim and occupy a spot atomically so concurrent bookings never share one
+        from models.allocation import claim_spot
+        
+        available_spot = claim_spot(lot_id, to_status='O')
+        
+        if not available_spot:
+            db.session.rollback()
+            return jsonify({'error': 'No available parking spots'}), 400
+        
         # Create reservation
         reservation = Reservation(
             spot_id=available_spot.id,
@@ -167,14 +148,11 @@ def reserve_parking_spot():
             remarks=data.get('remarks')
         )
         
-        # Occupy the spot
-        available_spot.occupy_spot()
-        
         db.session.add(reservation)
         db.session.commit()
         
         # Invalidate cache after successful reservation
-        invalidate_cache('reservation_created', lot_id=lot_id, user_id=request.current_user_id)
+        invalidate_cache('reservation_created', user_id=request.current_user_id, lot_id=lot.id)
         
         return jsonify({
             'message': 'Parking spot reserved successfully',
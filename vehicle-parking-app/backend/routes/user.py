@@ -35,210 +35,10 @@ def token_required(f):
 def user_dashboard():
     """Get user dashboard data"""
     try:
-        from models.reservation import Reservation
-        from models.parking_lot import ParkingLot
-        from database import db
-        from sqlalchemy import func, extract
+        from utils.user_dashboard import build_user_dashboard
         
-        user_id = request.current_user_id
-        
-        # Get active reservation
-        active_reservation = Reservation.query.filter_by(
-            user_id=user_id,
-            status='active'
-        ).first()
-        
-        # Get statistics
-        total_reservations = Reservation.query.filter_by(user_id=user_id).count()
-        completed_reservations = Reservation.query.filter_by(
-            user_id=user_id,
-            status='completed'
-        ).count()
-        
-        # Calculate total spent
-        total_spent = db.session.query(
-            func.sum(Reservation.parking_cost)
-        ).filter_by(
-            user_id=user_id,
-            status='completed'
-        ).scalar() or 0
-        
-        # Get recent activity - Fixed query
-        recent_activity = []
-        try:
-            # Simple approach: get user's recent reservations
-            recent_reservations = Reservation.query.filter_by(user_id=user_id).order_by(Reservation.created_at.desc()).limit(5).all()
-            
-            for reservation in recent_reservations:
-                try:
-                    from models.parking_spot import ParkingSpot
-                    spot = ParkingSpot.query.get(reservation.spot_id)
-                    lot_name = "Unknown Lot"
-                    if spot:
-                        lot = ParkingLot.query.get(spot.lot_id)
-                        if lot:
-                            lot_name = lot.prime_location_name or f"Lot {lot.id}"
-                    
-                    recent_activity.append({
-                        'id': reservation.id,
-                        'spot_number': spot.spot_number if spot else reservation.spot_id,
-                        'lot_name': lot_name,
-                        'status': reservation.status,
-                        'start_time': reservation.start_time.isoformat() if reservation.start_time else None,
-                        'end_time': reservation.end_time.isoformat() if reservation.end_time else None,
-                        'parking_cost': float(reservation.parking_cost) if reservation.parking_cost else 0,
-                        'created_at': reservation.created_at.isoformat() if reservation.created_at else None
-                    })
-                except:
-                    continue
-        except Exception as e:
-            print(f"Error getting recent activity: {e}")
-            recent_activity = []        # Get monthly statistics (last 6 months)
-        monthly_stats = []
-        for i in range(6):
-            month_date = datetime.now() - timedelta(days=30 * i)
-            month_reservations = Reservation.query.filter(
-                Reservation.user_id == user_id,
-                extract('year', Reservation.created_at) == month_date.year,
-                extract('month', Reservation.created_at) == month_date.month
-            ).count()
-            
-            month_spent = db.session.query(
-                func.sum(Reservation.parking_cost)
-            ).filter(
-                Reservation.user_id == user_id,
-                Reservation.status == 'completed',
-                extract('year', Reservation.created_at) == month_date.year,
-                extract('month', Reservation.created_at) == month_date.month
-            ).scalar() or 0
-            
-            monthly_stats.append({
-                'month': month_date.strftime('%B %Y'),
-                'reservations': month_reservations,
-                'amount_spent': float(month_spent)
-            })
-        
-        # Get most used parking lot - Fixed query
-        most_used_lot_data = None
-        try:
-            # Simple approach: get all user reservations and calculate in Python
-            user_reservations = Reservation.query.filter_by(user_id=user_id).all()
-            lot_usage = {}
-            
-            for reservation in user_reservations:
-                try:
-                    from models.parking_spot import ParkingSpot
-                    spot = ParkingSpot.query.get(reservation.spot_id)
-                    if spot:
-                        lot = ParkingLot.query.get(spot.lot_id)
-                        if lot:
-                            lot_name = lot.prime_location_name or f"Lot {lot.id}"
-                            lot_usage[lot_name] = lot_usage.get(lot_name, 0) + 1
-                except:
-                    continue
-            
-            if lot_usage:
-                most_used_lot_name = max(lot_usage.items(), key=lambda x: x[1])
-                most_used_lot_data = {
-                    'name': most_used_lot_name[0],
-                    'usage_count': most_used_lot_name[1]
-                }
-        except Exception as e:
-            print(f"Error calculating most used lot: {e}")
-            most_used_lot_data = None
-        
-        # Get status distribution for pie chart
-        status_distribution = db.session.query(
-            Reservation.status,
-            func.count(Reservation.id).label('count')
-        ).filter_by(user_id=user_id).group_by(Reservation.status).all()
-        
-        # Get parking lot usage statistics for bar chart - Fixed query
-        lot_usage_stats = []
-        try:
-            # Simple approach: calculate in Python
-            user_reservations = Reservation.query.filter_by(user_id=user_id).all()
-            lot_stats = {}
-            
-            for reservation in user_reservations:
-                try:
-                    from models.parking_spot import ParkingSpot
-                    spot = ParkingSpot.query.get(reservation.spot_id)
-                    if spot:
-                        lot = ParkingLot.query.get(spot.lot_id)
-                        if lot:
-                            lot_name = lot.prime_location_name or f"Lot {lot.id}"
-                            if lot_name not in lot_stats:
-                                lot_stats[lot_name] = {'reservations': 0, 'total_spent': 0}
-                            
-                            lot_stats[lot_name]['reservations'] += 1
-                            if reservation.status == 'completed' and reservation.parking_cost:
-                                lot_stats[lot_name]['total_spent'] += float(reservation.parking_cost)
-                except:
-                    continue
-            
-            # Convert to list format expected by frontend
-            lot_usage_stats = [
-                {
-                    'lot_name': lot_name,
-                    'reservations': stats['reservations'],
-                    'total_spent': float(stats['total_spent'])
-                }
-                for lot_name, stats in sorted(lot_stats.items(), key=lambda x: x[1]['reservations'], reverse=True)[:5]
-            ]
-        except Exception as e:
-            print(f"Error calculating lot usage stats: {e}")
-            lot_usage_stats = []
-        
-        # Get weekly activity for the last 4 weeks
-        weekly_stats = []
-        for i in range(4):
-            week_start = datetime.now() - timedelta(days=7*(i+1))
-            week_end = datetime.now() - timedelta(days=7*i)
-            
-            weekly_reservations = Reservation.query.filter(
-                Reservation.user_id == user_id,
-                Reservation.created_at >= week_start,
-                Reservation.created_at < week_end
-            ).count()
-            
-            weekly_spent = db.session.query(
-                func.sum(Reservation.parking_cost)
-            ).filter(
-                Reservation.user_id == user_id,
-                Reservation.status == 'completed',
-                Reservation.created_at >= week_start,
-                Reservation.created_at < week_end
-            ).scalar() or 0
-            
-            weekly_stats.append({
-                'week': f"Week {4-i}",
-                'week_start': week_start.strftime('%Y-%m-%d'),
-                'reservations': weekly_reservations,
-                'amount_spent': float(weekly_spent)
-            })
-        
-        return jsonify({
-            'active_reservation': active_reservation.to_dict() if active_reservation else None,
-            'statistics': {
-                'total_reservations': total_reservations,
-                'completed_reservations': completed_reservations,
-                'total_spent': float(total_spent)
-            },
-            'recent_reservations': [r.to_dict() for r in recent_reservations],
-            'monthly_stats': monthly_stats,
-            'weekly_stats': weekly_stats,
-            'status_distribution': [
-                {'status': status, 'count': count} 
-                for status, count in status_distribution
-            ],
-            'lot_usage_stats': lot_usage_stats,
-            'most_used_lot': {
-                'name': most_used_lot_data['name'] if most_used_lot_data else None,
-                'usage_count': most_used_lot_data['usage_count'] if most_used_lot_data else 0
-            },
-            'recent_activity': recent_activity
-        }), 200
+        # All figures come from a couple of grouped queries (see utils/user_dashboard.py)
+        return jsonify(build_user_dashboard(request.current_user_id)), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -374,15 +174,25 @@ def change_password():
 def export_reservations_csv():
     """Export user's complete parking history as CSV (async job trigger)"""
     try:
-        from tasks.export_csv import generate_user_csv_export
+        from tasks.export_csv import generate_user_csv_export, export_format_available
         from models.user import User
         
         user = User.query.get(request.current_user_id)
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
+        # Reuse or top up the previous export unless a full rebuild is asked for
+        data = request.get_json(silent=True) or {}
+        incremental = data.get('mode', 'incremental') != 'full'
+        
+        # csv (default), csv.gz or parquet
+        export_format = data.get('format', 'csv')
+        if not export_format_available(export_format):
+            return jsonify({'error': f'Unsupported export format: {export_format}'}), 400
+        
         # Trigger async task
-        task = generate_user_csv_export.delay(request.current_user_id)
+        task = generate_user_csv_export.delay(request.current_user_id, incremental=incremental,
+                                              export_format=export_format)
         
         return jsonify({
             'message': 'CSV export job started successfully! 📊',
@@ -454,7 +264,6 @@ def get_export_status(task_id):
 def download_csv_file(filename):
     """Download the generated CSV file"""
     try:
-        from flask import send_file
         import os
         
         # Validate filename to prevent directory traversal
@@ -475,13 +284,9 @@ def download_csv_file(filename):
         if not user or user.username not in filename:
             return jsonify({'error': 'Access denied'}), 403
         
-        # Send file
-        return send_file(
-            file_path,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='text/csv'
-        )
+        # Supports Range, If-None-Match and a pre-compressed .gz sibling
+        from utils.downloads import send_export_file
+        return send_export_file(file_path, filename)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -495,8 +300,6 @@ def get_parking_history():
     try:
         from models.reservation import Reservation
         from models.parking_spot import ParkingSpot
-        from models.parking_lot import ParkingLot
-        from database import db
         
         # Get query parameters
         page = request.args.get('page', 1, type=int)
@@ -506,8 +309,8 @@ def get_parking_history():
         end_date = request.args.get('end_date')
         lot_id = request.args.get('lot_id', type=int)
         
-        # Build query
-        query = db.session.query(Reservation).filter_by(user_id=request.current_user_id)
+        # Build query (spot and lot are joined in, not fetched per row)
+        query = Reservation.query_with_spot_and_lot().filter_by(user_id=request.current_user_id)
         
         if status:
             query = query.filter(Reservation.status == status)
@@ -539,9 +342,9 @@ def get_parking_history():
             res_data = reservation.to_dict()
             
             # Add parking lot and spot information
-            spot = ParkingSpot.query.get(reservation.spot_id)
+            spot = reservation.parking_spot
             if spot:
-                lot = ParkingLot.query.get(spot.lot_id)
+                lot = spot.parking_lot
                 res_data['parking_spot'] = {
                     'spot_number': spot.spot_number,
                     'lot_name': lot.prime_location_name if lot else 'Unknown',
@@ -588,26 +391,14 @@ def create_reservation():
         if not lot:
             return jsonify({'error': 'Parking lot not found or inactive'}), 404
         
-        # Find first available spot (user cannot select specific spot)
-        # Use a more robust query that considers both spot status and existing reservations
-        from sqlalchemy import and_, not_, exists
-        
-        available_spot = db.session.query(ParkingSpot).filter(
-            and_(
-                ParkingSpot.lot_id == lot_id,
-                ParkingSpot.status == 'A',  # A = Available
-                ParkingSpot.is_active == True,
-                # Ensure no active or reserved reservations exist for this spot
-                not_(exists().where(
-                    and_(
-                        Reservation.spot_id == ParkingSpot.id,
-                        Reservation.status.in_(['reserved', 'active'])
-                    )
-                ))
-            )
-        ).first()
+        # Claim the first free spot atomically (user cannot select specific spot);
+        # a spot grabbed by a concurrent booking is skipped, never double-booked
+        from models.allocation import claim_spot
+        
+        available_spot = claim_spot(lot_id, to_status='R')  # R = Reserved
         
         if not available_spot:
+            db.session.rollback()
             return jsonify({'error': 'No available parking spots in this lot'}), 400
         
         # Calculate cost (default 1 hour if not specified)
@@ -624,26 +415,11 @@ def create_reservation():
             remarks=data.get('remarks')
         )
         
-        print(f"DEBUG: Creating reservation for user {request.current_user_id}, spot {available_spot.id}")
-        print(f"DEBUG: Spot current status: {available_spot.status}")
-        
-        # Mark spot as reserved (not yet occupied)
-        available_spot.status = 'R'  # R = Reserved
-        
-        print(f"DEBUG: Updated spot {available_spot.id} status to: {available_spot.status}")
-        
         db.session.add(reservation)
         db.session.commit()
         
-        # Invalidate relevant caches aggressively
-        user_id = request.current_user_id
-        invalidate_cache(f"lots_*")
-        invalidate_cache(f"dashboard:user_{user_id}")
-        invalidate_cache(f"dashboard*")  # Wildcard for all dashboard caches
-        invalidate_cache(f"reservations:user_{user_id}")
-        invalidate_cache(f"reservations*")  # Wildcard for all reservation caches
-        invalidate_cache(f"parking_history:user_{user_id}")
-        invalidate_cache(f"*user_{user_id}*")  # Wildcard for all user-specific caches
+        # Invalidate the lot listings and this user's cached views
+        invalidate_cache('reservation_created', user_id=request.current_user_id, lot_id=lot.id)
         
         print(f"DEBUG: Reservation created successfully with ID: {reservation.id}")
         
@@ -692,14 +468,9 @@ def mark_as_parked(reservation_id):
         
         db.session.commit()
         
-        # Invalidate relevant caches aggressively
-        user_id = request.current_user_id
-        invalidate_cache(f"lots_*")
-        invalidate_cache(f"dashboard:user_{user_id}")
-        invalidate_cache(f"dashboard*")  # Wildcard for all dashboard caches
-        invalidate_cache(f"reservations:user_{user_id}")
-        invalidate_cache(f"reservations*")  # Wildcard for all reservation caches
-        invalidate_cache(f"*user_{user_id}*")  # Wildcard for all user-specific caches
+        # Invalidate the lot listings and this user's cached views
+        invalidate_cache('reservation_updated', user_id=request.current_user_id,
+                         lot_id=spot.lot_id if spot else None)
         
         return jsonify({
             'message': 'Parking marked as occupied successfully',
@@ -777,15 +548,9 @@ def mark_as_released(reservation_id):
         print("DEBUG: About to commit to database")
         db.session.commit()
         
-        # Invalidate relevant caches aggressively
-        user_id = request.current_user_id
-        invalidate_cache(f"lots_*")
-        invalidate_cache(f"dashboard:user_{user_id}")
-        invalidate_cache(f"dashboard*")  # Wildcard for all dashboard caches
-        invalidate_cache(f"reservations:user_{user_id}")
-        invalidate_cache(f"reservations*")  # Wildcard for all reservation caches
-        invalidate_cache(f"parking_history:user_{user_id}")
-        invalidate_cache(f"*user_{user_id}*")  # Wildcard for all user-specific caches
+        # Invalidate the lot listings and this user's cached views
+        invalidate_cache('reservation_updated', user_id=request.current_user_id,
+                         lot_id=spot.lot_id if spot else None)
         
         print("DEBUG: Database commit successful")
         
@@ -839,9 +604,8 @@ def cancel_reservation(reservation_id):
         db.session.commit()
         
         # Invalidate relevant caches
-        invalidate_cache(f"lots_*")
-        invalidate_cache(f"dashboard:user_{request.current_user_id}")
-        invalidate_cache(f"reservations:user_{request.current_user_id}")
+        invalidate_cache('reservation_deleted', user_id=request.current_user_id,
+                         lot_id=spot.lot_id if spot else None)
         
         return jsonify({
             'message': 'Reservation cancelled successfully',
@@ -889,8 +653,7 @@ def extend_reservation(reservation_id):
         db.session.commit()
         
         # Invalidate relevant caches
-        invalidate_cache(f"dashboard:user_{request.current_user_id}")
-        invalidate_cache(f"reservations:user_{request.current_user_id}")
+        invalidate_cache('reservation_updated', user_id=request.current_user_id, lot_id=lot.id)
         
         return jsonify({
             'message': 'Reservation extended successfully',
@@ -910,10 +673,8 @@ def get_user_reservations():
     """Get user's reservations"""
     try:
         from models.reservation import Reservation
-        from models.parking_spot import ParkingSpot
-        from models.parking_lot import ParkingLot
         
-        reservations = Reservation.query.filter_by(
+        reservations = Reservation.query_with_spot_and_lot().filter_by(
             user_id=request.current_user_id
         ).order_by(Reservation.created_at.desc()).all()
         
@@ -924,9 +685,9 @@ def get_user_reservations():
                 res_data = reservation.to_dict()
                 
                 # Add parking lot and spot information
-                spot = ParkingSpot.query.get(reservation.spot_id)
+                spot = reservation.parking_spot
                 if spot:
-                    lot = ParkingLot.query.get(spot.lot_id)
+                    lot = spot.parking_lot
                     res_data['parking_spot'] = {
                         'id': spot.id,
                         'spot_number': spot.spot_number,
@@ -1025,7 +786,7 @@ def get_monthly_report():
     """Get monthly report for the current user"""
     try:
         from models.user import User
-        from tasks.monthly_reports import generate_monthly_report_data, generate_monthly_report_html
+        from tasks.monthly_reports import get_monthly_report
         from datetime import datetime
         
         user_id = request.current_user_id
@@ -1043,17 +804,15 @@ def get_monthly_report():
         if year < 2020 or year > datetime.now().year:
             return jsonify({'error': 'Invalid year'}), 400
         
-        # Generate report data
-        report_data = generate_monthly_report_data(user.id, month, year)
-        
         # Check if user wants HTML format
         format_type = request.args.get('format', 'json')
         
+        # Closed months come from the report store, the current one is built live
         if format_type == 'html':
-            # Generate HTML report
-            html_content = generate_monthly_report_html(user, report_data, month, year)
+            html_content = get_monthly_report(user, month, year, 'html')
             return html_content, 200, {'Content-Type': 'text/html'}
         else:
+            report_data = get_monthly_report(user, month, year)
             # Return JSON data
             return jsonify({
                 'month': month,
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Local SMTP sink for mail benchmarks
+Accepts and discards every message, optionally waiting a fixed time per
+message and per connection to mimic a real mail server. Point MAIL_SERVER /
+MAIL_PORT at it to time a broadcast without MailHog or a real relay:
+
+    python smtp_sink.py --port 2525 --message-latency 0.005
+"""
+
+import argparse
+import socketserver
+import threading
+import time
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough of RFC 5321 for smtplib: EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT"""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        sink = self.server.sink
+        sink._count('connections')
+        time.sleep(sink.connect_latency)
+        self.reply('220 smtp-sink ready')
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip().upper()
+
+            if command.startswith('EHLO'):
+                self.wfile.write(b'250-smtp-sink\r\n250-8BITMIME\r\n250 SMTPUTF8\r\n')
+            elif command.startswith(('HELO', 'MAIL', 'RCPT', 'RSET', 'NOOP')):
+                self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                size = 0
+                for data_line in iter(self.rfile.readline, b''):
+                    if data_line in (b'.\r\n', b'.\n'):
+                        break
+                    size += len(data_line)
+                time.sleep(sink.message_latency)
+                sink._count('messages', size)
+                self.reply('250 OK queued')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SMTPSink:
+    """Threaded SMTP server counting connections and messages"""
+
+    def __init__(self, host='127.0.0.1', port=0, message_latency=0.0, connect_latency=0.0):
+        self.message_latency = message_latency
+        self.connect_latency = connect_latency
+        self.connections = 0
+        self.messages = 0
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), _SMTPHandler)
+        self._server.sink = self
+        self._thread = None
+
+    @property
+    def address(self):
+        return self._server.server_address
+
+    def _count(self, counter, size=0):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+            self.bytes_received += size
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Discarding SMTP server for mail benchmarks')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=2525)
+    parser.add_argument('--message-latency', type=float, default=0.0,
+                        help='seconds to wait before accepting each message')
+    parser.add_argument('--connect-latency', type=float, default=0.0,
+                        help='seconds to wait before greeting each connection')
+    args = parser.parse_args()
+
+    sink = SMTPSink(args.host, args.port, args.message_latency, args.connect_latency)
+    print(f"📭 SMTP sink listening on {args.host}:{sink.address[1]} (Ctrl+C to stop)")
+    sink.start()
+    try:
+        while True:
+            time.sleep(5)
+            print(f"   {sink.connections} connections, {sink.messages} messages")
+    except KeyboardInterrupt:
+        sink.stop()
+
+
+if __name__ == '__main__':
+    main()
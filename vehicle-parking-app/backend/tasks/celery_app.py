@@ -12,7 +12,8 @@ def make_celery(app_name=__name__):
         include=[
             'tasks.daily_reminders',
             'tasks.monthly_reports',
-            'tasks.export_csv'
+            'tasks.export_csv',
+            'tasks.maintenance'
         ]
     )
     
@@ -58,12 +59,18 @@ def make_celery(app_name=__name__):
                 'task': 'tasks.monthly_reports.send_monthly_reports',
                 'schedule': crontab(hour=9, minute=0, day_of_month=1),  # 1st of every month at 9 AM
                 'options': {'queue': 'reports'}
+            },
+            'occupancy-counter-reconciliation': {
+                'task': 'tasks.maintenance.reconcile_occupancy_counters',
+                'schedule': crontab(minute='*/15'),  # Every 15 minutes
+                'options': {'queue': 'maintenance'}
             }
         },
         task_routes={
             'tasks.daily_reminders.*': {'queue': 'reminders'},
             'tasks.monthly_reports.*': {'queue': 'reports'},
-            'tasks.export_csv.*': {'queue': 'exports'}
+            'tasks.export_csv.*': {'queue': 'exports'},
+            'tasks.maintenance.*': {'queue': 'maintenance'}
         }
     )
     
@@ -1,9 +1,9 @@
 from celery import current_app as celery_app
 from datetime import datetime, timedelta
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from config import Config
+from utils.mailer import get_mail_transport
 
 # Optional imports - handle gracefully if not available
 try:
@@ -16,70 +16,114 @@ try:
 except ImportError:
     TwilioClient = None
 
+# Inactive users read per keyset page
+REMINDER_PAGE_SIZE = 500
+
+# Sender threads per SMS / Google Chat delivery queue
+REMINDER_CHANNEL_WORKERS = 4
+
+def inactive_users_query(cutoff):
+    """Active users with no reservation created since ``cutoff``, by id
+    
+    A correlated NOT EXISTS probe on reservations(user_id, created_at) per
+    user instead of two NOT IN subqueries over the whole reservations table.
+    Only the columns the reminder channels use are selected.
+    """
+    from models.user import User
+    from models.reservation import Reservation
+    from sqlalchemy import exists, select
+    
+    booked_recently = exists().where(
+        Reservation.user_id == User.id,
+        Reservation.created_at >= cutoff
+    )
+    return select(
+        User.id,
+        User.username,
+        User.email,
+        User.full_name,
+        User.phone_number
+    ).where(
+        User.role == 'user',
+        User.is_active == True,
+        ~booked_recently
+    ).order_by(User.id)
+
+def iter_inactive_user_pages(cutoff, page_size=None):
+    """Yield pages of inactive user rows, keyset-paginated on users.id"""
+    from models.user import User
+    from database import db
+    
+    page_size = page_size or REMINDER_PAGE_SIZE
+    query = inactive_users_query(cutoff)
+    last_id = 0
+    while True:
+        page = db.session.execute(query.where(User.id > last_id).limit(page_size)).all()
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        last_id = page[-1].id
+
 def _send_daily_reminders_impl():
     """Implementation of daily reminders logic"""
     try:
-        from models.user import User
-        from models.reservation import Reservation
         from models.parking_lot import ParkingLot
-        from database import db
+        from utils.delivery import ChannelQueue
         
-        # Get users who haven't made a reservation in the last 3 days
+        # Users who haven't made a reservation in the last 3 days
         three_days_ago = datetime.utcnow() - timedelta(days=3)
         
-        # Get users who haven't visited (no reservations) or haven't visited recently
-        inactive_users = db.session.query(User).filter(
-            User.role == 'user',
-            User.is_active == True,
-            db.or_(
-                # Users with no reservations at all
-                ~User.id.in_(
-                    db.session.query(Reservation.user_id).distinct()
-                ),
-                # Users with no recent reservations (last 3 days)
-                ~User.id.in_(
-                    db.session.query(Reservation.user_id).filter(
-                        Reservation.created_at >= three_days_ago
-                    )
-                )
-            )
-        ).all()
-        
         # Check if new parking lots were created in the last 24 hours
         yesterday = datetime.utcnow() - timedelta(days=1)
         new_parking_lots = ParkingLot.query.filter(
             ParkingLot.created_at >= yesterday
         ).all()
         
-        successful_sends = 0
-        failed_sends = 0
-        
-        for user in inactive_users:
-            try:
-                # Send reminder via SMS if configured and user has phone number
-                if Config.TWILIO_ACCOUNT_SID and user.phone_number:
-                    send_sms_reminder(user, new_parking_lots)
-                
-                # Send reminder via Google Chat if webhook is configured
-                if Config.GOOGLE_CHAT_WEBHOOK_URL:
-                    send_google_chat_reminder(user, new_parking_lots)
-                
-                # Send email reminder if email is configured
-                if Config.MAIL_SERVER and user.email:
-                    send_email_reminder(user, new_parking_lots)
-                
-                # Update user's last reminder sent timestamp if we add this field later
-                successful_sends += 1
-                
-            except Exception as e:
-                print(f"Failed to send reminder to {user.username}: {str(e)}")
-                failed_sends += 1
+        send_sms = bool(Config.TWILIO_ACCOUNT_SID)
+        send_chat = bool(Config.GOOGLE_CHAT_WEBHOOK_URL)
+        send_emails = bool(Config.MAIL_SERVER and Config.MAIL_USERNAME)
+        
+        users_processed = 0
+        failed_users = set()
+        
+        # Each channel delivers on its own threads while the next page is read;
+        # emails are batched over pooled SMTP sessions
+        sms_queue = ChannelQueue(lambda user: send_sms_reminder(user, new_parking_lots),
+                                 max_workers=REMINDER_CHANNEL_WORKERS, name='sms')
+        chat_queue = ChannelQueue(lambda user: send_google_chat_reminder(user, new_parking_lots),
+                                  max_workers=REMINDER_CHANNEL_WORKERS, name='google-chat')
+        with get_mail_transport().outbox() as outbox, sms_queue, chat_queue:
+            for page in iter_inactive_user_pages(three_days_ago):
+                for user in page:
+                    users_processed += 1
+                    try:
+                        # Send reminder via SMS if configured and user has phone number
+                        if send_sms and user.phone_number:
+                            sms_queue.add(user, key=user.username)
+                        
+                        # Send reminder via Google Chat if webhook is configured
+                        if send_chat:
+                            chat_queue.add(user, key=user.username)
+                        
+                        # Queue email reminder if email is configured
+                        if send_emails and user.email:
+                            outbox.add(build_reminder_email(user, new_parking_lots), key=user.username)
+                        
+                    except Exception as e:
+                        print(f"Failed to send reminder to {user.username}: {str(e)}")
+                        failed_users.add(user.username)
+        
+        for channel in (sms_queue, chat_queue, outbox):
+            for username, error in channel.failed.items():
+                print(f"Failed to send reminder to {username}: {error}")
+                failed_users.add(username)
         
         return {
             'status': 'completed',
-            'users_processed': len(inactive_users),
-            'successful_sends': successful_sends,
-            'failed_sends': failed_sends,
+            'users_processed': users_processed,
+            'successful_sends': users_processed - len(failed_users),
+            'failed_sends': len(failed_users),
             'new_parking_lots': len(new_parking_lots),
             'timestamp': datetime.utcnow().isoformat()
         }
@@ -205,6 +249,11 @@ def send_email_reminder(user, new_parking_lots=None, dry_run=False):
         print(f"✅ Email would be sent to {user.email} (Subject: Parking Reminder)")
         return True
     
+    get_mail_transport().send(build_reminder_email(user, new_parking_lots))
+    return True
+
+def build_reminder_email(user, new_parking_lots=None):
+    """Build the reminder email message for a user"""
     subject = "🚗 Parking Reminder - Don't Forget to Book Your Spot!"
     
     # Build new locations section if available
@@ -278,13 +327,7 @@ def send_email_reminder(user, new_parking_lots=None, dry_run=False):
     html_part = MIMEText(html_body, 'html')
     msg.attach(html_part)
     
-    # Send email
-    with smtplib.SMTP(Config.MAIL_SERVER, Config.MAIL_PORT) as server:
-        if Config.MAIL_USE_TLS:
-            server.starttls()
-        if Config.MAIL_USERNAME and Config.MAIL_PASSWORD:
-            server.login(Config.MAIL_USERNAME, Config.MAIL_PASSWORD)
-        server.send_message(msg)
+    return msg
 
 @celery_app.task(bind=True)
 def send_admin_daily_summary(self):
@@ -292,9 +335,8 @@ def send_admin_daily_summary(self):
     try:
         from models.user import User
         from models.reservation import Reservation
-        from models.parking_lot import ParkingLot
-        from models.parking_spot import ParkingSpot
         from database import db
+        from utils.status_counts import get_reservation_status_counts, get_spot_status_counts
         
         # Get today's statistics
         today = datetime.utcnow().date()
@@ -307,7 +349,7 @@ def send_admin_daily_summary(self):
             Reservation.created_at <= today_end
         ).count()
         
-        active_reservations = Reservation.query.filter_by(status='active').count()
+        active_reservations = get_reservation_status_counts()['reservations']['active']
         total_revenue_today = db.session.query(
             db.func.sum(Reservation.parking_cost)
         ).filter(
@@ -316,8 +358,9 @@ def send_admin_daily_summary(self):
             Reservation.status == 'completed'
         ).scalar() or 0
         
-        total_spots = ParkingSpot.query.filter_by(is_active=True).count()
-        occupied_spots = ParkingSpot.query.filter_by(status='O', is_active=True).count()
+        active_spots = get_spot_status_counts()['active_spots']
+        total_spots = active_spots['total']
+        occupied_spots = active_spots['O']
         
         # Get admin user
         admin = User.query.filter_by(role='admin').first()
@@ -397,12 +440,7 @@ def send_admin_summary_email(admin, stats):
     msg.attach(html_part)
     
     # Send email
-    with smtplib.SMTP(Config.MAIL_SERVER, Config.MAIL_PORT) as server:
-        if Config.MAIL_USE_TLS:
-            server.starttls()
-        if Config.MAIL_USERNAME and Config.MAIL_PASSWORD:
-            server.login(Config.MAIL_USERNAME, Config.MAIL_PASSWORD)
-        server.send_message(msg)
+    get_mail_transport().send(msg)
 
 @celery_app.task(bind=True)
 def send_new_parking_lot_notifications(self):
@@ -429,27 +467,36 @@ def send_new_parking_lot_notifications(self):
         active_users = User.query.filter_by(role='user', is_active=True).all()
         
         successful_sends = 0
-        failed_sends = 0
-        
-        for user in active_users:
-            try:
-                # Send notification via SMS if configured and user has phone number
-                if Config.TWILIO_ACCOUNT_SID and user.phone_number:
-                    send_new_lot_sms(user, new_parking_lots)
-                
-                # Send notification via Google Chat if webhook is configured
-                if Config.GOOGLE_CHAT_WEBHOOK_URL:
-                    send_new_lot_google_chat(user, new_parking_lots)
-                
-                # Send email notification if email is configured
-                if Config.MAIL_SERVER and user.email:
-                    send_new_lot_email(user, new_parking_lots)
-                
-                successful_sends += 1
-                
-            except Exception as e:
-                print(f"Failed to send new lot notification to {user.username}: {str(e)}")
-                failed_sends += 1
+        failed_users = set()
+        
+        # Emails are queued and go out in batches over pooled SMTP sessions
+        with get_mail_transport().outbox() as outbox:
+            for user in active_users:
+                try:
+                    # Send notification via SMS if configured and user has phone number
+                    if Config.TWILIO_ACCOUNT_SID and user.phone_number:
+                        send_new_lot_sms(user, new_parking_lots)
+                    
+                    # Send notification via Google Chat if webhook is configured
+                    if Config.GOOGLE_CHAT_WEBHOOK_URL:
+                        send_new_lot_google_chat(user, new_parking_lots)
+                    
+                    # Queue email notification if email is configured
+                    if Config.MAIL_SERVER and user.email:
+                        outbox.add(build_new_lot_email(user, new_parking_lots), key=user.username)
+                    
+                    successful_sends += 1
+                    
+                except Exception as e:
+                    print(f"Failed to send new lot notification to {user.username}: {str(e)}")
+                    failed_users.add(user.username)
+        
+        for username, error in outbox.failed.items():
+            print(f"Failed to send new lot notification to {username}: {error}")
+            if username not in failed_users:
+                failed_users.add(username)
+                successful_sends -= 1
+        failed_sends = len(failed_users)
         
         return {
             'status': 'completed',
@@ -533,6 +580,10 @@ def send_new_lot_email(user, new_parking_lots):
     if not user.email:
         return
     
+    get_mail_transport().send(build_new_lot_email(user, new_parking_lots))
+
+def build_new_lot_email(user, new_parking_lots):
+    """Build the new parking lot notification email for a user"""
     subject = "🆕 New Parking Locations Available!"
     
     locations_html = ""
@@ -581,9 +632,4 @@ def send_new_lot_email(user, new_parking_lots):
     html_part = MIMEText(html_body, 'html')
     msg.attach(html_part)
     
-    with smtplib.SMTP(Config.MAIL_SERVER, Config.MAIL_PORT) as server:
-        if Config.MAIL_USE_TLS:
-            server.starttls()
-        if Config.MAIL_USERNAME and Config.MAIL_PASSWORD:
-            server.login(Config.MAIL_USERNAME, Config.MAIL_PASSWORD)
-        server.send_message(msg)
+    return msg
@@ -1,24 +1,126 @@
 from celery import current_app as celery_app
 from datetime import datetime, timedelta
+from decimal import Decimal
 import csv
-import io
+import gzip
+import json
 import os
-import smtplib
+import shutil
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email import encoders
 from config import Config
 
+# Rows fetched per round trip while streaming an export
+EXPORT_CHUNK_SIZE = 1000
+
+# CSV exports at least this large also get a .gz sibling for gzip downloads
+GZIP_SIBLING_MIN_BYTES = 64 * 1024
+
+# File extension and MIME type of each export format
+EXPORT_FORMATS = {
+    'csv': ('.csv', 'text/csv'),
+    'csv.gz': ('.csv.gz', 'application/gzip'),
+    'parquet': ('.parquet', 'application/vnd.apache.parquet')
+}
+
+def export_format_available(export_format):
+    """Whether ``export_format`` is known and the libraries it needs are installed"""
+    if export_format not in EXPORT_FORMATS:
+        return False
+    if export_format == 'parquet':
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            return False
+    return True
+
+def export_mimetype(filename):
+    """MIME type of an export file, from its extension"""
+    for extension, mimetype in EXPORT_FORMATS.values():
+        if filename.endswith(extension):
+            return mimetype
+    return 'application/octet-stream'
+
+class ExportWriter:
+    """Write export rows batch by batch as CSV, gzip-compressed CSV or Parquet.
+    
+    ``columns`` is a list of (header, type) pairs, type being one of 'int',
+    'float', 'str' or 'datetime'. The CSV formats write ``csv_row(row)`` for
+    every row; Parquet writes ``columnar_row(row)`` (typed values, None for
+    missing ones) as one row group per batch.
+    """
+    
+    def __init__(self, file_path, export_format, columns, csv_row, columnar_row):
+        self.export_format = export_format
+        self.csv_row = csv_row
+        self.columnar_row = columnar_row
+        
+        if export_format == 'parquet':
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise ValueError('Parquet exports require the pyarrow package')
+            
+            arrow_types = {
+                'int': pa.int64(),
+                'float': pa.float64(),
+                'str': pa.string(),
+                'datetime': pa.timestamp('us')
+            }
+            self._pa = pa
+            self._schema = pa.schema([(name, arrow_types[kind]) for name, kind in columns])
+            self._parquet = pq.ParquetWriter(file_path, self._schema, compression='snappy')
+        elif export_format in ('csv', 'csv.gz'):
+            if export_format == 'csv.gz':
+                self._file = gzip.open(file_path, 'wt', newline='', encoding='utf-8', compresslevel=6)
+            else:
+                self._file = open(file_path, 'w', newline='', encoding='utf-8')
+            self._csv = csv.writer(self._file)
+            self._csv.writerow([name for name, _ in columns])
+        else:
+            raise ValueError(f"Unsupported export format: {export_format}")
+    
+    def write_batch(self, rows):
+        if self.export_format == 'parquet':
+            records = [self.columnar_row(row) for row in rows]
+            arrays = [
+                self._pa.array([record[index] for record in records], type=field.type)
+                for index, field in enumerate(self._schema)
+            ]
+            self._parquet.write_table(self._pa.Table.from_arrays(arrays, schema=self._schema))
+        else:
+            self._csv.writerows(self.csv_row(row) for row in rows)
+    
+    def close(self):
+        if self.export_format == 'parquet':
+            self._parquet.close()
+        else:
+            self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+def _columnar_values(row):
+    """Query row as plain Parquet values (Numeric columns come back as Decimal)"""
+    return [float(value) if isinstance(value, Decimal) else value for value in row]
+
 @celery_app.task(bind=True)
-def generate_user_csv_export(self, user_id):
-    """Generate CSV export of user's parking history"""
+def generate_user_csv_export(self, user_id, incremental=True, export_format='csv'):
+    """Generate CSV export of user's parking history
+    
+    With ``incremental`` the user's previous export is reused when nothing
+    changed, or brought up to date with just the reservations created or
+    updated since it was written. Pass ``incremental=False`` to rebuild it.
+    ``export_format`` is one of EXPORT_FORMATS.
+    """
     try:
         from models.user import User
-        from models.reservation import Reservation
-        from models.parking_spot import ParkingSpot
-        from models.parking_lot import ParkingLot
-        from database import db
         
         # Update task state
         self.update_state(
@@ -34,42 +136,16 @@ def generate_user_csv_export(self, user_id):
         # Update task state
         self.update_state(
             state='PROGRESS',
-            meta={'status': 'Fetching reservations...', 'current': 30, 'total': 100}
-        )
-        
-        # Get all user's reservations
-        reservations = Reservation.query.filter_by(user_id=user_id).order_by(
-            Reservation.created_at.desc()
-        ).all()
-        
-        # Update task state
-        self.update_state(
-            state='PROGRESS',
-            meta={'status': 'Generating CSV...', 'current': 60, 'total': 100}
-        )
-        
-        # Create CSV data
-        csv_data = generate_csv_data(reservations)
-        
-        # Update task state
-        self.update_state(
-            state='PROGRESS',
-            meta={'status': 'Saving file...', 'current': 80, 'total': 100}
+            meta={'status': 'Generating CSV...', 'current': 30, 'total': 100}
         )
         
-        # Save CSV file
-        timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-        filename = f"parking_history_{user.username}_{timestamp}.csv"
-        
         # Create exports directory if it doesn't exist
         exports_dir = os.path.join(os.path.dirname(__file__), '..', 'exports')
         os.makedirs(exports_dir, exist_ok=True)
         
-        file_path = os.path.join(exports_dir, filename)
-        
-        # Write CSV file
-        with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-            csvfile.write(csv_data)
+        export = write_user_export(user, exports_dir, incremental=incremental,
+                                   export_format=export_format)
+        filename, file_path = export['filename'], export['file_path']
         
         # Update task state
         self.update_state(
@@ -89,7 +165,9 @@ def generate_user_csv_export(self, user_id):
             'file_path': file_path,
             'filename': filename,
             'download_url': f'/api/user/download-csv/{filename}',
-            'records_count': len(reservations),
+            'records_count': export['records_count'],
+            'export_mode': export['mode'],
+            'format': export_format,
             'generated_at': datetime.utcnow().isoformat()
         }
         
@@ -100,80 +178,380 @@ def generate_user_csv_export(self, user_id):
             'timestamp': datetime.utcnow().isoformat()
         }
 
-def generate_csv_data(reservations):
-    """Generate comprehensive CSV data from reservations with detailed parking information"""
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write header - Enhanced format with requested fields
-    headers = [
-        'Reservation ID',
-        'Slot ID (Lot ID)',
-        'Spot ID',
-        'Spot Number',
-        'Parking Lot Name',
-        'Location Address',
-        'Vehicle Number',
-        'Created Date',
-        'Created Time',
-        'Parking Timestamp',
-        'Leaving Timestamp',
-        'Duration (Hours)',
-        'Cost (Rs.)',
-        'Hourly Rate (Rs.)',
-        'Status',
-        'Remarks',
-        'Payment Status',
-        'Booking Type'
+USER_EXPORT_COLUMNS = [
+    ('Reservation ID', 'int'),
+    ('Slot ID (Lot ID)', 'int'),
+    ('Spot ID', 'int'),
+    ('Spot Number', 'str'),
+    ('Parking Lot Name', 'str'),
+    ('Location Address', 'str'),
+    ('Vehicle Number', 'str'),
+    ('Created Date', 'str'),
+    ('Created Time', 'str'),
+    ('Parking Timestamp', 'datetime'),
+    ('Leaving Timestamp', 'datetime'),
+    ('Duration (Hours)', 'float'),
+    ('Cost (Rs.)', 'float'),
+    ('Hourly Rate (Rs.)', 'float'),
+    ('Status', 'str'),
+    ('Remarks', 'str'),
+    ('Payment Status', 'str'),
+    ('Booking Type', 'str')
+]
+
+USER_CSV_HEADERS = [name for name, _ in USER_EXPORT_COLUMNS]
+
+# Incremental exports re-read rows updated this long before the watermark, so
+# a transaction that committed late with an older updated_at is not missed
+INCREMENTAL_OVERLAP = timedelta(minutes=5)
+
+def user_export_query(user_id, updated_since=None):
+    """A user's reservations joined with spot and lot, newest first"""
+    from sqlalchemy import select
+    from models.reservation import Reservation
+    from models.parking_spot import ParkingSpot
+    from models.parking_lot import ParkingLot
+    
+    query = select(
+        Reservation.id,
+        ParkingSpot.lot_id,
+        Reservation.spot_id,
+        ParkingSpot.spot_number,
+        ParkingLot.prime_location_name,
+        ParkingLot.address,
+        Reservation.vehicle_number,
+        Reservation.created_at,
+        Reservation.parking_timestamp,
+        Reservation.leaving_timestamp,
+        Reservation.total_hours,
+        Reservation.parking_cost,
+        ParkingLot.price,
+        Reservation.status,
+        Reservation.remarks
+    ).select_from(Reservation).outerjoin(
+        ParkingSpot, Reservation.spot_id == ParkingSpot.id
+    ).outerjoin(
+        ParkingLot, ParkingSpot.lot_id == ParkingLot.id
+    ).where(Reservation.user_id == user_id)
+    
+    if updated_since is not None:
+        query = query.where(Reservation.updated_at > updated_since)
+    
+    return query.order_by(Reservation.created_at.desc(), Reservation.id.desc())
+
+def user_export_fingerprint(user_id):
+    """Row count and newest reservation update behind a user's export"""
+    from sqlalchemy import func, select
+    from models.reservation import Reservation
+    
+    return select(
+        func.count(Reservation.id),
+        func.max(Reservation.updated_at)
+    ).where(Reservation.user_id == user_id)
+
+def user_export_places(user_id):
+    """The spot and lot values a user's export writes, one row per spot used"""
+    from sqlalchemy import select
+    from models.reservation import Reservation
+    from models.parking_spot import ParkingSpot
+    from models.parking_lot import ParkingLot
+    
+    return select(
+        ParkingSpot.id,
+        ParkingSpot.spot_number,
+        ParkingSpot.lot_id,
+        ParkingLot.prime_location_name,
+        ParkingLot.address,
+        ParkingLot.price
+    ).distinct().select_from(Reservation).join(
+        ParkingSpot, Reservation.spot_id == ParkingSpot.id
+    ).outerjoin(
+        ParkingLot, ParkingSpot.lot_id == ParkingLot.id
+    ).where(Reservation.user_id == user_id).order_by(ParkingSpot.id)
+
+def _export_places(rows):
+    """{spot id: exported spot/lot values} from user_export_places() rows.
+    
+    Compared between exports instead of the lots' updated_at, which also moves
+    on edits the export never shows.
+    """
+    return {str(row[0]): [str(value) for value in row[1:]] for row in rows}
+
+def _payment_status(status):
+    """Payment status shown for a reservation status"""
+    return 'Paid' if status == 'completed' else 'Pending' if status == 'active' else 'Cancelled'
+
+def user_csv_row(row):
+    """Format one user_export_query() row for the CSV"""
+    (reservation_id, lot_id, spot_id, spot_number, lot_name, address, vehicle_number,
+     created_at, parking_timestamp, leaving_timestamp, total_hours, parking_cost,
+     price, status, remarks) = row
+    
+    # Determine payment status based on reservation status
+    payment_status = _payment_status(status)
+    
+    return [
+        reservation_id,
+        lot_id if lot_id is not None else 'N/A',
+        spot_id,
+        spot_number if spot_number is not None else 'N/A',
+        lot_name if lot_name is not None else 'Unknown Location',
+        address if address is not None else 'Unknown Address',
+        vehicle_number or 'N/A',
+        created_at.strftime('%Y-%m-%d') if created_at else '',
+        created_at.strftime('%H:%M:%S') if created_at else '',
+        parking_timestamp.strftime('%Y-%m-%d %H:%M:%S') if parking_timestamp else '',
+        leaving_timestamp.strftime('%Y-%m-%d %H:%M:%S') if leaving_timestamp else '',
+        float(total_hours) if total_hours else 0.0,
+        float(parking_cost) if parking_cost else 0.0,
+        float(price) if price is not None else 0.0,
+        status.title(),
+        remarks or '',
+        payment_status,
+        'Online Booking'  # Since all bookings are through the app
+    ]
+
+def user_columnar_row(row):
+    """One user_export_query() row as typed values for columnar formats"""
+    (reservation_id, lot_id, spot_id, spot_number, lot_name, address, vehicle_number,
+     created_at, parking_timestamp, leaving_timestamp, total_hours, parking_cost,
+     price, status, remarks) = _columnar_values(row)
+    return [
+        reservation_id,
+        lot_id,
+        spot_id,
+        spot_number,
+        lot_name,
+        address,
+        vehicle_number,
+        created_at.strftime('%Y-%m-%d') if created_at else None,
+        created_at.strftime('%H:%M:%S') if created_at else None,
+        parking_timestamp,
+        leaving_timestamp,
+        total_hours,
+        parking_cost,
+        price,
+        status.title(),
+        remarks,
+        _payment_status(status),
+        'Online Booking'
     ]
-    writer.writerow(headers)
+
+def _export_manifest_path(exports_dir, user_id):
+    return os.path.join(exports_dir, 'manifests', f'user_{user_id}.json')
+
+def _load_export_manifest(exports_dir, user):
+    """The user's last export manifest if its file is still on disk"""
+    try:
+        with open(_export_manifest_path(exports_dir, user.id), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
     
-    # Write data rows with comprehensive information
-    for reservation in reservations:
-        from models.parking_spot import ParkingSpot
-        from models.parking_lot import ParkingLot
-        
-        # Get parking spot and lot information
-        spot = ParkingSpot.query.get(reservation.spot_id)
-        lot = ParkingLot.query.get(spot.lot_id) if spot else None
-        
-        # Format timestamps with full ISO format
-        created_datetime = reservation.created_at.strftime('%Y-%m-%d %H:%M:%S') if reservation.created_at else ''
-        created_date = reservation.created_at.strftime('%Y-%m-%d') if reservation.created_at else ''
-        created_time = reservation.created_at.strftime('%H:%M:%S') if reservation.created_at else ''
-        
-        parking_timestamp = reservation.parking_timestamp.strftime('%Y-%m-%d %H:%M:%S') if reservation.parking_timestamp else ''
-        leaving_timestamp = reservation.leaving_timestamp.strftime('%Y-%m-%d %H:%M:%S') if reservation.leaving_timestamp else ''
-        
-        # Determine payment status based on reservation status
-        payment_status = 'Paid' if reservation.status == 'completed' else 'Pending' if reservation.status == 'active' else 'Cancelled'
-        
-        # Determine booking type
-        booking_type = 'Online Booking'  # Since all bookings are through the app
-        
-        row = [
-            reservation.id,
-            spot.lot_id if spot else 'N/A',
-            reservation.spot_id,
-            spot.spot_number if spot else 'N/A',
-            lot.prime_location_name if lot else 'Unknown Location',
-            lot.address if lot else 'Unknown Address',
-            reservation.vehicle_number or 'N/A',
-            created_date,
-            created_time,
-            parking_timestamp,
-            leaving_timestamp,
-            float(reservation.total_hours) if reservation.total_hours else 0.0,
-            float(reservation.parking_cost) if reservation.parking_cost else 0.0,
-            float(lot.price) if lot else 0.0,
-            reservation.status.title(),
-            reservation.remarks or '',
-            payment_status,
-            booking_type
-        ]
-        writer.writerow(row)
-    
-    return output.getvalue()
+    # Files are named after the user, so a rename invalidates the export
+    if manifest.get('username') != user.username:
+        return None
+    if not os.path.exists(os.path.join(exports_dir, manifest.get('filename', ''))):
+        return None
+    return manifest
+
+def _save_export_manifest(exports_dir, user_id, manifest):
+    path = _export_manifest_path(exports_dir, user_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.part", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(f"{path}.part", path)
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+def _write_full_user_export(file_path, user_id, export_format='csv'):
+    """Stream every reservation of the user to ``file_path``.
+    
+    Returns the row count and the highest reservation id written.
+    """
+    from database import db
+    
+    rows_written = 0
+    max_id = 0
+    with ExportWriter(file_path, export_format, USER_EXPORT_COLUMNS,
+                      user_csv_row, user_columnar_row) as writer:
+        query = user_export_query(user_id).execution_options(yield_per=EXPORT_CHUNK_SIZE)
+        for chunk in db.session.execute(query).partitions():
+            writer.write_batch(chunk)
+            rows_written += len(chunk)
+            max_id = max([max_id] + [row[0] for row in chunk])
+    return rows_written, max_id
+
+def _merge_user_export(file_path, previous_path, changed_rows, max_exported_id):
+    """Write the previous export with ``changed_rows`` spliced in.
+    
+    Rows newer than the previous export go on top, keeping the newest-first
+    order; rows it already contains are replaced in place. Returns the row
+    count of the merged file.
+    """
+    new_rows = [row for row in changed_rows if row[0] > max_exported_id]
+    updated = {str(row[0]): row for row in changed_rows if row[0] <= max_exported_id}
+    
+    rows_written = 0
+    with open(previous_path, newline='', encoding='utf-8') as source, \
+            open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
+        reader = csv.reader(source)
+        writer = csv.writer(csvfile)
+        writer.writerow(next(reader))
+        
+        writer.writerows(user_csv_row(row) for row in new_rows)
+        rows_written += len(new_rows)
+        
+        for record in reader:
+            row = updated.get(record[0])
+            writer.writerow(user_csv_row(row) if row is not None else record)
+            rows_written += 1
+    return rows_written
+
+def write_user_export(user, exports_dir, incremental=True, export_format='csv'):
+    """Write the user's export in ``export_format`` and return where it is.
+    
+    CSV exports are kept up to date incrementally (see _write_user_csv_export);
+    the gzip format is a compressed copy of that CSV, made once per version.
+    Parquet exports are written in full. Returns a dict with filename,
+    file_path, records_count and mode ('reused', 'incremental' or 'full').
+    """
+    if export_format == 'parquet':
+        timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+        filename = f"parking_history_{user.username}_{timestamp}.parquet"
+        file_path = os.path.join(exports_dir, filename)
+        temp_path = f"{file_path}.part"
+        try:
+            records_count, _ = _write_full_user_export(temp_path, user.id, export_format)
+            os.replace(temp_path, file_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return {
+            'filename': filename,
+            'file_path': file_path,
+            'records_count': records_count,
+            'mode': 'full'
+        }
+    
+    if export_format not in ('csv', 'csv.gz'):
+        raise ValueError(f"Unsupported export format: {export_format}")
+    
+    export = _write_user_csv_export(user, exports_dir, incremental=incremental)
+    
+    gz_path = f"{export['file_path']}.gz"
+    if os.path.exists(gz_path):
+        # A sibling that survived is current: new CSV versions remove it
+        os.utime(gz_path)
+    elif export_format == 'csv.gz' or os.path.getsize(export['file_path']) >= GZIP_SIBLING_MIN_BYTES:
+        _gzip_file(export['file_path'], gz_path)
+    
+    if export_format == 'csv':
+        return export
+    return dict(export, filename=f"{export['filename']}.gz", file_path=gz_path)
+
+def _gzip_file(source_path, gz_path):
+    """Write a gzip-compressed copy of ``source_path`` to ``gz_path``"""
+    temp_path = f"{gz_path}.part"
+    try:
+        with open(source_path, 'rb') as source, gzip.open(temp_path, 'wb', compresslevel=6) as target:
+            shutil.copyfileobj(source, target)
+        os.replace(temp_path, gz_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def _write_user_csv_export(user, exports_dir, incremental=True):
+    """Bring the user's CSV export up to date and return where it is.
+    
+    A per-user manifest records the last export's file, row count and update
+    watermarks. If nothing changed since, that file is returned as is. If only
+    reservations were added or updated, just those rows are fetched and merged
+    into a copy of the previous file. Anything else (deleted reservations, a
+    changed spot number or lot name, address or price, a missing file or
+    ``incremental=False``) rebuilds the export from scratch. Returns a dict
+    with filename, file_path, records_count and mode ('reused', 'incremental'
+    or 'full').
+    """
+    from database import db
+    
+    records_count, last_updated = db.session.execute(user_export_fingerprint(user.id)).one()
+    fingerprint = {
+        'records_count': records_count,
+        'last_updated': _isoformat(last_updated),
+        'places': _export_places(db.session.execute(user_export_places(user.id)).all())
+    }
+    
+    manifest = _load_export_manifest(exports_dir, user) if incremental else None
+    
+    if manifest and all(manifest.get(key) == value for key, value in fingerprint.items()):
+        previous_path = os.path.join(exports_dir, manifest['filename'])
+        # Keep cleanup_old_exports from removing an export that is still current
+        os.utime(previous_path)
+        return {
+            'filename': manifest['filename'],
+            'file_path': previous_path,
+            'records_count': records_count,
+            'mode': 'reused'
+        }
+    
+    timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+    filename = f"parking_history_{user.username}_{timestamp}.csv"
+    file_path = os.path.join(exports_dir, filename)
+    temp_path = f"{file_path}.part"
+    
+    mode = 'full'
+    max_exported_id = 0
+    try:
+        # Spots already in the file must still read the same; new spots come with new rows
+        previous_places = manifest.get('places') if manifest else None
+        unchanged_places = previous_places is not None and all(
+            fingerprint['places'].get(spot_id) == values for spot_id, values in previous_places.items()
+        )
+        if unchanged_places and manifest.get('last_updated'):
+            previous_path = os.path.join(exports_dir, manifest['filename'])
+            since = datetime.fromisoformat(manifest['last_updated']) - INCREMENTAL_OVERLAP
+            changed_rows = db.session.execute(user_export_query(user.id, updated_since=since)).all()
+            
+            max_exported_id = manifest.get('max_id', 0)
+            if _merge_user_export(temp_path, previous_path, changed_rows, max_exported_id) == records_count:
+                mode = 'incremental'
+                max_exported_id = max([max_exported_id] + [row[0] for row in changed_rows])
+        
+        if mode == 'full':
+            # Rows were deleted or spot/lot values changed underneath the old export
+            records_count, max_exported_id = _write_full_user_export(temp_path, user.id)
+        
+        os.replace(temp_path, file_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    
+    # Drop the superseded file and compressed copies of the old contents
+    stale_paths = [f"{file_path}.gz"]
+    if manifest:
+        previous_path = os.path.join(exports_dir, manifest['filename'])
+        stale_paths += [previous_path, f"{previous_path}.gz"]
+    for path in stale_paths:
+        if path != file_path and os.path.exists(path):
+            os.remove(path)
+    
+    _save_export_manifest(exports_dir, user.id, dict(
+        fingerprint,
+        records_count=records_count,
+        username=user.username,
+        filename=filename,
+        max_id=max_exported_id,
+        generated_at=datetime.utcnow().isoformat()
+    ))
+    
+    return {
+        'filename': filename,
+        'file_path': file_path,
+        'records_count': records_count,
+        'mode': mode
+    }
 
 def send_csv_export_email(user, file_path, filename):
     """Send email with CSV export attachment and detailed information"""
@@ -245,7 +623,7 @@ def send_csv_export_email(user, file_path, filename):
     
     # Add CSV file as attachment with proper MIME type
     with open(file_path, 'rb') as attachment:
-        part = MIMEBase('text', 'csv')  # Better MIME type for CSV files
+        part = MIMEBase(*export_mimetype(filename).split('/'))
         part.set_payload(attachment.read())
     
     encoders.encode_base64(part)
@@ -257,21 +635,8 @@ def send_csv_export_email(user, file_path, filename):
     
     # Send email
     try:
-        # Handle MailHog vs real SMTP servers differently
-        if Config.MAIL_SERVER == 'localhost' or Config.MAIL_PORT == 1025:
-            # MailHog - simple connection without TLS
-            server = smtplib.SMTP()
-            server.connect(Config.MAIL_SERVER or 'localhost', Config.MAIL_PORT or 1025)
-            server.send_message(msg)
-            server.quit()
-        else:
-            # Real SMTP server - use TLS and authentication
-            with smtplib.SMTP(Config.MAIL_SERVER, Config.MAIL_PORT) as server:
-                if Config.MAIL_USE_TLS:
-                    server.starttls()
-                if Config.MAIL_USERNAME and Config.MAIL_PASSWORD:
-                    server.login(Config.MAIL_USERNAME, Config.MAIL_PASSWORD)
-                server.send_message(msg)
+        from utils.mailer import get_mail_transport
+        get_mail_transport().send(msg)
     except Exception as e:
         print(f"Email sending error: {e}")
         # Don't fail the entire task if email fails
@@ -294,66 +659,188 @@ def cleanup_old_exports(exports_dir, days_to_keep=7):
     except Exception as e:
         print(f"Error cleaning up old exports: {str(e)}")
 
-@celery_app.task(bind=True)
-def generate_admin_csv_export(self, filters=None):
-    """Generate CSV export of all reservations for admin"""
-    try:
-        from models.reservation import Reservation
-        from models.parking_spot import ParkingSpot
-        from models.parking_lot import ParkingLot
-        from models.user import User
-        from database import db
-        
-        # Update task state
-        self.update_state(
-            state='PROGRESS',
-            meta={'status': 'Fetching reservations...', 'current': 20, 'total': 100}
-        )
-        
-        # Build query based on filters
-        query = Reservation.query
-        
-        if filters:
-            if filters.get('start_date'):
-                start_date = datetime.strptime(filters['start_date'], '%Y-%m-%d')
-                query = query.filter(Reservation.created_at >= start_date)
-            
-            if filters.get('end_date'):
-                end_date = datetime.strptime(filters['end_date'], '%Y-%m-%d')
-                query = query.filter(Reservation.created_at <= end_date)
-            
-            if filters.get('status'):
-                query = query.filter(Reservation.status == filters['status'])
+ADMIN_EXPORT_COLUMNS = [
+    ('Reservation ID', 'int'),
+    ('User ID', 'int'),
+    ('Username', 'str'),
+    ('User Email', 'str'),
+    ('Parking Lot', 'str'),
+    ('Parking Spot', 'str'),
+    ('Vehicle Number', 'str'),
+    ('Parking Timestamp', 'datetime'),
+    ('Leaving Timestamp', 'datetime'),
+    ('Duration (Hours)', 'float'),
+    ('Cost ($)', 'float'),
+    ('Status', 'str'),
+    ('Remarks', 'str'),
+    ('Location Address', 'str'),
+    ('Lot Price per Hour', 'float'),
+    ('Created At', 'datetime'),
+    ('Updated At', 'datetime')
+]
+
+ADMIN_CSV_HEADERS = [name for name, _ in ADMIN_EXPORT_COLUMNS]
+
+def admin_export_query(filters=None):
+    """Reservations joined with user, spot and lot as one flat SELECT"""
+    from sqlalchemy import select
+    from models.reservation import Reservation
+    from models.parking_spot import ParkingSpot
+    from models.parking_lot import ParkingLot
+    from models.user import User
+    
+    query = select(
+        Reservation.id,
+        Reservation.user_id,
+        User.username,
+        User.email,
+        ParkingLot.prime_location_name,
+        ParkingSpot.spot_number,
+        Reservation.vehicle_number,
+        Reservation.parking_timestamp,
+        Reservation.leaving_timestamp,
+        Reservation.total_hours,
+        Reservation.parking_cost,
+        Reservation.status,
+        Reservation.remarks,
+        ParkingLot.address,
+        ParkingLot.price,
+        Reservation.created_at,
+        Reservation.updated_at
+    ).select_from(Reservation).outerjoin(
+        User, Reservation.user_id == User.id
+    ).outerjoin(
+        ParkingSpot, Reservation.spot_id == ParkingSpot.id
+    ).outerjoin(
+        ParkingLot, ParkingSpot.lot_id == ParkingLot.id
+    )
+    
+    if filters:
+        if filters.get('start_date'):
+            start_date = datetime.strptime(filters['start_date'], '%Y-%m-%d')
+            query = query.where(Reservation.created_at >= start_date)
         
-        reservations = query.order_by(Reservation.created_at.desc()).all()
+        if filters.get('end_date'):
+            end_date = datetime.strptime(filters['end_date'], '%Y-%m-%d')
+            query = query.where(Reservation.created_at <= end_date)
         
+        if filters.get('status'):
+            query = query.where(Reservation.status == filters['status'])
+    
+    return query.order_by(Reservation.created_at.desc(), Reservation.id.desc())
+
+def admin_csv_row(row):
+    """Format one admin_export_query() row for the CSV"""
+    (reservation_id, user_id, username, email, lot_name, spot_number, vehicle_number,
+     parking_timestamp, leaving_timestamp, total_hours, parking_cost, status, remarks,
+     address, price, created_at, updated_at) = row
+    return [
+        reservation_id,
+        user_id,
+        username if username is not None else 'Unknown',
+        email if email is not None else 'Unknown',
+        lot_name if lot_name is not None else 'Unknown',
+        spot_number if spot_number is not None else 'Unknown',
+        vehicle_number,
+        parking_timestamp.isoformat() if parking_timestamp else '',
+        leaving_timestamp.isoformat() if leaving_timestamp else '',
+        float(total_hours) if total_hours else '',
+        float(parking_cost) if parking_cost else '',
+        status,
+        remarks or '',
+        address or '',
+        float(price) if price is not None else '',
+        created_at.isoformat() if created_at else '',
+        updated_at.isoformat() if updated_at else ''
+    ]
+
+def stream_admin_export(file_path, filters=None, export_format='csv', progress=None):
+    """Write the admin export to ``file_path`` chunk by chunk.
+    
+    Rows come from a single joined SELECT fetched ``EXPORT_CHUNK_SIZE`` at a
+    time and are written straight to disk, so memory use does not depend on
+    the number of reservations. ``export_format`` is one of EXPORT_FORMATS;
+    Parquet files get one row group per chunk. The file is written under a temporary name
+    and renamed when complete. ``progress(rows_written, total_rows,
+    rows_per_second)`` is called after every chunk. Returns the row count.
+    """
+    from sqlalchemy import func, select
+    from database import db
+    
+    query = admin_export_query(filters)
+    total_rows = db.session.execute(
+        select(func.count()).select_from(query.order_by(None).subquery())
+    ).scalar()
+    
+    started = datetime.utcnow()
+    rows_written = 0
+    temp_path = f"{file_path}.part"
+    
+    try:
+        with ExportWriter(temp_path, export_format, ADMIN_EXPORT_COLUMNS,
+                          admin_csv_row, _columnar_values) as writer:
+            result = db.session.execute(query.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+            for chunk in result.partitions():
+                writer.write_batch(chunk)
+                rows_written += len(chunk)
+                if progress:
+                    elapsed = max((datetime.utcnow() - started).total_seconds(), 1e-6)
+                    progress(rows_written, total_rows, rows_written / elapsed)
+        
+        os.replace(temp_path, file_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    
+    return rows_written
+
+@celery_app.task(bind=True)
+def generate_admin_csv_export(self, filters=None, export_format='csv'):
+    """Generate export of all reservations for admin (CSV, gzip CSV or Parquet)"""
+    try:
         # Update task state
         self.update_state(
             state='PROGRESS',
-            meta={'status': 'Generating CSV...', 'current': 60, 'total': 100}
+            meta={'status': 'Fetching reservations...', 'current': 0, 'total': 0}
         )
         
-        # Generate CSV with additional admin fields
-        csv_data = generate_admin_csv_data(reservations)
+        def report_progress(rows_written, total_rows, rows_per_second):
+            self.update_state(
+                state='PROGRESS',
+                meta={
+                    'status': f'Writing export ({rows_written}/{total_rows} rows)...',
+                    'current': rows_written,
+                    'total': total_rows,
+                    'rows_per_second': round(rows_per_second, 1)
+                }
+            )
         
         # Save file
         timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-        filename = f"admin_reservations_export_{timestamp}.csv"
+        extension = EXPORT_FORMATS[export_format][0]
+        filename = f"admin_reservations_export_{timestamp}{extension}"
         
         exports_dir = os.path.join(os.path.dirname(__file__), '..', 'exports')
         os.makedirs(exports_dir, exist_ok=True)
         
         file_path = os.path.join(exports_dir, filename)
         
-        with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-            csvfile.write(csv_data)
+        started = datetime.utcnow()
+        records_count = stream_admin_export(file_path, filters, export_format, progress=report_progress)
+        
+        # Large CSVs are also kept gzip-compressed for clients that accept it
+        if export_format == 'csv' and os.path.getsize(file_path) >= GZIP_SIBLING_MIN_BYTES:
+            _gzip_file(file_path, f"{file_path}.gz")
+        elapsed = max((datetime.utcnow() - started).total_seconds(), 1e-6)
         
         return {
             'status': 'Export completed successfully',
             'file_path': file_path,
             'filename': filename,
             'download_url': f'/api/admin/download-csv/{filename}',
-            'records_count': len(reservations),
+            'records_count': records_count,
+            'format': export_format,
+            'rows_per_second': round(records_count / elapsed, 1),
             'generated_at': datetime.utcnow().isoformat()
         }
         
@@ -363,64 +850,3 @@ def generate_admin_csv_export(self, filters=None):
             'error': str(e),
             'timestamp': datetime.utcnow().isoformat()
         }
-
-def generate_admin_csv_data(reservations):
-    """Generate CSV data with admin fields"""
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write header with admin fields
-    headers = [
-        'Reservation ID',
-        'User ID',
-        'Username',
-        'User Email',
-        'Parking Lot',
-        'Parking Spot',
-        'Vehicle Number',
-        'Parking Timestamp',
-        'Leaving Timestamp',
-        'Duration (Hours)',
-        'Cost ($)',
-        'Status',
-        'Remarks',
-        'Location Address',
-        'Lot Price per Hour',
-        'Created At',
-        'Updated At'
-    ]
-    writer.writerow(headers)
-    
-    # Write data rows
-    for reservation in reservations:
-        from models.parking_spot import ParkingSpot
-        from models.parking_lot import ParkingLot
-        from models.user import User
-        
-        # Get related data
-        user = User.query.get(reservation.user_id)
-        spot = ParkingSpot.query.get(reservation.spot_id)
-        lot = ParkingLot.query.get(spot.lot_id) if spot else None
-        
-        row = [
-            reservation.id,
-            reservation.user_id,
-            user.username if user else 'Unknown',
-            user.email if user else 'Unknown',
-            lot.prime_location_name if lot else 'Unknown',
-            spot.spot_number if spot else 'Unknown',
-            reservation.vehicle_number,
-            reservation.parking_timestamp.isoformat() if reservation.parking_timestamp else '',
-            reservation.leaving_timestamp.isoformat() if reservation.leaving_timestamp else '',
-            float(reservation.total_hours) if reservation.total_hours else '',
-            float(reservation.parking_cost) if reservation.parking_cost else '',
-            reservation.status,
-            reservation.remarks or '',
-            lot.address if lot else '',
-            float(lot.price) if lot else '',
-            reservation.created_at.isoformat() if reservation.created_at else '',
-            reservation.updated_at.isoformat() if reservation.updated_at else ''
-        ]
-        writer.writerow(row)
-    
-    return output.getvalue()
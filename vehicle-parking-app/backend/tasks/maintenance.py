@@ -0,0 +1,39 @@
+from celery import current_app as celery_app
+from datetime import datetime
+
+def _reconcile_occupancy_counters_impl(repair=True):
+    """Implementation of the lot counter reconciliation"""
+    try:
+        from models.occupancy import reconcile_lot_counters
+
+        summary = reconcile_lot_counters(repair=repair)
+
+        if summary['lots_drifted']:
+            print(f"⚠️  Occupancy counter drift on {summary['lots_drifted']} lot(s): "
+                  f"{[entry['lot_id'] for entry in summary['drift']]}")
+            if summary['repaired']:
+                # Cached lot listings were built from the drifted counters
+                from utils.cache_enhanced import invalidate_cache
+                invalidate_cache('lot_updated')
+
+        summary.update({
+            'status': 'completed',
+            'timestamp': datetime.utcnow().isoformat()
+        })
+        return summary
+
+    except Exception as e:
+        return {
+            'status': 'failed',
+            'error': str(e),
+            'timestamp': datetime.utcnow().isoformat()
+        }
+
+@celery_app.task(bind=True)
+def reconcile_occupancy_counters(self, repair=True):
+    """Detect and repair drift in per-lot occupancy counters (Celery task)"""
+    return _reconcile_occupancy_counters_impl(repair=repair)
+
+def reconcile_occupancy_counters_sync(repair=True):
+    """Detect and repair drift in per-lot occupancy counters (direct call)"""
+    return _reconcile_occupancy_counters_impl(repair=repair)
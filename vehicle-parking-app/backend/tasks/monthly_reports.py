@@ -1,213 +1,423 @@
 from celery import current_app as celery_app
 from datetime import datetime, timedelta
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email import encoders
 import os
 from config import Config
+from utils.mailer import get_mail_transport
+
+# Users per send_monthly_report_chunk subtask
+MONTHLY_REPORT_CHUNK_SIZE = 200
+
+def _previous_month(now=None):
+    """(month, year) of the month before ``now``"""
+    now = now or datetime.utcnow()
+    if now.month == 1:
+        return 12, now.year - 1
+    return now.month - 1, now.year
+
+def _chunk_user_ids(user_ids, chunk_size=None):
+    chunk_size = chunk_size or MONTHLY_REPORT_CHUNK_SIZE
+    return [user_ids[i:i + chunk_size] for i in range(0, len(user_ids), chunk_size)]
 
 @celery_app.task(bind=True)
 def send_monthly_reports(self):
-    """Send monthly activity reports to all users"""
+    """Send monthly activity reports to all users
+    
+    Fans out one send_monthly_report_chunk subtask per block of users as a
+    chord, so the run is spread over the reports queue workers and a failing
+    chunk is retried on its own; summarize_monthly_reports collects the totals.
+    """
     try:
+        from celery import chord
         from models.user import User
-        from models.reservation import Reservation
-        from models.parking_lot import ParkingLot
-        from models.parking_spot import ParkingSpot
         from database import db
-        from sqlalchemy import func, extract
         
-        # Get current month and previous month
-        now = datetime.utcnow()
-        current_month = now.month
-        current_year = now.year
-        
-        # For testing, we'll use last month
-        if current_month == 1:
-            report_month = 12
-            report_year = current_year - 1
-        else:
-            report_month = current_month - 1
-            report_year = current_year
+        # Report on the previous month
+        report_month, report_year = _previous_month()
         
         # Get all active users
-        users = User.query.filter_by(role='user', is_active=True).all()
+        user_ids = [user_id for user_id, in db.session.query(User.id).filter_by(
+            role='user', is_active=True
+        ).order_by(User.id)]
         
-        successful_sends = 0
-        failed_sends = 0
+        if not user_ids:
+            return summarize_monthly_reports([], report_month, report_year)
+        
+        chunks = _chunk_user_ids(user_ids)
+        result = chord(
+            send_monthly_report_chunk.s(chunk, report_month, report_year) for chunk in chunks
+        )(summarize_monthly_reports.s(report_month, report_year))
+        
+        return {
+            'status': 'dispatched',
+            'users_queued': len(user_ids),
+            'chunks': len(chunks),
+            'summary_task_id': result.id,
+            'report_month': report_month,
+            'report_year': report_year,
+            'timestamp': datetime.utcnow().isoformat()
+        }
         
+    except Exception as e:
+        return {
+            'status': 'failed',
+            'error': str(e),
+            'timestamp': datetime.utcnow().isoformat()
+        }
+
+def _send_monthly_report_chunk_impl(user_ids, month, year):
+    """Generate and email the monthly reports of one block of users
+    
+    Users whose report could not be built count as failed; users whose email
+    could not be delivered are returned in ``retry_user_ids`` and not counted.
+    """
+    from models.user import User
+    
+    users = User.query.filter(User.id.in_(user_ids)).order_by(User.id).all()
+    
+    # Every user's metrics for the month in one query
+    watermarks = monthly_report_watermarks([user.id for user in users], month, year)
+    reports = build_monthly_reports_data([user.id for user in users], month, year)
+    
+    successful_sends = 0
+    failed_sends = 0
+    queued = {}
+    rendered = {}
+    
+    # Reports are queued and go out in batches over pooled SMTP sessions
+    # while the next ones are being generated
+    with get_mail_transport().outbox() as outbox:
         for user in users:
             try:
-                # Generate monthly report for user
-                report_data = generate_monthly_report_data(user.id, report_month, report_year)
+                report_data = reports[user.id]
                 
                 if report_data['total_reservations'] > 0:  # Only send if user had activity
                     # Generate HTML report
-                    html_report = generate_monthly_report_html(user, report_data, report_month, report_year)
+                    html_report = generate_monthly_report_html(user, report_data, month, year)
+                    rendered[user.id] = (report_data, html_report)
                     
-                    # Send email
+                    # Queue email
                     if user.email and Config.MAIL_SERVER:
-                        send_monthly_report_email(user, html_report, report_month, report_year)
+                        outbox.add(build_monthly_report_email(user, html_report, month, year), key=user.id)
+                        queued[user.id] = user.username
                 
                 successful_sends += 1
                 
             except Exception as e:
                 print(f"Failed to send monthly report to {user.username}: {str(e)}")
                 failed_sends += 1
-        
-        return {
-            'status': 'completed',
-            'users_processed': len(users),
-            'successful_sends': successful_sends,
-            'failed_sends': failed_sends,
-            'report_month': report_month,
-            'report_year': report_year,
-            'timestamp': datetime.utcnow().isoformat()
-        }
-        
+    
+    for user_id, error in outbox.failed.items():
+        print(f"Failed to send monthly report to {queued[user_id]}: {error}")
+    
+    # Serve the closed month's reports from the store from now on
+    _store_rendered_reports(rendered, month, year, watermarks)
+    
+    return {
+        'users_processed': len(users) - len(outbox.failed),
+        'successful_sends': successful_sends - len(outbox.failed),
+        'failed_sends': failed_sends,
+        'retry_user_ids': sorted(outbox.failed)
+    }
+
+def _store_rendered_reports(rendered, month, year, watermarks):
+    """Store the reports a run has just rendered; failures only cost a rebuild later"""
+    if not rendered or not is_closed_month(month, year):
+        return
+    try:
+        store_monthly_reports(rendered, month, year, watermarks)
     except Exception as e:
-        return {
-            'status': 'failed',
-            'error': str(e),
-            'timestamp': datetime.utcnow().isoformat()
+        from database import db
+        db.session.rollback()
+        print(f"Failed to store monthly reports for {month}/{year}: {str(e)}")
+
+def _add_chunk_counts(*results):
+    """Sum the counters of chunk results"""
+    total = {'users_processed': 0, 'successful_sends': 0, 'failed_sends': 0}
+    for result in results:
+        for key in total:
+            total[key] += (result or {}).get(key, 0)
+    return total
+
+@celery_app.task(bind=True, max_retries=3)
+def send_monthly_report_chunk(self, user_ids, month, year, carried=None):
+    """Send the monthly reports of one block of users (chord member)
+    
+    If the whole chunk fails (e.g. the database is unreachable) it is retried
+    with backoff; if only some emails fail, just those users are retried.
+    ``carried`` holds the counts of earlier attempts of this chunk.
+    """
+    try:
+        result = _send_monthly_report_chunk_impl(user_ids, month, year)
+    except Exception as e:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e, countdown=60 * 2 ** self.request.retries)
+        print(f"Monthly report chunk failed for {len(user_ids)} users: {str(e)}")
+        return dict(_add_chunk_counts(carried, {'users_processed': len(user_ids),
+                                                'failed_sends': len(user_ids)}), error=str(e))
+    
+    retry_user_ids = result.pop('retry_user_ids')
+    total = _add_chunk_counts(carried, result)
+    
+    if retry_user_ids:
+        if self.request.retries < self.max_retries:
+            raise self.retry(args=[retry_user_ids, month, year], kwargs={'carried': total},
+                             countdown=60 * 2 ** self.request.retries)
+        total = _add_chunk_counts(total, {'users_processed': len(retry_user_ids),
+                                          'failed_sends': len(retry_user_ids)})
+    return total
+
+@celery_app.task(bind=True)
+def summarize_monthly_reports(self, chunk_results, month, year):
+    """Chord callback: combine the chunk results of a monthly report run"""
+    total = _add_chunk_counts(*chunk_results)
+    failed_chunks = sum(1 for result in chunk_results if result and result.get('error'))
+    
+    return dict(
+        total,
+        status='completed',
+        chunks=len(chunk_results),
+        failed_chunks=failed_chunks,
+        report_month=month,
+        report_year=year,
+        timestamp=datetime.utcnow().isoformat()
+    )
+
+def is_closed_month(month, year, now=None):
+    """True once the month is over, i.e. its reports can be stored"""
+    from models.monthly_report import month_start
+    return datetime(year, month, 1) < month_start(now)
+
+def monthly_report_watermarks(user_ids, month, year):
+    """``{user_id: (count, latest updated_at)}`` of the users' month reservations
+    
+    Read before a report is built and again right before it is stored: a
+    reservation added, removed or changed in between moves the watermark.
+    Users without reservations in the month are left out.
+    """
+    from models.reservation import Reservation
+    from database import db
+    from sqlalchemy import func, select
+    
+    start, end = _month_bounds(month, year)
+    rows = db.session.execute(
+        select(
+            Reservation.user_id,
+            func.count(Reservation.id),
+            func.max(Reservation.updated_at)
+        ).where(
+            Reservation.user_id.in_(list(user_ids)),
+            Reservation.created_at >= start,
+            Reservation.created_at < end
+        ).group_by(Reservation.user_id)
+    ).all()
+    return {user_id: (count, latest) for user_id, count, latest in rows}
+
+def store_monthly_reports(reports, month, year, watermarks=None):
+    """Persist ``{user_id: (report_data, html)}`` for a closed month
+    
+    Existing rows of those users and month are replaced, so re-running the
+    monthly job (or a chunk retry) just refreshes them. ``watermarks`` are
+    the ``monthly_report_watermarks`` read before the reports were built;
+    a user whose reservations changed since then has the built report
+    dropped instead of stored, and the next read rebuilds it.
+    """
+    import json
+    from models.monthly_report import MonthlyReport
+    from database import db
+    from sqlalchemy import delete, insert
+    
+    if not reports:
+        return 0
+    
+    table = MonthlyReport.__table__
+    now = datetime.utcnow()
+    db.session.execute(delete(table).where(
+        table.c.user_id.in_(list(reports)),
+        table.c.year == year,
+        table.c.month == month
+    ))
+    if watermarks is not None:
+        # Re-read in the storing transaction, after the delete
+        current = monthly_report_watermarks(list(reports), month, year)
+        reports = {
+            user_id: report for user_id, report in reports.items()
+            if current.get(user_id) == watermarks.get(user_id)
         }
+    if not reports:
+        db.session.commit()
+        return 0
+    db.session.execute(insert(table), [
+        {
+            'user_id': user_id,
+            'year': year,
+            'month': month,
+            'report_data': json.dumps(report_data),
+            'html': html,
+            'generated_at': now
+        }
+        for user_id, (report_data, html) in reports.items()
+    ])
+    db.session.commit()
+    return len(reports)
+
+def get_monthly_report(user, month, year, format_type='json'):
+    """A user's monthly report as data (``json``) or HTML (``html``)
+    
+    Closed months are read from the monthly_reports table, which the monthly
+    job fills; a month not stored yet is built once and stored. The current
+    month is always built live.
+    """
+    import json
+    from models.monthly_report import MonthlyReport
+    from database import db
+    from sqlalchemy.exc import IntegrityError
+    
+    if not is_closed_month(month, year):
+        report_data = generate_monthly_report_data(user.id, month, year)
+        if format_type == 'html':
+            return generate_monthly_report_html(user, report_data, month, year)
+        return report_data
+    
+    column = MonthlyReport.html if format_type == 'html' else MonthlyReport.report_data
+    stored = db.session.query(column).filter_by(user_id=user.id, year=year, month=month).scalar()
+    if stored is not None:
+        return stored if format_type == 'html' else json.loads(stored)
+    
+    watermarks = monthly_report_watermarks([user.id], month, year)
+    report_data = generate_monthly_report_data(user.id, month, year)
+    html = generate_monthly_report_html(user, report_data, month, year)
+    try:
+        store_monthly_reports({user.id: (report_data, html)}, month, year, watermarks)
+    except IntegrityError:
+        # Stored concurrently by another request or the monthly job
+        db.session.rollback()
+    return html if format_type == 'html' else report_data
 
 def generate_monthly_report_data(user_id, month, year):
     """Generate monthly report data for a user - matches dashboard logic exactly"""
+    return build_monthly_reports_data([user_id], month, year)[user_id]
+
+def _month_bounds(month, year):
+    """[start, end) datetimes of a calendar month"""
+    start = datetime(year, month, 1)
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return start, end
+
+def build_monthly_reports_data(user_ids, month, year):
+    """Monthly report data for many users from a single joined query
+    
+    Every reservation of ``user_ids`` created in the month is read once
+    together with its spot number and lot name/price, then folded into each
+    user's metrics in one pass; the lot and spot of each reservation ride
+    along in ``reservations`` so the renderer needs no queries either.
+    Returns ``{user_id: report_data}``, including users with no activity.
+    """
     from models.reservation import Reservation
     from models.parking_lot import ParkingLot
     from models.parking_spot import ParkingSpot
     from database import db
-    from sqlalchemy import func, extract
-    
-    # Get reservations for the month - EXACTLY like dashboard
-    monthly_reservations = Reservation.query.filter(
-        Reservation.user_id == user_id,
-        extract('month', Reservation.created_at) == month,
-        extract('year', Reservation.created_at) == year
+    from sqlalchemy import select
+    
+    start, end = _month_bounds(month, year)
+    rows = db.session.execute(
+        select(
+            Reservation,
+            ParkingSpot.spot_number,
+            ParkingLot.id,
+            ParkingLot.prime_location_name,
+            ParkingLot.price
+        ).outerjoin(
+            ParkingSpot, Reservation.spot_id == ParkingSpot.id
+        ).outerjoin(
+            ParkingLot, ParkingSpot.lot_id == ParkingLot.id
+        ).where(
+            Reservation.user_id.in_(user_ids),
+            Reservation.created_at >= start,
+            Reservation.created_at < end
+        ).order_by(Reservation.user_id, Reservation.id)
     ).all()
     
-    # Calculate statistics - EXACTLY like dashboard
-    total_reservations = len(monthly_reservations)
-    completed_reservations = len([r for r in monthly_reservations if r.status == 'completed'])
+    reservations_by_user = {user_id: [] for user_id in user_ids}
+    for row in rows:
+        reservations_by_user[row[0].user_id].append(row)
     
-    # Use same logic as dashboard for total spent - FIXED
+    return {
+        user_id: _summarize_monthly_reservations(user_rows)
+        for user_id, user_rows in reservations_by_user.items()
+    }
+
+def _summarize_monthly_reservations(rows):
+    """Report metrics of one user's month from (reservation, spot number, lot id, lot name, lot price) rows"""
     total_amount_spent = 0
     total_hours_parked = 0
-    
-    for reservation in monthly_reservations:
-        if reservation.status == 'completed' and reservation.parking_cost:
-            total_amount_spent += float(reservation.parking_cost)
-        
-        # Calculate total hours using same logic as dashboard
-        if reservation.status == 'completed':
-            # Use calculate_parking_duration method if available, or fall back to total_hours
-            try:
-                if hasattr(reservation, 'calculate_parking_duration'):
-                    duration = reservation.calculate_parking_duration()
-                    if duration:
-                        total_hours_parked += duration
-                elif reservation.total_hours:
-                    total_hours_parked += float(reservation.total_hours)
-            except:
-                # Fallback to manual calculation if methods fail
-                if reservation.parking_timestamp and reservation.leaving_timestamp:
-                    duration = reservation.leaving_timestamp - reservation.parking_timestamp
-                    hours = duration.total_seconds() / 3600
-                    total_hours_parked += hours
-    
-    # Get most used parking lot - Fixed logic
+    completed_reservations = 0
+    estimated_savings = 0
     lot_usage = {}
     lot_details = {}
-    
-    for reservation in monthly_reservations:
-        try:
-            spot = ParkingSpot.query.get(reservation.spot_id)
-            if spot:
-                lot = ParkingLot.query.get(spot.lot_id)
-                if lot:
-                    # Use prime_location_name for consistency with dashboard
-                    lot_name = lot.prime_location_name or lot.location or f"Lot {lot.id}"
-                    
-                    if lot_name not in lot_usage:
-                        lot_usage[lot_name] = 0
-                        lot_details[lot_name] = {
-                            'count': 0,
-                            'total_cost': 0,
-                            'total_hours': 0
-                        }
-                    
-                    lot_usage[lot_name] += 1
-                    lot_details[lot_name]['count'] += 1
-                    
-                    # Add cost only for completed reservations
-                    if reservation.status == 'completed' and reservation.parking_cost:
-                        lot_details[lot_name]['total_cost'] += float(reservation.parking_cost)
-                    
-                    # Add hours only for completed reservations
-                    if reservation.status == 'completed':
-                        try:
-                            if hasattr(reservation, 'calculate_parking_duration'):
-                                duration = reservation.calculate_parking_duration()
-                                if duration:
-                                    lot_details[lot_name]['total_hours'] += duration
-                            elif reservation.total_hours:
-                                lot_details[lot_name]['total_hours'] += float(reservation.total_hours)
-                        except:
-                            pass
-        except Exception as e:
-            print(f"Error processing reservation {reservation.id}: {e}")
-            continue
-    
-    # Find most used lot
-    most_used_lot = ('None', 0)
-    if lot_usage:
-        most_used_lot = max(lot_usage.items(), key=lambda x: x[1])
-    
-    # Get daily usage pattern
     daily_usage = {}
     weekday_usage = {0: 0, 1: 0, 2: 0, 3: 0, 4: 0, 5: 0, 6: 0}  # Monday=0, Sunday=6
+    reservations = []
     
-    for reservation in monthly_reservations:
+    for reservation, spot_number, lot_id, prime_location_name, lot_price in rows:
+        completed = reservation.status == 'completed'
+        cost = float(reservation.parking_cost) if reservation.parking_cost else 0
+        duration = 0
+        if completed:
+            try:
+                duration = reservation.calculate_parking_duration() or 0
+            except Exception as e:
+                print(f"Error processing reservation {reservation.id}: {e}")
+        
+        if completed:
+            completed_reservations += 1
+            total_amount_spent += cost
+            if duration:
+                total_hours_parked += duration
+        
+        # Per-lot usage
+        lot_name = None
+        if lot_id is not None:
+            # Use prime_location_name for consistency with dashboard
+            lot_name = prime_location_name or f"Lot {lot_id}"
+            if lot_name not in lot_usage:
+                lot_usage[lot_name] = 0
+                lot_details[lot_name] = {
+                    'count': 0,
+                    'total_cost': 0,
+                    'total_hours': 0
+                }
+            lot_usage[lot_name] += 1
+            lot_details[lot_name]['count'] += 1
+            if completed:
+                lot_details[lot_name]['total_cost'] += cost
+                if duration:
+                    lot_details[lot_name]['total_hours'] += duration
+            
+            # Savings vs daily rate (8x the hourly rate) for stays under 8 hours
+            if completed and cost and 0 < duration < 8 and lot_price is not None:
+                estimated_savings += max(0, float(lot_price) * 8 - cost)
+        
+        # Daily usage pattern
         day = reservation.created_at.day
-        weekday = reservation.created_at.weekday()
+        daily_usage[day] = daily_usage.get(day, 0) + 1
+        weekday_usage[reservation.created_at.weekday()] += 1
         
-        if day not in daily_usage:
-            daily_usage[day] = 0
-        daily_usage[day] += 1
-        weekday_usage[weekday] += 1
+        reservation_data = reservation.to_dict()
+        reservation_data['lot_name'] = lot_name
+        reservation_data['spot_number'] = spot_number
+        reservations.append(reservation_data)
     
-    # Calculate savings vs daily rate (improved calculation)
-    estimated_savings = 0
-    if completed_reservations > 0:
-        for reservation in [r for r in monthly_reservations if r.status == 'completed']:
-            try:
-                if reservation.parking_cost:
-                    # Get actual duration
-                    actual_duration = 0
-                    if hasattr(reservation, 'calculate_parking_duration'):
-                        actual_duration = reservation.calculate_parking_duration() or 0
-                    elif reservation.total_hours:
-                        actual_duration = float(reservation.total_hours)
-                    
-                    if actual_duration > 0 and actual_duration < 8:  # If parked less than 8 hours
-                        spot = ParkingSpot.query.get(reservation.spot_id)
-                        if spot:
-                            lot = ParkingLot.query.get(spot.lot_id)
-                            if lot and hasattr(lot, 'price'):
-                                # Assume daily rate is 8x hourly rate
-                                daily_rate = float(lot.price) * 8
-                                actual_cost = float(reservation.parking_cost)
-                                savings = max(0, daily_rate - actual_cost)
-                                estimated_savings += savings
-            except Exception as e:
-                print(f"Error calculating savings for reservation {reservation.id}: {e}")
-                continue
+    # Find most used lot
+    most_used_lot = ('None', 0)
+    if lot_usage:
+        most_used_lot = max(lot_usage.items(), key=lambda x: x[1])
     
     return {
-        'total_reservations': total_reservations,
+        'total_reservations': len(reservations),
         'completed_reservations': completed_reservations,
         'total_amount_spent': round(total_amount_spent, 2),
         'total_hours_parked': round(total_hours_parked, 2),
@@ -218,511 +428,89 @@ def generate_monthly_report_data(user_id, month, year):
         'daily_usage': daily_usage,
         'weekday_usage': weekday_usage,
         'estimated_savings': round(max(0, estimated_savings), 2),
-        'reservations': [r.to_dict() for r in monthly_reservations]
+        'reservations': reservations
     }
 
-def generate_monthly_report_html(user, report_data, month, year):
-    """Generate HTML for monthly report"""
-    month_names = [
-        '', 'January', 'February', 'March', 'April', 'May', 'June',
-        'July', 'August', 'September', 'October', 'November', 'December'
-    ]
-    
-    weekday_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    
-    # Generate weekday usage chart data
-    weekday_chart_data = []
-    for i in range(7):
-        weekday_chart_data.append({
-            'day': weekday_names[i],
-            'count': report_data['weekday_usage'][i]
-        })
-    
-    # Generate lot details table
-    lot_details_html = ""
-    if report_data['lot_details']:
-        lot_details_html = """
-        <div class="lot-details-section">
-            <h3>&#127970; Parking Lot Usage Breakdown</h3>
-            <table class="lot-details-table">
-                <thead>
-                    <tr>
-                        <th>Parking Lot</th>
-                        <th>Visits</th>
-                        <th>Total Hours</th>
-                        <th>Total Spent</th>
-                        <th>Avg Cost/Visit</th>
-                    </tr>
-                </thead>
-                <tbody>
-        """
-        for lot_name, details in report_data['lot_details'].items():
-            avg_cost = details['total_cost'] / details['count'] if details['count'] > 0 else 0
-            lot_details_html += f"""
-                    <tr>
-                        <td>{lot_name}</td>
-                        <td>{details['count']}</td>
-                        <td>{details['total_hours']:.1f}</td>
-                        <td>Rs.{details['total_cost']:.2f}</td>
-                        <td>Rs.{avg_cost:.2f}</td>
-                    </tr>
-            """
-        lot_details_html += """
-                </tbody>
-            </table>
-        </div>
-        """
-    
-    # Generate daily usage chart
-    daily_chart_html = ""
-    # Daily usage pattern removed as requested
-    
-    # Generate weekday usage chart
-    weekday_chart_html = ""
-    # Weekday usage pattern removed as requested
-    
-    # Generate daily usage chart
-    daily_chart_html = ""
-    # Daily usage pattern removed as requested
-    
-    html_template = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <title>Monthly Parking Report - {month_names[month]} {year}</title>
-        <style>
-            body {{
-                font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                line-height: 1.6;
-                margin: 0;
-                padding: 20px;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                min-height: 100vh;
-            }}
-            .container {{
-                max-width: 800px;
-                margin: 0 auto;
-                background: white;
-                border-radius: 15px;
-                box-shadow: 0 10px 30px rgba(0,0,0,0.3);
-                overflow: hidden;
-            }}
-            .header {{
-                background: linear-gradient(135deg, #4CAF50 0%, #45a049 100%);
-                color: white;
-                padding: 30px;
-                text-align: center;
-                position: relative;
-            }}
-            .header::before {{
-                content: '';
-                position: absolute;
-                top: 0;
-                left: 0;
-                right: 0;
-                bottom: 0;
-                background: url('data:image/svg+xml,<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 100 100"><circle cx="20" cy="20" r="2" fill="rgba(255,255,255,0.1)"/><circle cx="80" cy="80" r="2" fill="rgba(255,255,255,0.1)"/><circle cx="40" cy="60" r="1" fill="rgba(255,255,255,0.1)"/></svg>');
-            }}
-            .header h1 {{
-                margin: 0;
-                font-size: 2.5em;
-                font-weight: 300;
-                position: relative;
-                z-index: 1;
-            }}
-            .header p {{
-                margin: 10px 0 0;
-                font-size: 1.2em;
-                opacity: 0.9;
-                position: relative;
-                z-index: 1;
-            }}
-            .content {{
-                padding: 30px;
-            }}
-            .stats-grid {{
-                display: grid;
-                grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-                gap: 20px;
-                margin-bottom: 30px;
-            }}
-            .stat-card {{
-                background: linear-gradient(135deg, #f8f9fa 0%, #e9ecef 100%);
-                padding: 25px;
-                border-radius: 10px;
-                text-align: center;
-                border-left: 5px solid #4CAF50;
-                transition: transform 0.3s ease, box-shadow 0.3s ease;
-            }}
-            .stat-card:hover {{
-                transform: translateY(-5px);
-                box-shadow: 0 8px 25px rgba(0,0,0,0.15);
-            }}
-            .stat-value {{
-                font-size: 2.5em;
-                font-weight: bold;
-                color: #2c3e50;
-                margin: 0;
-            }}
-            .stat-label {{
-                color: #666;
-                margin-top: 5px;
-                font-size: 0.9em;
-                text-transform: uppercase;
-                letter-spacing: 1px;
-            }}
-            .savings-card {{
-                background: linear-gradient(135deg, #27ae60 0%, #2ecc71 100%);
-                color: white;
-                border-left-color: #1e8449;
-            }}
-            .savings-card .stat-value {{
-                color: white;
-            }}
-            .savings-card .stat-label {{
-                color: rgba(255,255,255,0.9);
-            }}
-            .section {{
-                margin: 30px 0;
-                padding: 25px;
-                background: #f8f9fa;
-                border-radius: 10px;
-                border-left: 4px solid #4CAF50;
-            }}
-            .section h3 {{
-                margin-top: 0;
-                color: #2c3e50;
-                font-size: 1.3em;
-                display: flex;
-                align-items: center;
-                gap: 8px;
-            }}
-            .lot-details-table {{
-                width: 100%;
-                border-collapse: collapse;
-                margin-top: 15px;
-                background: white;
-                border-radius: 8px;
-                overflow: hidden;
-                box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-            }}
-            .lot-details-table th {{
-                background: #4CAF50;
-                color: white;
-                padding: 15px;
-                text-align: left;
-                font-weight: 600;
-            }}
-            .lot-details-table td {{
-                padding: 12px 15px;
-                border-bottom: 1px solid #eee;
-            }}
-            .lot-details-table tr:hover {{
-                background: #f8f9fa;
-            }}
-            .reservations-table {{
-                width: 100%;
-                border-collapse: collapse;
-                margin-top: 15px;
-                background: white;
-                border-radius: 8px;
-                overflow: hidden;
-                box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-            }}
-            .reservations-table th {{
-                background: #4CAF50;
-                color: white;
-                padding: 12px;
-                text-align: left;
-                font-weight: 600;
-                font-size: 0.9em;
-            }}
-            .reservations-table td {{
-                padding: 10px 12px;
-                border-bottom: 1px solid #eee;
-                font-size: 0.85em;
-            }}
-            .reservations-table tr:hover {{
-                background: #f8f9fa;
-            }}
-            .status-completed {{
-                background: #d4edda;
-                color: #1e7e34;
-                padding: 3px 8px;
-                border-radius: 12px;
-                font-size: 0.8em;
-            }}
-            .status-cancelled {{
-                background: #f8d7da;
-                color: #721c24;
-                padding: 3px 8px;
-                border-radius: 12px;
-                font-size: 0.8em;
-            }}
-            .status-active {{
-                background: #fff3cd;
-                color: #856404;
-                padding: 3px 8px;
-                border-radius: 12px;
-                font-size: 0.8em;
-            }}
-            .footer {{
-                background: #2c3e50;
-                color: white;
-                padding: 20px;
-                text-align: center;
-                font-size: 0.9em;
-            }}
-            .footer a {{
-                color: #4CAF50;
-                text-decoration: none;
-            }}
-            .no-data {{
-                text-align: center;
-                color: #666;
-                font-style: italic;
-                padding: 40px;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h1>&#128663; Monthly Parking Report</h1>
-                <p>Hello {user.username}! Here's your parking activity for {month_names[month]} {year}</p>
-            </div>
-            
-            <div class="content">
-                <div class="stats-grid">
-                    <div class="stat-card">
-                        <div class="stat-value">{report_data['total_reservations']}</div>
-                        <div class="stat-label">Total Bookings</div>
-                    </div>
-                    <div class="stat-card">
-                        <div class="stat-value">{report_data['completed_reservations']}</div>
-                        <div class="stat-label">Completed</div>
-                    </div>
-                    <div class="stat-card">
-                        <div class="stat-value">Rs.{report_data['total_amount_spent']:.2f}</div>
-                        <div class="stat-label">Total Spent</div>
-                    </div>
-                    <div class="stat-card">
-                        <div class="stat-value">{report_data['total_hours_parked']:.1f}h</div>
-                        <div class="stat-label">Hours Parked</div>
-                    </div>
-                    <div class="stat-card">
-                        <div class="stat-value">Rs.{report_data['average_cost_per_reservation']:.2f}</div>
-                        <div class="stat-label">Avg Cost/Booking</div>
-                    </div>
-                    <div class="stat-card savings-card">
-                        <div class="stat-value">Rs.{report_data['estimated_savings']:.2f}</div>
-                        <div class="stat-label">Estimated Savings</div>
-                    </div>
-                </div>
-                
-                <div class="section">
-                    <h3>&#127942; Most Used Parking Lot</h3>
-                    <p><strong>{report_data['most_used_lot'][0]}</strong> - {report_data['most_used_lot'][1]} visits</p>
-                </div>
-                
-                {lot_details_html}
-                
-                {weekday_chart_html}
-                
-                {daily_chart_html}
-                
-                <div class="section">
-                    <h3>&#128203; All Reservations</h3>
-                    {"<div class='no-data'>No reservations found for this month.</div>" if not report_data['reservations'] else ""}"""
-    
-    if report_data['reservations']:
-        html_template += """
-                    <table class="reservations-table">
-                        <thead>
-                            <tr>
-                                <th>Date</th>
-                                <th>Parking Lot</th>
-                                <th>Spot</th>
-                                <th>Hours</th>
-                                <th>Cost</th>
-                                <th>Status</th>
-                            </tr>
-                        </thead>
-                        <tbody>"""
-        
-        from models.parking_spot import ParkingSpot
-        from models.parking_lot import ParkingLot
-        from datetime import datetime
-        
-        # Sort reservations by created_at (now they are dictionaries)
-        sorted_reservations = sorted(report_data['reservations'], 
-                                   key=lambda x: datetime.fromisoformat(x['created_at']) if x.get('created_at') else datetime.min, 
-                                   reverse=True)
-        
-        for reservation_dict in sorted_reservations:
-            spot = ParkingSpot.query.get(reservation_dict.get('spot_id'))
-            lot_name = "N/A"
-            if spot:
-                lot = ParkingLot.query.get(spot.lot_id)
-                if lot:
-                    lot_name = lot.prime_location_name or lot.location
-            
-            status = reservation_dict.get('status', 'unknown')
-            status_class = f"status-{status}"
-            hours = reservation_dict.get('total_hours', 0) or 0
-            cost = reservation_dict.get('parking_cost', 0) or 0
-            
-            # Parse the created_at date
-            created_at_str = reservation_dict.get('created_at', '')
-            try:
-                if created_at_str:
-                    created_at = datetime.fromisoformat(created_at_str.replace('Z', '+00:00'))
-                    date_str = created_at.strftime('%d %b, %Y')
-                else:
-                    date_str = 'N/A'
-            except:
-                date_str = 'N/A'
-            
-            html_template += f"""
-                            <tr>
-                                <td>{date_str}</td>
-                                <td>{lot_name}</td>
-                                <td>{spot.spot_number if spot else 'N/A'}</td>
-                                <td>{hours:.1f}h</td>
-                                <td>Rs.{cost:.2f}</td>
-                                <td><span class="{status_class}">{status.title()}</span></td>
-                            </tr>"""
-        
-        html_template += """
-                        </tbody>
-                    </table>"""
+MONTH_NAMES = [
+    '', 'January', 'February', 'March', 'April', 'May', 'June',
+    'July', 'August', 'September', 'October', 'November', 'December'
+]
+
+def _report_date(created_at):
+    """'05 Mar, 2025' from a reservation dict's ISO created_at"""
+    try:
+        return datetime.fromisoformat(created_at.replace('Z', '+00:00')).strftime('%d %b, %Y') if created_at else 'N/A'
+    except ValueError:
+        return 'N/A'
+
+def monthly_report_context(user, report_data, month, year):
+    """Template context for one report, from build_monthly_reports_data output
     
-    html_template += """
-                </div>
-            </div>
-            
-            <div class="footer">
-                <p>Thank you for using our parking service! 🚗</p>
-                <p>For support, contact us at <a href="mailto:support@parkingapp.com">support@parkingapp.com</a></p>
-            </div>
-        </div>
-    </body>
-    </html>
+    Only the username is read from ``user``; lot and spot names already come
+    with each reservation, so building the context never touches the database.
+    Numbers are formatted here so the template only substitutes strings.
     """
+    totals = {
+        'total_amount_spent': f"{report_data['total_amount_spent']:.2f}",
+        'total_hours_parked': f"{report_data['total_hours_parked']:.1f}",
+        'average_cost_per_reservation': f"{report_data['average_cost_per_reservation']:.2f}",
+        'estimated_savings': f"{report_data['estimated_savings']:.2f}"
+    }
     
-    return html_template
-    
-    html = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <style>
-            body {{ font-family: Arial, sans-serif; margin: 20px; }}
-            .header {{ background-color: #007bff; color: white; padding: 20px; text-align: center; }}
-            .content {{ margin: 20px 0; }}
-            .stats-table {{ width: 100%; border-collapse: collapse; margin: 20px 0; }}
-            .stats-table th, .stats-table td {{ border: 1px solid #ddd; padding: 12px; text-align: left; }}
-            .stats-table th {{ background-color: #f2f2f2; }}
-            .chart-container {{ margin: 20px 0; }}
-            .footer {{ background-color: #f8f9fa; padding: 20px; text-align: center; margin-top: 30px; }}
-        </style>
-    </head>
-    <body>
-        <div class="header">
-            <h1>Monthly Parking Report</h1>
-            <h2>{month_name} {year}</h2>
-            <p>Report for: {user.username}</p>
-        </div>
-        
-        <div class="content">
-            <h3>Parking Summary</h3>
-            <table class="stats-table">
-                <tr>
-                    <th>Metric</th>
-                    <th>Value</th>
-                </tr>
-                <tr>
-                    <td>Total Reservations</td>
-                    <td>{report_data['total_reservations']}</td>
-                </tr>
-                <tr>
-                    <td>Completed Reservations</td>
-                    <td>{report_data['completed_reservations']}</td>
-                </tr>
-                <tr>
-                    <td>Total Amount Spent</td>
-                    <td>${report_data['total_amount_spent']:.2f}</td>
-                </tr>
-                <tr>
-                    <td>Total Hours Parked</td>
-                    <td>{report_data['total_hours_parked']:.2f} hours</td>
-                </tr>
-                <tr>
-                    <td>Average Cost per Reservation</td>
-                    <td>${report_data['average_cost_per_reservation']:.2f}</td>
-                </tr>
-                <tr>
-                    <td>Average Hours per Reservation</td>
-                    <td>{report_data['average_hours_per_reservation']:.2f} hours</td>
-                </tr>
-                <tr>
-                    <td>Most Used Parking Lot</td>
-                    <td>{report_data['most_used_lot'][0]} ({report_data['most_used_lot'][1]} times)</td>
-                </tr>
-            </table>
-            
-            <h3>Reservation Details</h3>
-            <table class="stats-table">
-                <tr>
-                    <th>Date</th>
-                    <th>Parking Lot</th>
-                    <th>Duration</th>
-                    <th>Cost</th>
-                    <th>Status</th>
-                </tr>
-    """
+    lots = [
+        {
+            'name': lot_name,
+            'count': details['count'],
+            'total_hours': f"{details['total_hours']:.1f}",
+            'total_cost': f"{details['total_cost']:.2f}",
+            'average_cost': f"{details['total_cost'] / details['count'] if details['count'] > 0 else 0:.2f}"
+        }
+        for lot_name, details in report_data['lot_details'].items()
+    ]
     
-    # Add reservation details
-    for reservation in report_data['reservations']:
-        from models.parking_spot import ParkingSpot
-        from models.parking_lot import ParkingLot
-        
-        spot = ParkingSpot.query.get(reservation.spot_id)
-        lot = ParkingLot.query.get(spot.lot_id) if spot else None
-        
-        html += f"""
-                <tr>
-                    <td>{reservation.parking_timestamp.strftime('%Y-%m-%d %H:%M') if reservation.parking_timestamp else 'N/A'}</td>
-                    <td>{lot.prime_location_name if lot else 'Unknown'}</td>
-                    <td>{float(reservation.total_hours):.2f} hours</td>
-                    <td>${float(reservation.parking_cost):.2f}</td>
-                    <td>{reservation.status.title()}</td>
-                </tr>
-        """
-    
-    html += """
-            </table>
-        </div>
-        
-        <div class="footer">
-            <p>Thank you for using our parking service!</p>
-            <p>For any questions, please contact our support team.</p>
-        </div>
-    </body>
-    </html>
-    """
+    # Newest first
+    sorted_reservations = sorted(
+        report_data['reservations'],
+        key=lambda x: x.get('created_at') or '',
+        reverse=True
+    )
+    reservations = []
+    for reservation in sorted_reservations:
+        status = reservation.get('status', 'unknown')
+        reservations.append({
+            'date': _report_date(reservation.get('created_at')),
+            'lot_name': reservation.get('lot_name') or 'N/A',
+            'spot_number': reservation.get('spot_number') or 'N/A',
+            'hours': f"{reservation.get('total_hours') or 0:.1f}",
+            'cost': f"{reservation.get('parking_cost') or 0:.2f}",
+            'status': status,
+            'status_label': status.title()
+        })
+    
+    return {
+        'username': user.username,
+        'month_name': MONTH_NAMES[month],
+        'year': year,
+        'report': report_data,
+        'totals': totals,
+        'lots': lots,
+        'reservations': reservations
+    }
+
+def generate_monthly_report_html(user, report_data, month, year):
+    """Generate HTML for monthly report from templates/reports/monthly_report.html"""
+    from utils.report_templates import get_report_template
     
-    return html
+    template = get_report_template('monthly_report.html')
+    return template.render(monthly_report_context(user, report_data, month, year))
 
 def send_monthly_report_email(user, html_report, month, year):
     """Send monthly report via email"""
-    month_names = [
-        'January', 'February', 'March', 'April', 'May', 'June',
-        'July', 'August', 'September', 'October', 'November', 'December'
-    ]
-    
-    month_name = month_names[month - 1]
+    get_mail_transport().send(build_monthly_report_email(user, html_report, month, year))
+
+def build_monthly_report_email(user, html_report, month, year):
+    """Build the monthly report email message"""
+    month_name = MONTH_NAMES[month]
     subject = f"Your Monthly Parking Report - {month_name} {year}"
     
     msg = MIMEMultipart('alternative')
@@ -734,13 +522,7 @@ def send_monthly_report_email(user, html_report, month, year):
     html_part = MIMEText(html_report, 'html')
     msg.attach(html_part)
     
-    # Send email
-    with smtplib.SMTP(Config.MAIL_SERVER, Config.MAIL_PORT) as server:
-        if Config.MAIL_USE_TLS:
-            server.starttls()
-        if Config.MAIL_USERNAME and Config.MAIL_PASSWORD:
-            server.login(Config.MAIL_USERNAME, Config.MAIL_PASSWORD)
-        server.send_message(msg)
+    return msg
 
 # Task wrapper function for external access
 @celery_app.task(bind=True)
@@ -756,27 +538,40 @@ def send_monthly_reports_task(self, month=None, year=None):
         report_year = year or now.year
         
         users = User.query.filter_by(role='user').all()
+        watermarks = monthly_report_watermarks([user.id for user in users], report_month, report_year)
+        reports = build_monthly_reports_data([user.id for user in users], report_month, report_year)
         successful_sends = 0
         failed_sends = 0
+        rendered = {}
         
-        for user in users:
-            try:
-                # Generate report data
-                report_data = generate_monthly_report_data(user.id, report_month, report_year)
-                
-                # Only send if user has activity
-                if report_data['total_reservations'] > 0:
-                    # Generate HTML report
-                    html_report = generate_monthly_report_html(user, report_data, report_month, report_year)
+        # Reports are queued and go out in batches over pooled SMTP sessions
+        with get_mail_transport().outbox() as outbox:
+            for user in users:
+                try:
+                    report_data = reports[user.id]
                     
-                    # Send email
-                    subject = f"Monthly Parking Report - {report_month}/{report_year}"
-                    send_email(user.email, subject, html_report)
-                    successful_sends += 1
-                
-            except Exception as e:
-                print(f"Failed to send monthly report to {user.username}: {str(e)}")
-                failed_sends += 1
+                    # Only send if user has activity
+                    if report_data['total_reservations'] > 0:
+                        # Generate HTML report
+                        html_report = generate_monthly_report_html(user, report_data, report_month, report_year)
+                        rendered[user.id] = (report_data, html_report)
+                        
+                        # Queue email
+                        subject = f"Monthly Parking Report - {report_month}/{report_year}"
+                        if Config.MAIL_SERVER:
+                            outbox.add(build_email(user.email, subject, html_report), key=user.username)
+                        successful_sends += 1
+                    
+                except Exception as e:
+                    print(f"Failed to send monthly report to {user.username}: {str(e)}")
+                    failed_sends += 1
+        
+        for username, error in outbox.failed.items():
+            print(f"Failed to send monthly report to {username}: {error}")
+        successful_sends -= len(outbox.failed)
+        failed_sends += len(outbox.failed)
+        
+        _store_rendered_reports(rendered, report_month, report_year, watermarks)
         
         return {
             'status': 'completed',
@@ -802,6 +597,11 @@ def send_email(to_email, subject, html_content):
         print("⚠️ Email server not configured")
         return
     
+    # Send email
+    get_mail_transport().send(build_email(to_email, subject, html_content))
+
+def build_email(to_email, subject, html_content):
+    """Build an HTML email message"""
     msg = MIMEMultipart('alternative')
     msg['From'] = Config.MAIL_USERNAME
     msg['To'] = to_email
@@ -811,10 +611,4 @@ def send_email(to_email, subject, html_content):
     html_part = MIMEText(html_content, 'html')
     msg.attach(html_part)
     
-    # Send email
-    with smtplib.SMTP(Config.MAIL_SERVER, Config.MAIL_PORT) as server:
-        if Config.MAIL_USE_TLS:
-            server.starttls()
-        if Config.MAIL_USERNAME and Config.MAIL_PASSWORD:
-            server.login(Config.MAIL_USERNAME, Config.MAIL_PASSWORD)
-        server.send_message(msg)
+    return msg
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Analytics rollup tests
+Reservation inserts, updates and deletes keep the hourly and daily rollups
+equal to a full rebuild from reservations, and /api/admin/analytics answers
+any date range from the rollups without reading the reservations table
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import db
+
+DAY = datetime(2025, 3, 10)
+
+
+def _snapshot():
+    from models.analytics import LotDailyRollup, LotHourlyRollup
+
+    return {
+        model.__tablename__: {
+            (row.lot_id, row.bucket_start): (row.reservations, row.completed_reservations,
+                                             round(float(row.revenue), 2), round(row.occupancy_minutes, 3))
+            for row in model.query.all()
+            if row.reservations or row.completed_reservations or row.revenue or row.occupancy_minutes
+        }
+        for model in (LotHourlyRollup, LotDailyRollup)
+    }
+
+
+def _rebuilt():
+    from models.analytics import rebuild_analytics_rollups
+
+    rebuild_analytics_rollups()
+    return _snapshot()
+
+
+def _reserve(user, spot, parked, hours=None, cost=None):
+    from models.reservation import Reservation
+
+    reservation = Reservation(spot_id=spot.id, user_id=user.id, vehicle_number='KA01XY0001',
+                              parking_timestamp=parked, created_at=parked, status='active')
+    if hours is not None:
+        reservation.leaving_timestamp = parked + timedelta(hours=hours)
+        reservation.total_hours = hours
+        reservation.parking_cost = cost
+        reservation.status = 'completed'
+    db.session.add(reservation)
+    return reservation
+
+
+def test_incremental_rollups_match_a_rebuild(make_user, make_lot):
+    from models.reservation import Reservation
+
+    user = make_user()
+    downtown, airport = make_lot('Downtown'), make_lot('Airport')
+    _reserve(user, downtown.parking_spots[0], DAY + timedelta(hours=9, minutes=30), hours=2, cost=20)
+    _reserve(user, airport.parking_spots[0], DAY + timedelta(hours=23, minutes=15), hours=1.5, cost=15)
+    open_stay = _reserve(user, downtown.parking_spots[1], DAY + timedelta(hours=14))
+    moved = _reserve(user, downtown.parking_spots[2], DAY + timedelta(hours=16), hours=1, cost=10)
+    doomed = _reserve(user, airport.parking_spots[1], DAY + timedelta(hours=8), hours=3, cost=30)
+    db.session.commit()
+
+    hourly = _snapshot()['lot_hourly_rollups']
+    assert hourly[(downtown.id, DAY + timedelta(hours=9))] == (1, 0, 0, 30)
+    assert hourly[(downtown.id, DAY + timedelta(hours=11))] == (0, 1, 20, 30)
+    assert hourly[(airport.id, DAY + timedelta(days=1))] == (0, 1, 15, 45)   # crosses midnight
+    incremental = _snapshot()
+    assert incremental == _rebuilt()
+
+    # Completing, moving, re-pricing and deleting reservations
+    open_stay.leaving_timestamp = open_stay.parking_timestamp + timedelta(minutes=90)
+    open_stay.parking_cost = 15
+    open_stay.status = 'completed'
+    moved.spot_id = airport.parking_spots[2].id
+    moved.parking_cost = 12
+    db.session.delete(doomed)
+    db.session.commit()
+    assert db.session.get(Reservation, open_stay.id).status == 'completed'
+
+    incremental = _snapshot()
+    assert incremental == _rebuilt()
+    assert (airport.id, DAY + timedelta(hours=8)) not in incremental['lot_hourly_rollups']
+    assert incremental['lot_daily_rollups'][(downtown.id, DAY)] == (2, 2, 35, 210)
+
+
+def test_rolled_back_changes_leave_rollups_alone(make_user, make_lot):
+    user = make_user()
+    lot = make_lot()
+    _reserve(user, lot.parking_spots[0], DAY, hours=1, cost=10)
+    db.session.commit()
+    before = _snapshot()
+
+    _reserve(user, lot.parking_spots[1], DAY, hours=2, cost=20)
+    db.session.flush()
+    db.session.rollback()
+    assert _snapshot() == before
+
+
+@pytest.fixture
+def week_of_history(make_user, make_lot):
+    user = make_user()
+    lots = [make_lot('Downtown', spots=2), make_lot('Airport', spots=4)]
+    for day in range(7):
+        for lot in lots:
+            _reserve(user, lot.parking_spots[0], DAY + timedelta(days=day, hours=9), hours=2, cost=20)
+    db.session.commit()
+    return lots
+
+
+def test_analytics_endpoint_sums_rollups(client, make_user, auth_headers, count_queries, week_of_history):
+    downtown, airport = week_of_history
+    headers = auth_headers(make_user('admin', role='admin'))
+
+    with count_queries() as statements:
+        response = client.get('/api/admin/analytics?start=2025-03-11&end=2025-03-13', headers=headers)
+    assert response.status_code == 200, response.get_json()
+    assert not any('FROM reservations' in statement for statement in statements)
+
+    data = response.get_json()
+    assert data['range'] == {'start': '2025-03-11', 'end': '2025-03-13'}
+    assert data['daily_revenue'] == {'dates': ['03/11', '03/12', '03/13'], 'amounts': [40, 40, 40]}
+    assert data['weekly_revenue'] == {'weeks': ['Week 11'], 'amounts': [120]}
+    # 2 hours a day over 3 days: 360 minutes of 2 (resp. 4) spots x 3 days
+    assert data['lot_utilization']['lot_names'] == ['Downtown', 'Airport']
+    assert data['lot_utilization']['utilization_rates'] == [round(360 / (2 * 3 * 1440) * 100, 1),
+                                                            round(360 / (4 * 3 * 1440) * 100, 1)]
+    assert data['peak_hours']['occupancy'][9] == 2 and data['peak_hours']['occupancy'][12] == 0
+    assert data['summary_stats'] == {'total_reservations': 6, 'total_completed_reservations': 6,
+                                     'total_revenue': 120, 'average_parking_duration': 2}
+
+
+def test_analytics_endpoint_validates_the_range(client, make_user, auth_headers):
+    admin, user = make_user('admin', role='admin'), make_user('driver')
+
+    assert client.get('/api/admin/analytics', headers=auth_headers(user)).status_code == 403
+    assert client.get('/api/admin/analytics?start=03/11/2025', headers=auth_headers(admin)).status_code == 400
+    assert client.get('/api/admin/analytics?start=2025-03-13&end=2025-03-11',
+                      headers=auth_headers(admin)).status_code == 400
+
+    data = client.get('/api/admin/analytics', headers=auth_headers(admin)).get_json()
+    assert len(data['daily_revenue']['dates']) == 7
+    assert data['summary_stats']['total_revenue'] == 0
+
+
+def test_migration_creates_the_rollup_tables(tmp_path, monkeypatch):
+    import sqlite3
+    from migrate_analytics_rollups import ROLLUP_TABLES, migrate_analytics_rollup_tables
+
+    (tmp_path / 'instance').mkdir()
+    sqlite3.connect(tmp_path / 'instance' / 'parking2.db').close()
+    monkeypatch.chdir(tmp_path)
+    assert migrate_analytics_rollup_tables()
+    assert migrate_analytics_rollup_tables()  # idempotent
+
+    conn = sqlite3.connect(tmp_path / 'instance' / 'parking2.db')
+    created = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    conn.close()
+    assert set(ROLLUP_TABLES) <= created
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Tag-based cache invalidation tests
+Events map to the narrowest cache tags, and invalidating a tag removes only
+the entries registered under it. The Redis round-trip test is skipped when no
+Redis server is reachable
+"""
+
+from testing_utils import requires_redis
+from utils.cache_enhanced import cache_manager, generate_cache_tags, tags_for_event
+
+
+def test_reservation_events_only_touch_that_users_entries():
+    tags = tags_for_event('reservation_created', user_id=42, lot_id=7)
+    assert 'lots' in tags
+    assert 'lot_details:lot_7' in tags
+    assert 'dashboard:user_42' in tags
+    assert 'reservations:user_42' in tags
+    # Other users' dashboards and reservations stay cached
+    assert 'dashboard' not in tags and 'reservations' not in tags
+
+
+def test_events_without_ids_fall_back_to_the_namespace():
+    tags = tags_for_event('reservation_updated')
+    assert {'lots', 'lot_details', 'dashboard', 'reservations', 'parking_history'} <= tags
+
+
+def test_unknown_names_are_treated_as_tags():
+    assert tags_for_event('user_42') == {'user_42'}
+    assert generate_cache_tags('user_dashboard', user_id=42) == ['dashboard', 'dashboard:user_42', 'user_42']
+
+
+@requires_redis
+def test_invalidating_a_tag_deletes_only_its_entries():
+    cache_manager.set('test_tags:a', {'v': 1}, 60, tags=['test_tag_one', 'test_tag_shared'])
+    cache_manager.set('test_tags:b', {'v': 2}, 60, tags=['test_tag_two', 'test_tag_shared'])
+
+    assert cache_manager.invalidate_tags(['test_tag_one']) == 1
+    assert cache_manager.get('test_tags:a') is None
+    assert cache_manager.get('test_tags:b') == {'v': 2}
+
+    assert cache_manager.invalidate_tags(['test_tag_shared']) == 1
+    assert cache_manager.get('test_tags:b') is None
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Cache stampede protection tests
+Stale entries are served while a single worker rebuilds them, early refresh
+kicks in near expiry, and cold misses wait for an in-flight rebuild. Redis is
+replaced by an in-memory stand-in of CacheManager's storage methods
+"""
+
+import threading
+import time
+
+import pytest
+from flask import Flask, jsonify
+
+from utils import cache_enhanced
+from utils.cache_enhanced import cached_endpoint, entry_state
+
+
+class MemoryStore:
+    def __init__(self):
+        self.values = {}
+        self.locks = {}
+        self.mutex = threading.Lock()
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, timeout=None, tags=None):
+        self.values[key] = value
+        return True
+
+    def acquire_lock(self, name, timeout):
+        with self.mutex:
+            if name in self.locks:
+                return None
+            self.locks[name] = token = object()
+            return token
+
+    def release_lock(self, name, token):
+        with self.mutex:
+            if self.locks.get(name) is token:
+                del self.locks[name]
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = MemoryStore()
+    manager = cache_enhanced.cache_manager
+    monkeypatch.setattr(manager, 'is_available', lambda: True)
+    for name in ('get', 'set', 'acquire_lock', 'release_lock'):
+        monkeypatch.setattr(manager, name, getattr(store, name))
+    return store
+
+
+def _app(calls, delay=0.0):
+    app = Flask(__name__)
+
+    @app.route('/stats')
+    @cached_endpoint('admin_dashboard', timeout=60)
+    def stats():
+        calls.append(1)
+        time.sleep(delay)
+        return jsonify({'version': len(calls)})
+
+    return app
+
+
+def test_entry_state():
+    now = 1000.0
+    assert entry_state({'created': now - 10, 'compute_time': 0}, 60, now=now) == 'fresh'
+    assert entry_state({'created': now - 61, 'compute_time': 0}, 60, now=now) == 'stale'
+    # An expensive entry one second from expiry is almost always refreshed early
+    near_expiry = {'created': now - 59, 'compute_time': 60}
+    states = [entry_state(near_expiry, 60, now=now) for _ in range(200)]
+    assert states.count('refresh') > 180
+    assert entry_state(near_expiry, 60, beta=0, now=now) == 'fresh'
+    assert entry_state({}, 60, now=now) == 'fresh'
+
+
+def test_stale_entry_is_served_while_another_worker_rebuilds(store):
+    calls = []
+    client = _app(calls).test_client()
+    assert client.get('/stats').get_json() == {'version': 1}
+
+    key, entry = next(iter(store.values.items()))
+    entry['created'] -= 120          # now past its timeout, inside the stale window
+    store.locks[key] = 'other worker'
+
+    assert client.get('/stats').get_json() == {'version': 1}
+    assert len(calls) == 1
+
+    del store.locks[key]             # the rebuild lock is free again
+    assert client.get('/stats').get_json() == {'version': 2}
+    assert client.get('/stats').get_json() == {'version': 2}
+    assert len(calls) == 2
+
+
+def test_cold_miss_runs_the_view_once_under_concurrency(store):
+    calls = []
+    app = _app(calls, delay=0.3)
+    results = []
+
+    def request_stats():
+        results.append(app.test_client().get('/stats').get_json())
+
+    threads = [threading.Thread(target=request_stats) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{'version': 1}] * 8
+
+
+def test_cold_miss_does_not_wait_when_the_lock_cannot_be_asked(store, monkeypatch):
+    monkeypatch.setattr(cache_enhanced.cache_manager, 'acquire_lock',
+                        lambda name, timeout: cache_enhanced.LOCK_UNAVAILABLE)
+    calls = []
+    client = _app(calls).test_client()
+
+    started = time.time()
+    assert client.get('/stats').get_json() == {'version': 1}
+    assert time.time() - started < cache_enhanced.REBUILD_WAIT / 2
+    assert len(calls) == 1
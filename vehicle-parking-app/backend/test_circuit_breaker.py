@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Circuit breaker tests
+The cache decides availability from the outcome of real calls: failures open
+the circuit with exponential backoff, one trial call is allowed after the
+delay, and the background probe closes it again once the service is back
+"""
+
+import time
+
+import redis
+
+from utils.circuit_breaker import CircuitBreaker, CLOSED, HALF_OPEN, OPEN
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_failure_opens_and_backoff_grows():
+    clock = FakeClock()
+    breaker = CircuitBreaker('test', base_delay=1.0, max_delay=8.0, clock=clock)
+    assert breaker.allow_request()
+
+    breaker.record_failure(ConnectionError('down'))
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+    first_delay = breaker.retry_at - clock.now
+
+    clock.now = breaker.retry_at
+    assert breaker.allow_request()           # the single trial call
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow_request()       # everyone else keeps skipping
+
+    breaker.record_failure(ConnectionError('still down'))
+    assert breaker.state == OPEN
+    assert breaker.retry_at - clock.now > first_delay
+
+    for _ in range(10):
+        clock.now = breaker.retry_at
+        breaker.allow_request()
+        breaker.record_failure()
+    assert breaker.retry_at - clock.now <= 8.0 * 1.2
+
+
+def test_success_closes_the_circuit():
+    clock = FakeClock()
+    breaker = CircuitBreaker('test', clock=clock)
+    breaker.record_failure()
+    clock.now = breaker.retry_at
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow_request()
+    assert breaker.stats()['failures'] == 0
+
+
+def test_background_probe_detects_recovery():
+    healthy = {'up': False}
+
+    def probe():
+        if not healthy['up']:
+            raise ConnectionError('down')
+
+    breaker = CircuitBreaker('test', base_delay=60.0, probe=probe, probe_interval=0.01)
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    healthy['up'] = True
+    deadline = time.time() + 2
+    while breaker.state != CLOSED and time.time() < deadline:
+        time.sleep(0.01)
+    assert breaker.state == CLOSED
+
+
+def test_cache_manager_skips_redis_while_open():
+    from utils.cache_enhanced import CacheManager
+
+    calls = []
+
+    class DownRedis:
+        def get(self, key):
+            calls.append(key)
+            raise redis.ConnectionError('connection refused')
+
+    manager = CacheManager.__new__(CacheManager)
+    manager.redis_client = DownRedis()
+    manager.breaker = CircuitBreaker('test', base_delay=60.0)
+
+    assert manager.get('lots') is None
+    assert manager.get('lots') is None
+    assert len(calls) == 1
+    assert not manager.is_available()
+
+
+def test_is_open_never_claims_the_trial():
+    clock = FakeClock()
+    breaker = CircuitBreaker('test', clock=clock)
+    breaker.record_failure()
+    assert breaker.is_open()
+
+    clock.now = breaker.retry_at
+    assert not breaker.is_open() and not breaker.is_open()
+    assert breaker.state == OPEN
+    assert breaker.allow_request()           # the call site claims it
+    assert breaker.is_open()                 # trial in flight
+
+
+def test_gated_cache_call_sends_the_trial():
+    from utils.cache_enhanced import CacheManager
+
+    clock = FakeClock()
+    calls = []
+
+    class BackRedis:
+        def get(self, key):
+            calls.append(key)
+            return None
+
+    manager = CacheManager.__new__(CacheManager)
+    manager.redis_client = BackRedis()
+    manager.breaker = CircuitBreaker('test', clock=clock)
+    manager.breaker.record_failure()
+    clock.now = manager.breaker.retry_at
+
+    # cached_endpoint / invalidate_cache gate first, then make the call
+    assert manager.is_available()
+    assert manager.get('lots') is None
+    assert len(calls) == 1
+    assert manager.breaker.state == CLOSED
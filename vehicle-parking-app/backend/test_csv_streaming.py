@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Streaming admin CSV export tests
+The export is written chunk by chunk from one joined query: the number of SQL
+statements does not grow with the number of rows and progress is reported
+after every chunk
+"""
+
+import csv
+from datetime import datetime, timedelta
+
+from database import db
+from tasks import export_csv
+from tasks.export_csv import ADMIN_CSV_HEADERS, stream_admin_export
+
+
+def _add_reservations(user, spots, count, status='completed'):
+    from models.reservation import Reservation
+    start = datetime(2024, 1, 1)
+    db.session.bulk_insert_mappings(Reservation, [
+        {
+            'spot_id': spots[i % len(spots)].id,
+            'user_id': user.id,
+            'vehicle_number': f'MH12AB{i:04d}',
+            'parking_timestamp': start + timedelta(minutes=i),
+            'leaving_timestamp': start + timedelta(minutes=i, hours=2),
+            'parking_cost': 20,
+            'total_hours': 2,
+            'status': status,
+            'created_at': start + timedelta(minutes=i),
+            'updated_at': start + timedelta(minutes=i)
+        }
+        for i in range(count)
+    ])
+    db.session.commit()
+
+
+def test_rows_match_the_joined_columns(app, make_user, make_lot, tmp_path):
+    user = make_user()
+    lot = make_lot(name='Mall', spots=2, price=15.0)
+    _add_reservations(user, lot.parking_spots, 3)
+    _add_reservations(user, lot.parking_spots, 2, status='cancelled')
+
+    path = tmp_path / 'export.csv'
+    assert stream_admin_export(str(path), {'status': 'completed'}) == 3
+
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ADMIN_CSV_HEADERS
+    assert len(rows) == 4
+    record = dict(zip(ADMIN_CSV_HEADERS, rows[1]))
+    assert record['Username'] == 'driver'
+    assert record['User Email'] == 'driver@example.com'
+    assert record['Parking Lot'] == 'Mall'
+    assert record['Parking Spot'] in {spot.spot_number for spot in lot.parking_spots}
+    assert record['Lot Price per Hour'] == '15.0'
+    assert record['Cost ($)'] == '20.0'
+    # Newest first
+    assert rows[1][7] > rows[-1][7]
+    assert not (tmp_path / 'export.csv.part').exists()
+
+
+def test_statement_count_is_independent_of_row_count(app, make_user, make_lot, tmp_path,
+                                                     count_queries, monkeypatch):
+    monkeypatch.setattr(export_csv, 'EXPORT_CHUNK_SIZE', 100)
+    user = make_user()
+    lot = make_lot(spots=5)
+    _add_reservations(user, lot.parking_spots, 1050)
+
+    progress = []
+    with count_queries() as statements:
+        written = stream_admin_export(str(tmp_path / 'big.csv'),
+                                   progress=lambda *args: progress.append(args))
+
+    assert written == 1050
+    assert len(statements) == 2          # COUNT + one streamed SELECT
+    assert len(progress) == 11           # one update per chunk
+    assert [p[0] for p in progress][-2:] == [1000, 1050]
+    assert all(total == 1050 and rate > 0 for _, total, rate in progress)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Export download tests
+Downloads honour Range and If-None-Match, and a pre-compressed .gz sibling is
+served with Content-Encoding to clients that accept gzip
+"""
+
+import gzip
+import os
+
+import pytest
+
+EXPORTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'exports')
+
+
+@pytest.fixture
+def export_file(make_user):
+    user = make_user('rangetester')
+    filename = 'parking_history_rangetester_20240101_000000.csv'
+    path = os.path.join(EXPORTS_DIR, filename)
+    os.makedirs(EXPORTS_DIR, exist_ok=True)
+    body = b'Reservation ID,Status\n' + b''.join(b'%d,Completed\n' % i for i in range(2000))
+    with open(path, 'wb') as f:
+        f.write(body)
+    yield user, filename, body
+    for leftover in (path, f'{path}.gz'):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+
+
+def test_range_and_conditional_requests(client, auth_headers, export_file):
+    user, filename, body = export_file
+    url = f'/api/user/download-csv/{filename}'
+    headers = auth_headers(user)
+
+    full = client.get(url, headers=headers)
+    assert full.status_code == 200
+    assert full.data == body
+    assert full.headers['Accept-Ranges'] == 'bytes'
+    etag = full.headers['ETag']
+
+    partial = client.get(url, headers={**headers, 'Range': 'bytes=100-199'})
+    assert partial.status_code == 206
+    assert partial.data == body[100:200]
+    assert partial.headers['Content-Range'] == f'bytes 100-199/{len(body)}'
+
+    # Touching the file (cleanup keeps current exports alive) keeps the ETag
+    os.utime(os.path.join(EXPORTS_DIR, filename))
+    cached = client.get(url, headers={**headers, 'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.data == b''
+
+
+def test_gzip_sibling_is_served_with_content_encoding(client, auth_headers, export_file):
+    user, filename, body = export_file
+    with gzip.open(os.path.join(EXPORTS_DIR, f'{filename}.gz'), 'wb') as f:
+        f.write(body)
+    url = f'/api/user/download-csv/{filename}'
+
+    compressed = client.get(url, headers={**auth_headers(user), 'Accept-Encoding': 'gzip'})
+    assert compressed.status_code == 200
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.headers['Content-Type'].startswith('text/csv')
+    assert 'Accept-Encoding' in compressed.headers['Vary']
+    assert gzip.decompress(compressed.data) == body
+    assert len(compressed.data) < len(body)
+
+    plain = client.get(url, headers=auth_headers(user))
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.data == body
+    assert plain.headers['ETag'] != compressed.headers['ETag']
+
+
+def test_other_users_exports_are_refused(client, make_user, auth_headers, export_file):
+    _, filename, _ = export_file
+    other = make_user('someoneelse')
+    response = client.get(f'/api/user/download-csv/{filename}', headers=auth_headers(other))
+    assert response.status_code == 403
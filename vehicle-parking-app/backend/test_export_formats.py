@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Export format tests
+gzip CSV holds the same rows as plain CSV, Parquet keeps typed columns, and
+the export endpoints reject formats they cannot produce
+"""
+
+import csv
+import gzip
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import db
+from tasks.export_csv import (
+    ADMIN_CSV_HEADERS, USER_CSV_HEADERS, export_format_available, export_mimetype,
+    stream_admin_export, write_user_export
+)
+
+
+def _add_reservations(user, spots, count):
+    from models.reservation import Reservation
+    start = datetime(2024, 1, 1)
+    db.session.bulk_insert_mappings(Reservation, [
+        {
+            'spot_id': spots[i % len(spots)].id,
+            'user_id': user.id,
+            'vehicle_number': f'MH12AB{i:04d}',
+            'parking_timestamp': start + timedelta(minutes=i),
+            'parking_cost': 20,
+            'total_hours': 2,
+            'status': 'completed',
+            'created_at': start + timedelta(minutes=i),
+            'updated_at': start + timedelta(minutes=i)
+        }
+        for i in range(count)
+    ])
+    db.session.commit()
+
+
+def test_gzip_csv_matches_plain_csv(app, make_user, make_lot, tmp_path):
+    user = make_user()
+    lot = make_lot(spots=3)
+    _add_reservations(user, lot.parking_spots, 500)
+
+    stream_admin_export(str(tmp_path / 'plain.csv'))
+    assert stream_admin_export(str(tmp_path / 'packed.csv.gz'), export_format='csv.gz') == 500
+
+    with open(tmp_path / 'plain.csv', newline='', encoding='utf-8') as f:
+        plain = list(csv.reader(f))
+    with gzip.open(tmp_path / 'packed.csv.gz', 'rt', newline='', encoding='utf-8') as f:
+        packed = list(csv.reader(f))
+    assert packed == plain and packed[0] == ADMIN_CSV_HEADERS
+    assert (tmp_path / 'packed.csv.gz').stat().st_size < (tmp_path / 'plain.csv').stat().st_size / 4
+
+
+def test_user_gzip_export_is_a_copy_of_the_csv(app, make_user, make_lot, tmp_path):
+    user = make_user()
+    lot = make_lot(spots=2)
+    _add_reservations(user, lot.parking_spots, 5)
+
+    export = write_user_export(user, str(tmp_path), export_format='csv.gz')
+    assert export['filename'].endswith('.csv.gz')
+    with gzip.open(export['file_path'], 'rt', newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == USER_CSV_HEADERS and len(rows) == 6
+
+    again = write_user_export(user, str(tmp_path), export_format='csv.gz')
+    assert again['mode'] == 'reused' and again['file_path'] == export['file_path']
+
+    # A new CSV version never leaves an outdated compressed copy behind
+    _add_reservations(user, lot.parking_spots, 1)
+    updated = write_user_export(user, str(tmp_path), export_format='csv')
+    assert updated['mode'] != 'reused'
+    assert list(tmp_path.glob('*.gz')) == []
+
+
+def test_parquet_export(app, make_user, make_lot, tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    user = make_user()
+    lot = make_lot(spots=2, price=12.5)
+    _add_reservations(user, lot.parking_spots, 30)
+
+    path = tmp_path / 'export.parquet'
+    assert stream_admin_export(str(path), export_format='parquet') == 30
+    table = pq.read_table(path)
+    assert table.column_names == ADMIN_CSV_HEADERS
+    assert table.num_rows == 30
+    assert table.column('Lot Price per Hour').to_pylist() == [12.5] * 30
+    assert table.column('Leaving Timestamp').null_count == 30
+
+    export = write_user_export(user, str(tmp_path), export_format='parquet')
+    assert pq.read_table(export['file_path']).column('Reservation ID').to_pylist()[0] == 30
+
+
+def test_export_formats_are_validated(client, make_user, auth_headers):
+    user = make_user()
+    response = client.post('/api/user/export-csv', json={'format': 'xlsx'}, headers=auth_headers(user))
+    assert response.status_code == 400
+
+    admin = make_user('admin', role='admin')
+    response = client.post('/api/admin/export-csv', json={'format': 'xlsx'}, headers=auth_headers(admin))
+    assert response.status_code == 400
+
+    assert export_format_available('csv.gz')
+    assert export_mimetype('admin_reservations_export_1.csv.gz') == 'application/gzip'
+    assert export_mimetype('parking_history_driver_1.csv') == 'text/csv'
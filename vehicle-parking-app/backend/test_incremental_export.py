@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Incremental user CSV export tests
+An unchanged history reuses the previous file, new and updated reservations
+are merged into it, and anything the watermark cannot account for (deleted
+rows, edited lots) falls back to a full rebuild with the same contents
+"""
+
+import csv
+from datetime import datetime, timedelta
+
+from database import db
+from tasks.export_csv import USER_CSV_HEADERS, write_user_export
+
+
+def _reserve(user, spot, created_at, status='completed'):
+    from models.reservation import Reservation
+    reservation = Reservation(
+        spot_id=spot.id,
+        user_id=user.id,
+        vehicle_number='MH12AB1234',
+        parking_timestamp=created_at,
+        parking_cost=20,
+        status=status,
+        created_at=created_at,
+        updated_at=created_at
+    )
+    db.session.add(reservation)
+    db.session.commit()
+    return reservation
+
+
+def _rows(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == USER_CSV_HEADERS
+    return rows[1:]
+
+
+def _full_export_rows(user, tmp_path):
+    export = write_user_export(user, str(tmp_path / 'full'), incremental=False)
+    return _rows(export['file_path'])
+
+
+def test_reuse_merge_and_rebuild(app, make_user, make_lot, tmp_path, count_queries):
+    exports_dir = tmp_path / 'exports'
+    exports_dir.mkdir()
+    (tmp_path / 'full').mkdir()
+    user = make_user()
+    lot = make_lot(name='Mall', spots=3)
+    start = datetime.utcnow() - timedelta(days=30)
+    first = _reserve(user, lot.parking_spots[0], start)
+    _reserve(user, lot.parking_spots[1], start + timedelta(days=1))
+
+    export = write_user_export(user, str(exports_dir))
+    assert export['mode'] == 'full' and export['records_count'] == 2
+
+    # Nothing changed: same file, one aggregate and the spot/lot values
+    with count_queries() as statements:
+        again = write_user_export(user, str(exports_dir))
+    assert again['mode'] == 'reused' and again['filename'] == export['filename']
+    assert len(statements) == 2
+
+    # A new booking and an update to an old one are merged in
+    newest = _reserve(user, lot.parking_spots[2], datetime.utcnow(), status='active')
+    first.remarks = 'Left early'
+    db.session.commit()
+
+    merged = write_user_export(user, str(exports_dir))
+    assert merged['mode'] == 'incremental' and merged['records_count'] == 3
+    rows = _rows(merged['file_path'])
+    assert rows == _full_export_rows(user, tmp_path)
+    assert rows[0][0] == str(newest.id)
+    assert rows[-1][15] == 'Left early'
+    assert [path.name for path in exports_dir.glob('*.csv')] == [merged['filename']]
+
+    # A deleted reservation cannot be merged, so the export is rebuilt
+    db.session.delete(newest)
+    db.session.commit()
+    rebuilt = write_user_export(user, str(exports_dir))
+    assert rebuilt['mode'] == 'full' and rebuilt['records_count'] == 2
+    assert _rows(rebuilt['file_path']) == _full_export_rows(user, tmp_path)
+
+
+def test_lot_changes_force_a_rebuild(app, make_user, make_lot, tmp_path):
+    exports_dir = tmp_path / 'exports'
+    exports_dir.mkdir()
+    user = make_user()
+    lot = make_lot(name='Mall', spots=1)
+    _reserve(user, lot.parking_spots[0], datetime.utcnow() - timedelta(days=1))
+    write_user_export(user, str(exports_dir))
+
+    lot.prime_location_name = 'City Mall'
+    db.session.commit()
+
+    export = write_user_export(user, str(exports_dir))
+    assert export['mode'] == 'full'
+    assert _rows(export['file_path'])[0][4] == 'City Mall'
+
+
+def test_other_users_activity_in_the_lot_keeps_the_export(client, make_user, make_lot, auth_headers, tmp_path):
+    exports_dir = tmp_path / 'exports'
+    exports_dir.mkdir()
+    user, other = make_user(), make_user('neighbour')
+    lot = make_lot(name='Mall', spots=3)
+    _reserve(user, lot.parking_spots[0], datetime.utcnow() - timedelta(days=1))
+    write_user_export(user, str(exports_dir))
+
+    # Booking, parking and releasing update the lot's counters
+    headers = auth_headers(other)
+    reservation_id = client.post('/api/user/reservations', json={
+        'parking_lot_id': lot.id, 'vehicle_number': 'TN01AB1234'
+    }, headers=headers).get_json()['reservation']['id']
+    client.put(f'/api/user/reservations/{reservation_id}/park', headers=headers)
+    client.put(f'/api/user/reservations/{reservation_id}/release', headers=headers)
+    assert write_user_export(user, str(exports_dir))['mode'] == 'reused'
+
+    # A booking of this user on a spot not yet in the file is still merged
+    _reserve(user, lot.parking_spots[2], datetime.utcnow(), status='active')
+    assert write_user_export(user, str(exports_dir))['mode'] == 'incremental'
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+In-process L1 cache tests
+LRU bound, TTL, tag invalidation, dropping fills that raced an invalidation,
+and applying invalidation messages received from other processes
+"""
+
+import json
+
+from utils.local_cache import LocalLRUCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_and_ttl():
+    clock = FakeClock()
+    cache = LocalLRUCache(max_entries=2, default_ttl=10, clock=clock)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1      # 'a' is now most recently used
+    cache.set('c', 3)
+    assert cache.get('b') is None   # least recently used was evicted
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+    # TTL is capped at the L1 default even if Redis keeps the value longer
+    cache.set('long', 'x', ttl=300)
+    clock.now = 10.5
+    assert cache.get('long') is None
+
+
+def test_tag_invalidation():
+    cache = LocalLRUCache()
+    cache.set('lots', [1], tags=['lots'])
+    cache.set('lot:1', {'id': 1}, tags=['lot_details', 'lot_details:lot_1'])
+    cache.set('lot:2', {'id': 2}, tags=['lot_details', 'lot_details:lot_2'])
+
+    assert cache.invalidate_tags(['lot_details:lot_1']) == 1
+    assert cache.get('lot:1') is None and cache.get('lot:2') == {'id': 2}
+    assert cache.invalidate_tags(['lots', 'lot_details']) == 2
+    assert cache.stats()['entries'] == 0
+
+
+def test_fill_that_raced_an_invalidation_is_dropped():
+    cache = LocalLRUCache()
+    generation = cache.generation
+    cache.invalidate_tags(['lots'])   # arrives while the value is being fetched
+    assert cache.set('lots', 'stale', tags=['lots'], generation=generation) is False
+    assert cache.get('lots') is None
+    assert cache.set('lots', 'fresh', tags=['lots'], generation=cache.generation) is True
+
+
+def test_invalidation_messages_from_other_processes():
+    from utils.cache_enhanced import CacheManager
+
+    manager = CacheManager.__new__(CacheManager)
+    manager.local = LocalLRUCache()
+    manager.local.set('lots', [1], tags=['lots'])
+    manager.local.set('public_stats', {}, tags=['public_stats'])
+    manager.local.set('k', 'v')
+
+    manager._apply_invalidation(json.dumps({'tags': ['lots']}))
+    assert manager.local.get('lots') is None and manager.local.get('public_stats') == {}
+    manager._apply_invalidation(json.dumps({'keys': ['k']}))
+    assert manager.local.get('k') is None
+    manager._apply_invalidation(json.dumps({'clear': True}))
+    assert manager.local.stats()['entries'] == 0
+    manager._apply_invalidation('not json')  # ignored
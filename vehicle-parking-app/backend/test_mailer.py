@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+SMTP transport tests
+Messages share pooled sessions, a broadcast is sent in batches by a bounded
+number of threads, per-recipient errors don't sink the batch, and a dropped
+session is replaced transparently. Benchmarked against the local SMTP sink
+"""
+
+import smtplib
+import time
+from email.mime.text import MIMEText
+
+from smtp_sink import SMTPSink
+from utils.mailer import MailTransport, SMTPConnectionPool
+
+
+def _message(to):
+    msg = MIMEText('<p>Hi</p>', 'html')
+    msg['From'] = 'noreply@parkingapp.local'
+    msg['To'] = to
+    msg['Subject'] = 'Test'
+    return msg
+
+
+def _transport(sink, workers=4, batch_size=50):
+    host, port = sink.address
+    pool = SMTPConnectionPool(host, port, max_size=workers)
+    return MailTransport(pool, max_workers=workers, batch_size=batch_size)
+
+
+def test_broadcast_reuses_a_few_sessions():
+    with SMTPSink() as sink:
+        transport = _transport(sink, workers=4, batch_size=25)
+        with transport.outbox() as outbox:
+            for i in range(300):
+                outbox.add(_message(f'user{i}@example.com'))
+        transport.send(_message('single@example.com'))
+        transport.pool.close_all()
+
+    assert outbox.sent == 300 and outbox.failed == {}
+    assert sink.messages == 301
+    assert sink.connections <= 4
+
+
+class FlakySMTP:
+    """smtplib.SMTP stand-in: refuses one recipient, drops the first session once"""
+    instances = []
+
+    def __init__(self, host, port, timeout=None):
+        self.sent = []
+        self.number = len(FlakySMTP.instances)
+        FlakySMTP.instances.append(self)
+
+    def ehlo_or_helo_if_needed(self):
+        pass
+
+    def has_extn(self, name):
+        return False
+
+    def send_message(self, msg):
+        if self.number == 0 and len(self.sent) == 2:
+            raise smtplib.SMTPServerDisconnected('connection dropped')
+        if msg['To'] == 'bounce@example.com':
+            raise smtplib.SMTPRecipientsRefused({msg['To']: (550, b'no such user')})
+        self.sent.append(msg['To'])
+
+    def quit(self):
+        pass
+
+
+def test_errors_fail_only_their_message():
+    FlakySMTP.instances = []
+    pool = SMTPConnectionPool('localhost', 25, max_size=1, smtp_factory=FlakySMTP)
+    transport = MailTransport(pool, max_workers=1, batch_size=10)
+
+    recipients = ['a@example.com', 'b@example.com', 'c@example.com', 'bounce@example.com', 'd@example.com']
+    with transport.outbox() as outbox:
+        for to in recipients:
+            outbox.add(_message(to), key=to.split('@')[0])
+
+    delivered = [to for smtp in FlakySMTP.instances for to in smtp.sent]
+    assert delivered == ['a@example.com', 'b@example.com', 'c@example.com', 'd@example.com']
+    assert list(outbox.failed) == ['bounce']
+    assert outbox.sent == 4
+    assert len(FlakySMTP.instances) == 2   # the dropped session was replaced once
+
+
+def test_pooled_broadcast_benchmark():
+    """Compare one connection per email with the pooled, batched transport"""
+    count = 200
+    with SMTPSink(message_latency=0.002, connect_latency=0.01) as sink:
+        host, port = sink.address
+
+        started = time.perf_counter()
+        for i in range(count):
+            with smtplib.SMTP(host, port) as server:
+                server.send_message(_message(f'user{i}@example.com'))
+        per_message = time.perf_counter() - started
+
+        transport = _transport(sink, workers=8, batch_size=25)
+        started = time.perf_counter()
+        with transport.outbox() as outbox:
+            for i in range(count):
+                outbox.add(_message(f'user{i}@example.com'))
+        pooled = time.perf_counter() - started
+        transport.pool.close_all()
+
+    print(f"\n{count} emails: {count / per_message:.0f}/s one connection each, "
+          f"{count / pooled:.0f}/s pooled ({per_message / pooled:.1f}x)")
+    assert outbox.sent == count
+    assert pooled * 3 < per_message
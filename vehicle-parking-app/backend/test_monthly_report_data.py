@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Bulk monthly report data tests
+build_monthly_reports_data computes every user's figures from one joined
+query, so building and rendering a chunk of reports costs the same number of
+SQL statements for two users as for twenty
+"""
+
+from datetime import datetime, timedelta
+
+from database import db
+from tasks.monthly_reports import build_monthly_reports_data, generate_monthly_report_html
+
+
+def _add_reservations(user, spots, count, month=3, year=2025):
+    from models.reservation import Reservation
+
+    for i in range(count):
+        parked = datetime(year, month, 1 + i % 28, 9) + timedelta(minutes=i)
+        db.session.add(Reservation(
+            spot_id=spots[i % len(spots)].id,
+            user_id=user.id,
+            vehicle_number='KA01XY0001',
+            parking_timestamp=parked,
+            leaving_timestamp=parked + timedelta(hours=2),
+            total_hours=2,
+            parking_cost=20,
+            status='completed',
+            created_at=parked
+        ))
+    db.session.commit()
+
+
+def test_report_figures(make_user, make_lot):
+    from models.reservation import Reservation
+
+    user = make_user('driver')
+    city, mall = make_lot(name='City Centre', spots=2, price=10.0), make_lot(name='Mall', spots=2, price=5.0)
+    _add_reservations(user, city.parking_spots, 3)
+    _add_reservations(user, mall.parking_spots, 1)
+    # Outside the month, and an active stay that counts but costs nothing yet
+    _add_reservations(user, city.parking_spots, 2, month=4)
+    db.session.add(Reservation(spot_id=mall.parking_spots[0].id, user_id=user.id, vehicle_number='KA01XY0001',
+                               parking_timestamp=datetime(2025, 3, 31, 23), created_at=datetime(2025, 3, 31, 23)))
+    db.session.commit()
+
+    report = build_monthly_reports_data([user.id], 3, 2025)[user.id]
+
+    assert report['total_reservations'] == 5
+    assert report['completed_reservations'] == 4
+    assert report['total_amount_spent'] == 80
+    assert report['total_hours_parked'] == 8
+    assert report['average_cost_per_reservation'] == 20
+    assert report['most_used_lot'] == ('City Centre', 3)
+    assert report['lot_details']['Mall'] == {'count': 2, 'total_cost': 20, 'total_hours': 2}
+    assert report['daily_usage'] == {1: 2, 2: 1, 3: 1, 31: 1}
+    assert sum(report['weekday_usage'].values()) == 5
+    # 2 hours instead of a day: 3 x (80 - 20) at City Centre + (40 - 20) at Mall
+    assert report['estimated_savings'] == 200
+    assert {r['lot_name'] for r in report['reservations']} == {'City Centre', 'Mall'}
+    assert all(r['spot_number'].startswith('P') for r in report['reservations'])
+
+
+def test_users_without_activity_get_an_empty_report(make_user):
+    idle = make_user('idle')
+    report = build_monthly_reports_data([idle.id], 3, 2025)[idle.id]
+    assert report['total_reservations'] == 0
+    assert report['most_used_lot'] == ('None', 0)
+    assert report['reservations'] == []
+
+
+def test_statement_count_does_not_grow_with_users(make_user, make_lot, count_queries):
+    from models.user import User
+
+    lots = [make_lot(name=f'Lot {i}', spots=3) for i in range(3)]
+    spots = [spot for lot in lots for spot in lot.parking_spots]
+    users = [make_user(f'driver{i}') for i in range(20)]
+    for user in users:
+        _add_reservations(user, spots, 6)
+    # Loaded once per chunk, as _send_monthly_report_chunk_impl does
+    users = User.query.order_by(User.id).all()
+
+    def statements_for(chunk):
+        with count_queries() as statements:
+            reports = build_monthly_reports_data([user.id for user in chunk], 3, 2025)
+            for user in chunk:
+                generate_monthly_report_html(user, reports[user.id], 3, 2025)
+        return len(statements)
+
+    assert statements_for(users[:2]) == statements_for(users) == 1
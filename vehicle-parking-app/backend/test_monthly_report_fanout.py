@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Monthly report fan-out tests
+send_monthly_reports splits users into chunk subtasks joined by a chord,
+each chunk sends its users' reports, and failed emails are retried for just
+those users before the totals are summarised
+"""
+
+import smtplib
+import sys
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from celery import current_app
+
+from database import db
+from tasks import monthly_reports
+from utils.mailer import MailTransport, SMTPConnectionPool
+
+
+class RecordingSMTP:
+    """smtplib.SMTP stand-in that refuses addresses listed in ``bounce``"""
+    delivered = []
+    bounce = set()
+
+    def __init__(self, host, port, timeout=None):
+        pass
+
+    def ehlo_or_helo_if_needed(self):
+        pass
+
+    def has_extn(self, name):
+        return False
+
+    def send_message(self, msg):
+        if msg['To'] in RecordingSMTP.bounce:
+            raise smtplib.SMTPRecipientsRefused({msg['To']: (450, b'mailbox busy')})
+        RecordingSMTP.delivered.append(msg['To'])
+
+    def quit(self):
+        pass
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    RecordingSMTP.delivered = []
+    RecordingSMTP.bounce = set()
+    pool = SMTPConnectionPool('localhost', 25, max_size=2, smtp_factory=RecordingSMTP)
+    transport = MailTransport(pool, max_workers=2, batch_size=3)
+    monkeypatch.setattr(monthly_reports, 'get_mail_transport', lambda: transport)
+    return transport
+
+
+@pytest.fixture
+def eager(app, monkeypatch):
+    from celery.backends.cache import CacheBackend
+    monkeypatch.setitem(current_app.conf, 'task_always_eager', True)
+    monkeypatch.setitem(current_app.conf, 'task_store_eager_result', True)
+    # Keep results in memory instead of the Redis result backend
+    monkeypatch.setattr(current_app._local, 'backend',
+                        CacheBackend(app=current_app, backend='memory'), raising=False)
+    # ContextTask runs tasks inside ``from app import app``: use the test app
+    monkeypatch.setitem(sys.modules, 'app', SimpleNamespace(app=app))
+    monkeypatch.setattr(monthly_reports, 'MONTHLY_REPORT_CHUNK_SIZE', 4)
+
+
+def _users_with_activity(make_user, make_lot, count, month, year):
+    from models.reservation import Reservation
+    lot = make_lot(spots=1)
+    users = []
+    for i in range(count):
+        user = make_user(f'driver{i}')
+        db.session.add(Reservation(
+            spot_id=lot.parking_spots[0].id,
+            user_id=user.id,
+            vehicle_number='MH12AB1234',
+            parking_cost=30,
+            status='completed',
+            created_at=datetime(year, month, 10)
+        ))
+        users.append(user)
+    db.session.commit()
+    return users
+
+
+def test_chunks_cover_every_user():
+    chunks = monthly_reports._chunk_user_ids(list(range(1, 11)), chunk_size=4)
+    assert chunks == [[1, 2, 3, 4], [5, 6, 7, 8], [9, 10]]
+    assert monthly_reports._previous_month(datetime(2025, 1, 5)) == (12, 2024)
+    assert monthly_reports._previous_month(datetime(2025, 7, 1)) == (6, 2025)
+
+
+def test_chunk_reports_failed_emails_for_retry(app, make_user, make_lot, transport):
+    users = _users_with_activity(make_user, make_lot, 5, 6, 2025)
+    RecordingSMTP.bounce = {users[2].email}
+
+    result = monthly_reports._send_monthly_report_chunk_impl([u.id for u in users], 6, 2025)
+
+    assert sorted(RecordingSMTP.delivered) == sorted(u.email for u in users if u is not users[2])
+    assert result == {
+        'users_processed': 4,
+        'successful_sends': 4,
+        'failed_sends': 0,
+        'retry_user_ids': [users[2].id]
+    }
+
+
+def test_monthly_run_fans_out_and_summarises(app, make_user, make_lot, transport, eager, monkeypatch):
+    month, year = 6, 2025
+    monkeypatch.setattr(monthly_reports, '_previous_month', lambda now=None: (month, year))
+    users = _users_with_activity(make_user, make_lot, 10, month, year)
+    make_user('quiet')  # no activity: processed, nothing sent
+
+    dispatched = monthly_reports.send_monthly_reports.apply().get()
+    assert dispatched['status'] == 'dispatched'
+    assert dispatched['users_queued'] == 11 and dispatched['chunks'] == 3
+
+    summary = current_app.AsyncResult(dispatched['summary_task_id']).get()
+    assert summary['status'] == 'completed'
+    assert summary['users_processed'] == 11
+    assert summary['successful_sends'] == 11
+    assert summary['chunks'] == 3
+    assert sorted(RecordingSMTP.delivered) == sorted(u.email for u in users)
+
+
+def test_failed_emails_are_retried_for_their_users_only(app, make_user, make_lot, transport, eager,
+                                                         monkeypatch):
+    month, year = 6, 2025
+    users = _users_with_activity(make_user, make_lot, 4, month, year)
+    RecordingSMTP.bounce = {users[1].email}
+    attempts = []
+    chunk_impl = monthly_reports._send_monthly_report_chunk_impl
+
+    def recording_impl(user_ids, *args):
+        attempts.append(list(user_ids))
+        if len(attempts) == 3:
+            RecordingSMTP.bounce = set()  # the mailbox frees up on the third attempt
+        return chunk_impl(user_ids, *args)
+
+    monkeypatch.setattr(monthly_reports, '_send_monthly_report_chunk_impl', recording_impl)
+
+    result = monthly_reports.send_monthly_report_chunk.apply(
+        args=([u.id for u in users], month, year)
+    ).get()
+
+    assert attempts == [[u.id for u in users], [users[1].id], [users[1].id]]
+    assert result == {'users_processed': 4, 'successful_sends': 4, 'failed_sends': 0}
+    assert sorted(RecordingSMTP.delivered) == sorted(u.email for u in users)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Stored monthly report tests
+Reports of closed months are built once, stored in monthly_reports and served
+from there by the user and admin endpoints; the current month is always built
+live, and changing a reservation of a stored month drops its report (or keeps
+a report built before the change from being stored)
+"""
+
+from datetime import datetime, timedelta
+
+from config import Config
+from database import db
+
+
+def _add_reservations(user, lot, created_at, count=3):
+    from models.reservation import Reservation
+
+    for i in range(count):
+        db.session.add(Reservation(
+            spot_id=lot.parking_spots[i % len(lot.parking_spots)].id,
+            user_id=user.id,
+            vehicle_number='KA01XY0001',
+            parking_timestamp=created_at,
+            leaving_timestamp=created_at + timedelta(hours=2),
+            total_hours=2,
+            parking_cost=20,
+            status='completed',
+            created_at=created_at
+        ))
+    db.session.commit()
+
+
+def _stored_reports():
+    from models.monthly_report import MonthlyReport
+    return MonthlyReport.query.count()
+
+
+def test_closed_month_is_stored_and_served(client, make_user, make_lot, auth_headers, count_queries):
+    user = make_user('driver')
+    _add_reservations(user, make_lot(), datetime(2025, 3, 10, 9))
+    url = '/api/user/monthly-report?month=3&year=2025'
+
+    first = client.get(url, headers=auth_headers(user))
+    assert first.status_code == 200, first.get_json()
+    assert first.get_json()['report_data']['total_reservations'] == 3
+    assert _stored_reports() == 1
+
+    with count_queries() as statements:
+        second = client.get(url, headers=auth_headers(user))
+    assert second.get_json() == first.get_json()
+    assert not any('reservations' in statement for statement in statements)
+
+    html = client.get(url + '&format=html', headers=auth_headers(user))
+    assert html.content_type.startswith('text/html')
+    assert 'Hello driver!' in html.get_data(as_text=True)
+    assert _stored_reports() == 1
+
+
+def test_current_month_is_built_live(client, make_user, make_lot, auth_headers):
+    user = make_user('driver')
+    lot = make_lot()
+    now = datetime.utcnow()
+    _add_reservations(user, lot, now, count=1)
+    url = f'/api/user/monthly-report?month={now.month}&year={now.year}'
+
+    assert client.get(url, headers=auth_headers(user)).get_json()['report_data']['total_reservations'] == 1
+    _add_reservations(user, lot, now, count=1)
+    assert client.get(url, headers=auth_headers(user)).get_json()['report_data']['total_reservations'] == 2
+    assert _stored_reports() == 0
+
+
+def test_admin_preview_serves_the_stored_report(client, make_user, auth_headers):
+    from tasks.monthly_reports import store_monthly_reports
+
+    admin, user = make_user('admin', role='admin'), make_user('driver')
+    store_monthly_reports({user.id: ({'total_reservations': 0}, '<p>stored report</p>')}, 3, 2025)
+
+    response = client.get(f'/api/admin/preview-monthly-report/{user.id}?month=3&year=2025',
+                          headers=auth_headers(admin))
+    assert response.get_data(as_text=True) == '<p>stored report</p>'
+
+
+def test_changing_a_closed_month_drops_its_report(client, make_user, make_lot, auth_headers):
+    from models.reservation import Reservation
+
+    user = make_user('driver')
+    _add_reservations(user, make_lot(), datetime(2025, 3, 10, 9))
+    url = '/api/user/monthly-report?month=3&year=2025'
+    client.get(url, headers=auth_headers(user))
+    assert _stored_reports() == 1
+
+    reservation = Reservation.query.first()
+    reservation.status = 'cancelled'
+    db.session.commit()
+    assert _stored_reports() == 0
+
+    report = client.get(url, headers=auth_headers(user)).get_json()['report_data']
+    assert report['completed_reservations'] == 2
+
+
+def test_monthly_job_stores_the_reports_it_renders(app, make_user, make_lot, monkeypatch):
+    from tasks.monthly_reports import _send_monthly_report_chunk_impl
+
+    monkeypatch.setattr(Config, 'MAIL_SERVER', None)
+    active, idle = make_user('active'), make_user('idle')
+    _add_reservations(active, make_lot(), datetime(2025, 3, 10, 9))
+
+    result = _send_monthly_report_chunk_impl([active.id, idle.id], 3, 2025)
+    assert result['successful_sends'] == 2
+
+    from models.monthly_report import MonthlyReport
+    stored = MonthlyReport.query.one()
+    assert (stored.user_id, stored.month, stored.year) == (active.id, 3, 2025)
+    assert 'Hello active!' in stored.html
+
+
+def _cancel_one_while_rendering(monkeypatch):
+    """Change a reservation of the month after its report was built"""
+    import tasks.monthly_reports as monthly_reports
+    from models.reservation import Reservation
+
+    render = monthly_reports.generate_monthly_report_html
+
+    def render_then_cancel(user, report_data, month, year):
+        reservation = Reservation.query.filter_by(user_id=user.id, status='completed').first()
+        reservation.status = 'cancelled'
+        db.session.commit()
+        return render(user, report_data, month, year)
+
+    monkeypatch.setattr(monthly_reports, 'generate_monthly_report_html', render_then_cancel)
+
+
+def test_report_changed_while_building_is_not_stored(client, make_user, make_lot, auth_headers, monkeypatch):
+    user = make_user('driver')
+    _add_reservations(user, make_lot(), datetime(2025, 3, 10, 9))
+    url = '/api/user/monthly-report?month=3&year=2025'
+
+    _cancel_one_while_rendering(monkeypatch)
+    assert client.get(url, headers=auth_headers(user)).get_json()['report_data']['completed_reservations'] == 3
+    assert _stored_reports() == 0
+
+    monkeypatch.undo()
+    report = client.get(url, headers=auth_headers(user)).get_json()['report_data']
+    assert report['completed_reservations'] == 2
+    assert _stored_reports() == 1
+
+
+def test_monthly_job_skips_reports_changed_while_sending(app, make_user, make_lot, monkeypatch):
+    from tasks.monthly_reports import _send_monthly_report_chunk_impl
+
+    monkeypatch.setattr(Config, 'MAIL_SERVER', None)
+    user = make_user('driver')
+    _add_reservations(user, make_lot(), datetime(2025, 3, 10, 9))
+
+    _cancel_one_while_rendering(monkeypatch)
+    assert _send_monthly_report_chunk_impl([user.id], 3, 2025)['successful_sends'] == 1
+    assert _stored_reports() == 0
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Occupancy counter tests
+Checks that per-lot available/reserved/occupied counters follow the
+reserve -> park -> release / cancel lifecycle and that reconciliation
+detects and repairs drift
+"""
+
+from database import db
+
+
+def _counters(lot_id):
+    from models.parking_lot import ParkingLot
+    lot = db.session.get(ParkingLot, lot_id)
+    db.session.refresh(lot)
+    return lot.available_count, lot.reserved_count, lot.occupied_count
+
+
+def test_counters_follow_reservation_lifecycle(client, make_user, make_lot, auth_headers):
+    user = make_user()
+    lot = make_lot(spots=3)
+    headers = auth_headers(user)
+    assert _counters(lot.id) == (3, 0, 0)
+
+    response = client.post('/api/user/reservations', json={
+        'parking_lot_id': lot.id, 'vehicle_number': 'TN01AB1234'
+    }, headers=headers)
+    assert response.status_code == 201
+    reservation_id = response.get_json()['reservation']['id']
+    assert _counters(lot.id) == (2, 1, 0)
+
+    response = client.put(f'/api/user/reservations/{reservation_id}/park', headers=headers)
+    assert response.status_code == 200
+    assert _counters(lot.id) == (2, 0, 1)
+
+    response = client.put(f'/api/user/reservations/{reservation_id}/release', headers=headers)
+    assert response.status_code == 200
+    assert _counters(lot.id) == (3, 0, 0)
+
+    response = client.post('/api/user/reservations', json={
+        'parking_lot_id': lot.id, 'vehicle_number': 'TN01AB1234'
+    }, headers=headers)
+    reservation_id = response.get_json()['reservation']['id']
+    response = client.delete(f'/api/user/reservations/{reservation_id}', headers=headers)
+    assert response.status_code == 200
+    assert _counters(lot.id) == (3, 0, 0)
+
+
+def test_counter_changes_are_not_lot_edits(client, make_user, make_lot, auth_headers):
+    from models.parking_lot import ParkingLot
+
+    user = make_user()
+    lot = make_lot(spots=3)
+    edited_at = lot.updated_at
+    headers = auth_headers(user)
+
+    response = client.post('/api/user/reservations', json={
+        'parking_lot_id': lot.id, 'vehicle_number': 'TN01AB1234'
+    }, headers=headers)
+    reservation_id = response.get_json()['reservation']['id']
+    client.put(f'/api/user/reservations/{reservation_id}/park', headers=headers)
+    client.put(f'/api/user/reservations/{reservation_id}/release', headers=headers)
+
+    assert _counters(lot.id) == (3, 0, 0)
+    assert db.session.get(ParkingLot, lot.id).updated_at == edited_at
+
+
+def test_lot_listing_reads_counters(client, make_lot):
+    make_lot(name='Counter Lot', spots=4)
+    response = client.get('/api/parking/lots')
+    assert response.status_code == 200
+    lot_data = response.get_json()[0]
+    assert lot_data['available_spots'] == 4
+    assert lot_data['reserved_spots'] == 0
+    assert lot_data['occupied_spots'] == 0
+
+
+def test_reconciliation_repairs_drift(app, make_lot):
+    from models.occupancy import reconcile_lot_counters
+    from models.parking_lot import ParkingLot
+
+    lot = make_lot(spots=5)
+    assert reconcile_lot_counters()['lots_drifted'] == 0
+
+    # Simulate drift from a write that bypassed the ORM
+    db.session.execute(
+        ParkingLot.__table__.update().values(available_count=1, occupied_count=7)
+    )
+    db.session.commit()
+
+    drifted_at = db.session.get(ParkingLot, lot.id).updated_at
+    report = reconcile_lot_counters(repair=False)
+    assert report['lots_drifted'] == 1
+    assert report['drift'][0]['actual']['available_count'] == 5
+    assert _counters(lot.id) == (1, 0, 7)
+
+    report = reconcile_lot_counters()
+    assert report['repaired'] is True
+    assert _counters(lot.id) == (5, 0, 0)
+    assert db.session.get(ParkingLot, lot.id).updated_at == drifted_at
+    assert reconcile_lot_counters()['lots_drifted'] == 0
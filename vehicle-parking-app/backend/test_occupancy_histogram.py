@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Occupancy histogram tests
+The vectorized interval-to-histogram routine must give the same occupied
+minutes per lot and hour as splitting each stay at hour boundaries in Python,
+and be much faster at it
+"""
+
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from models.analytics import hourly_occupancy
+from utils.histogram import hourly_occupancy_histogram, to_epoch_minutes
+
+ORIGIN = datetime(2025, 3, 1)
+
+
+def _random_stays(count, n_lots=20, days=30, seed=7):
+    rng = np.random.default_rng(seed)
+    lots = rng.integers(0, n_lots, count)
+    starts = rng.uniform(0, (days - 2) * 24 * 60, count)
+    lengths = rng.exponential(150, count)
+    return lots, starts, starts + lengths
+
+
+def _naive(lots, starts, ends, n_lots, n_hours):
+    """Split every stay at hour boundaries, one Python step per hour"""
+    minutes = np.zeros((n_lots, n_hours))
+    for lot, start, end in zip(lots, starts, ends):
+        parked = ORIGIN + timedelta(minutes=float(start))
+        left = ORIGIN + timedelta(minutes=float(end))
+        for bucket, stay_minutes in hourly_occupancy(parked, left):
+            minutes[lot, int((bucket - ORIGIN).total_seconds() // 3600)] += stay_minutes
+    return minutes
+
+
+def test_matches_splitting_stays_at_hour_boundaries():
+    lots, starts, ends = _random_stays(5000)
+    origin = to_epoch_minutes([ORIGIN])[0]
+    expected = _naive(lots, starts, ends, 20, 30 * 24)
+    actual = hourly_occupancy_histogram(lots, origin + starts, origin + ends, 20, origin, 30 * 24)
+    assert actual.shape == expected.shape
+    assert np.allclose(actual, expected, atol=1e-6)
+
+
+def test_edges():
+    # same hour, exactly one hour, spanning three hours, clipped at both ends, empty
+    starts = np.array([10, 60, 30, -90, 170, 50])
+    ends = np.array([40, 120, 170, 20, 400, 50])
+    minutes = hourly_occupancy_histogram(np.zeros(6, dtype=int), starts, ends, 1, 0, 3)
+    assert minutes.tolist() == [[30 + 30 + 20, 60 + 60, 50 + 10]]
+
+
+def test_epoch_minutes():
+    assert to_epoch_minutes([datetime(1970, 1, 1, 1, 30, 30)]).tolist() == [90.5]
+
+
+def test_histogram_benchmark():
+    """1M stays vectorized against a naive loop over 20k of them"""
+    n_lots, n_hours = 20, 30 * 24
+    lots, starts, ends = _random_stays(1_000_000, n_lots)
+
+    started = time.perf_counter()
+    hourly_occupancy_histogram(lots, starts, ends, n_lots, 0, n_hours)
+    vectorized = time.perf_counter() - started
+
+    sample = 20_000
+    started = time.perf_counter()
+    _naive(lots[:sample], starts[:sample], ends[:sample], n_lots, n_hours)
+    naive = (time.perf_counter() - started) * len(lots) / sample
+
+    print(f"\n1M stays: vectorized {vectorized:.2f}s, naive loop ~{naive:.1f}s (x{naive / vectorized:.0f})")
+    assert vectorized * 20 < naive
+
+
+def test_rebuild_uses_the_vectorized_occupancy(make_user, make_lot):
+    from database import db
+    from models.analytics import LotHourlyRollup, rebuild_analytics_rollups
+    from models.reservation import Reservation
+
+    user, lot = make_user(), make_lot()
+    parked = ORIGIN + timedelta(hours=9, minutes=45)
+    db.session.add(Reservation(spot_id=lot.parking_spots[0].id, user_id=user.id, vehicle_number='KA01XY0001',
+                               parking_timestamp=parked, leaving_timestamp=parked + timedelta(minutes=100),
+                               created_at=parked, status='completed', parking_cost=20))
+    db.session.commit()
+    incremental = {row.bucket_start: row.occupancy_minutes for row in LotHourlyRollup.query}
+
+    assert rebuild_analytics_rollups() == 1
+    rebuilt = defaultdict(float, {row.bucket_start: row.occupancy_minutes for row in LotHourlyRollup.query})
+    assert rebuilt == incremental
+    assert [rebuilt[ORIGIN + timedelta(hours=hour)] for hour in (9, 10, 11)] == [15, 60, 25]
+
+
+def test_bulk_occupancy_grids_stay_bounded(monkeypatch):
+    import utils.histogram
+    from models.analytics import OCCUPANCY_WINDOW_HOURS, bulk_hourly_occupancy
+
+    histogram = utils.histogram.hourly_occupancy_histogram
+    grid_hours = []
+
+    def recording_histogram(groups, starts, ends, n_groups, origin, n_hours):
+        grid_hours.append(n_hours)
+        return histogram(groups, starts, ends, n_groups, origin, n_hours)
+
+    monkeypatch.setattr(utils.histogram, 'hourly_occupancy_histogram', recording_histogram)
+    # a bogus 1970 stay, stays years apart and one crossing two window edges
+    stays = [
+        (1, datetime(1970, 1, 1, 0, 10), datetime(1970, 1, 1, 2)),
+        (2, ORIGIN + timedelta(minutes=30), ORIGIN + timedelta(hours=3)),
+        (1, ORIGIN + timedelta(days=20, minutes=15), ORIGIN + timedelta(days=80, minutes=5)),
+        (2, datetime(2030, 6, 1, 8, 45), datetime(2030, 6, 1, 9, 15)),
+    ]
+    hourly = defaultdict(lambda: {'occupancy_minutes': 0})
+    bulk_hourly_occupancy(hourly, *map(list, zip(*stays)))
+
+    expected = defaultdict(float)
+    for lot, parked, left in stays:
+        for bucket, minutes in hourly_occupancy(parked, left):
+            expected[(lot, bucket)] += minutes
+    assert {key: value['occupancy_minutes'] for key, value in hourly.items()} == pytest.approx(expected)
+    assert max(grid_hours) == OCCUPANCY_WINDOW_HOURS
+    assert len(grid_hours) < 10
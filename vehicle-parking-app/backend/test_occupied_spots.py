@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Occupied spots board tests
+The board is read with one joined query per page plus one totals query, so the
+number of statements does not grow with the number of occupied spots; pages
+follow a keyset cursor, longest parked first
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import db
+from utils.occupied_spots import occupied_spots_page
+
+NOW = datetime(2025, 3, 10, 12)
+
+
+def _park(user, spot, hours_ago, status='active'):
+    from models.reservation import Reservation
+
+    spot.status = 'O'
+    reservation = Reservation(spot_id=spot.id, user_id=user.id, vehicle_number=f'KA01XY{spot.id:04d}',
+                              parking_timestamp=NOW - timedelta(hours=hours_ago), status=status)
+    db.session.add(reservation)
+    return reservation
+
+
+@pytest.fixture
+def board(make_user, make_lot):
+    from models.reservation import Reservation
+
+    lot = make_lot('Downtown', spots=12, price=20)
+    drivers = [make_user(f'driver{i}', full_name=f'Driver {i}', phone_number=f'98765{i:05d}') for i in range(3)]
+    for i, spot in enumerate(lot.parking_spots[:10]):
+        _park(drivers[i % 3], spot, hours_ago=[30, 0.5, 2, 26, 5, 1, 3, 48, 4, 6][i])
+    # Not on the board: a completed stay on an occupied spot, a free spot
+    db.session.add(Reservation(spot_id=lot.parking_spots[0].id, user_id=drivers[0].id, vehicle_number='KA01XY0000',
+                               parking_timestamp=NOW - timedelta(days=3), leaving_timestamp=NOW - timedelta(days=2),
+                               status='completed'))
+    db.session.commit()
+    return lot
+
+
+def test_rows_are_computed_in_sql(app, board):
+    page = occupied_spots_page(now=NOW)
+    assert page['total_occupied'] == 10 and page['long_term_parked'] == 3
+    assert page['next_cursor'] is None
+
+    hours = [spot['duration_hours'] for spot in page['occupied_spots']]
+    assert hours == [48, 30, 26, 6, 5, 4, 3, 2, 1, 0.5]
+    first = page['occupied_spots'][0]
+    assert first['overstay_alert'] and not page['occupied_spots'][3]['overstay_alert']
+    assert (first['lot_name'], first['hourly_rate'], first['estimated_cost']) == ('Downtown', 20.0, 960.0)
+    assert page['occupied_spots'][-1]['estimated_cost'] == 20.0   # one hour minimum
+    assert first['user_details']['full_name'].startswith('Driver ')
+
+
+def test_keyset_pages_in_constant_statements(app, board, count_queries):
+    seen, after, statement_counts = [], None, []
+    from utils.occupied_spots import decode_cursor
+
+    while True:
+        with count_queries() as statements:
+            page = occupied_spots_page(after=after, limit=4, now=NOW)
+        statement_counts.append(len(statements))
+        seen.extend(spot['spot_id'] for spot in page['occupied_spots'])
+        if not page['next_cursor']:
+            break
+        after = decode_cursor(page['next_cursor'])
+
+    assert statement_counts == [2, 2, 2]
+    assert sorted(seen) == sorted(spot.id for spot in board.parking_spots if spot.status == 'O')
+    assert len(seen) == len(set(seen))
+
+
+def test_endpoint(client, make_user, auth_headers, board, count_queries):
+    headers = auth_headers(make_user('admin', role='admin'))
+
+    with count_queries() as statements:
+        response = client.get('/api/admin/parking-spots/occupied?limit=6', headers=headers)
+    assert response.status_code == 200, response.get_json()
+    data = response.get_json()
+    assert len(data['occupied_spots']) == 6 and data['total_occupied'] == 10
+    assert len(statements) == 2
+
+    rest = client.get(f"/api/admin/parking-spots/occupied?limit=6&after={data['next_cursor']}", headers=headers)
+    assert len(rest.get_json()['occupied_spots']) == 4
+
+    assert client.get('/api/admin/parking-spots/occupied?after=bogus', headers=headers).status_code == 400
+    other_lot = client.get(f'/api/admin/parking-spots/occupied?lot_id={board.id + 1}', headers=headers).get_json()
+    assert other_lot['total_occupied'] == 0 and other_lot['occupied_spots'] == []
+
+
+def test_board_query_uses_indexes(app, board, make_user, make_lot):
+    """With a long history and mostly free spots, only the open stays are read"""
+    from sqlalchemy import text
+    from models.reservation import Reservation
+    from test_query_indexes import FULL_SCAN, _plans, captured_statements
+
+    for i in range(4):
+        make_lot(f'Lot {i}', spots=50)
+    user = make_user('regular')
+    for i in range(2000):
+        parked = NOW - timedelta(days=60, minutes=-40 * i)
+        db.session.add(Reservation(spot_id=board.parking_spots[i % 12].id, user_id=user.id,
+                                   vehicle_number='KA01XY0001', parking_timestamp=parked,
+                                   leaving_timestamp=parked + timedelta(hours=2), status='completed'))
+    db.session.commit()
+    db.session.execute(text('ANALYZE'))
+
+    with captured_statements() as statements:
+        page = occupied_spots_page(after=(NOW - timedelta(hours=6), 0), limit=3, now=NOW)
+    assert len(page['occupied_spots']) == 3
+
+    plans = [plan for _, plan in _plans(statements)]
+    assert len(plans) == 2
+    for plan in plans:
+        assert not FULL_SCAN.search(plan), plan
+        # Either the open-stay index in board order, or a per-spot probe of the open stays
+        assert 'ix_reservations_open_parked' in plan or 'ix_reservations_spot_leaving' in plan, plan
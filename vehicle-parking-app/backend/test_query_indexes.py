@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Query index tests
+Runs the hot reservation and parking spot queries, captures the SQL they
+actually emit and asks SQLite for its plan: every access to reservations and
+parking_spots must go through one of the composite indexes, never a full scan
+"""
+
+import re
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, text
+
+from database import db
+
+FULL_SCAN = re.compile(r'\bSCAN (reservations|parking_spots)\b(?! USING)')
+
+
+@contextmanager
+def captured_statements():
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', _record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _record)
+
+
+def _plans(statements):
+    connection = db.session.connection().connection.driver_connection
+    return [
+        (statement, ' | '.join(row[3] for row in connection.execute(f'EXPLAIN QUERY PLAN {statement}', parameters)))
+        for statement, parameters in statements
+    ]
+
+
+@pytest.fixture
+def history(make_user, make_lot):
+    from models.reservation import Reservation
+
+    users = [make_user(f'driver{i}') for i in range(10)]
+    lots = [make_lot(name=f'Lot {i}', spots=20) for i in range(10)]
+    spots = [spot for lot in lots for spot in lot.parking_spots]
+    start = datetime.utcnow() - timedelta(days=60)
+    for i in range(2000):
+        parked = start + timedelta(minutes=40 * i)
+        db.session.add(Reservation(
+            spot_id=spots[i * 7 % len(spots)].id, user_id=users[i % len(users)].id,
+            vehicle_number='KA01XY0001', parking_timestamp=parked,
+            leaving_timestamp=parked + timedelta(hours=2), parking_cost=20, total_hours=2,
+            status='completed', created_at=parked
+        ))
+    db.session.commit()
+    # Planner statistics, as on a live database
+    db.session.execute(text('ANALYZE'))
+    return users[0], lots[0]
+
+
+def _hot_queries(user, lot):
+    """(description, query runner, indexes the plan may use)"""
+    from models.allocation import claim_spot
+    from models.parking_spot import ParkingSpot
+    from models.reservation import Reservation
+    from tasks.daily_reminders import inactive_users_query
+    from tasks.monthly_reports import build_monthly_reports_data
+
+    now = datetime.utcnow()
+    spot_ids = [spot.id for spot in lot.parking_spots]
+    by_spot = ('ix_reservations_spot_status', 'ix_reservations_spot_leaving')
+
+    return [
+        ('free-spot candidates', lambda: claim_spot(lot.id), ('ix_parking_spots_lot_status_active',)),
+        ('current reservation of a spot', lambda: lot.parking_spots[0].get_current_reservation(),
+         ('ix_reservations_spot_leaving',)),
+        ("a user's active reservations",
+         lambda: Reservation.query.filter_by(user_id=user.id, status='active').count(),
+         ('ix_reservations_user_status',)),
+        ("active reservations of a lot's spots",
+         lambda: Reservation.query.filter(Reservation.spot_id.in_(spot_ids),
+                                          Reservation.status.in_(['pending', 'active'])).all(),
+         by_spot),
+        ('occupied spots of a lot', lambda: ParkingSpot.query.filter_by(lot_id=lot.id, status='O').all(),
+         ('ix_parking_spots_lot_status_active',)),
+        ('reservations of the last day',
+         lambda: Reservation.query.filter(Reservation.created_at >= now - timedelta(days=1)).count(),
+         ('ix_reservations_created_at',)),
+        ('monthly report rows', lambda: build_monthly_reports_data([user.id], now.month, now.year),
+         ('ix_reservations_user_created_at', 'ix_reservations_user_status')),
+        ('inactive users', lambda: db.session.execute(inactive_users_query(now - timedelta(days=3))).all(),
+         ('ix_reservations_user_created_at',)),
+    ]
+
+
+def test_hot_queries_use_indexes(history):
+    user, lot = history
+    for description, run, indexes in _hot_queries(user, lot):
+        with captured_statements() as statements:
+            run()
+        db.session.rollback()
+
+        plans = [plan for statement, plan in _plans(statements)
+                 if 'reservations' in statement or 'parking_spots' in statement]
+        assert plans, description
+        for plan in plans:
+            assert not FULL_SCAN.search(plan), (description, plan)
+        assert any(index in plan for plan in plans for index in indexes), (description, plans)
+
+
+def test_migration_creates_the_declared_indexes(tmp_path, monkeypatch):
+    import sqlite3
+    from migrate_indexes import INDEXES, migrate_indexes
+    from models.parking_spot import ParkingSpot
+    from models.reservation import Reservation
+
+    declared = {index.name for table in (Reservation.__table__, ParkingSpot.__table__) for index in table.indexes}
+    assert declared == set(INDEXES)
+
+    (tmp_path / 'instance').mkdir()
+    conn = sqlite3.connect(tmp_path / 'instance' / 'parking2.db')
+    conn.executescript("""
+        CREATE TABLE reservations (id INTEGER PRIMARY KEY, user_id INTEGER, spot_id INTEGER, status TEXT,
+                                   parking_timestamp DATETIME, leaving_timestamp DATETIME,
+                                   created_at DATETIME);
+        CREATE TABLE parking_spots (id INTEGER PRIMARY KEY, lot_id INTEGER, status TEXT, is_active BOOLEAN);
+    """)
+    conn.close()
+
+    monkeypatch.chdir(tmp_path)
+    migrate_indexes()
+    migrate_indexes()  # idempotent
+
+    conn = sqlite3.connect(tmp_path / 'instance' / 'parking2.db')
+    created = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    conn.close()
+    assert set(INDEXES) <= created
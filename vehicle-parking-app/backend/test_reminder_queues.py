@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Daily reminder tests
+Inactive users come from a NOT EXISTS anti-join read in keyset pages, so the
+statement count depends on the number of pages and not on the reservations
+table; each page is handed to per-channel delivery queues
+"""
+
+import threading
+from datetime import datetime, timedelta
+
+from config import Config
+from database import db
+from tasks import daily_reminders
+from tasks.daily_reminders import inactive_users_query, iter_inactive_user_pages
+from utils.delivery import ChannelQueue
+
+
+def _book(user, lot, created_at, count=1):
+    from models.reservation import Reservation
+
+    for _ in range(count):
+        db.session.add(Reservation(spot_id=lot.parking_spots[0].id, user_id=user.id,
+                                   vehicle_number='KA01XY0001', parking_timestamp=created_at,
+                                   status='completed', created_at=created_at))
+    db.session.commit()
+
+
+def test_inactive_users(make_user, make_lot):
+    lot = make_lot()
+    now = datetime.utcnow()
+    never = make_user('never_booked')
+    lapsed = make_user('lapsed')
+    recent = make_user('recent')
+    make_user('admin', role='admin')
+    make_user('disabled', is_active=False)
+    _book(lapsed, lot, now - timedelta(days=10))
+    _book(recent, lot, now - timedelta(days=10))
+    _book(recent, lot, now - timedelta(hours=5))
+
+    rows = db.session.execute(inactive_users_query(now - timedelta(days=3))).all()
+    assert [row.username for row in rows] == [never.username, lapsed.username]
+
+
+def test_pages_do_not_grow_with_reservations(make_user, make_lot, count_queries):
+    lot = make_lot()
+    cutoff = datetime.utcnow() - timedelta(days=3)
+    users = [make_user(f'driver{i}') for i in range(5)]
+    for user in users:
+        _book(user, lot, cutoff - timedelta(days=1), count=20)
+
+    with count_queries() as statements:
+        pages = list(iter_inactive_user_pages(cutoff, page_size=2))
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [row.id for page in pages for row in page] == [user.id for user in users]
+    assert len(statements) == 3
+
+
+def test_each_channel_gets_its_own_queue(make_user, monkeypatch):
+    for i in range(4):
+        make_user(f'driver{i}', phone_number=f'98765{i:05d}')
+    delivered = {'sms': [], 'chat': []}
+    threads = set()
+
+    def record(channel):
+        def send(user, new_parking_lots=None):
+            threads.add(threading.current_thread().name)
+            if channel == 'chat' and user.username == 'driver2':
+                raise Exception('webhook down')
+            delivered[channel].append(user.username)
+        return send
+
+    monkeypatch.setattr(Config, 'TWILIO_ACCOUNT_SID', 'AC123')
+    monkeypatch.setattr(Config, 'GOOGLE_CHAT_WEBHOOK_URL', 'https://chat.example.com/hook')
+    monkeypatch.setattr(Config, 'MAIL_USERNAME', None)
+    monkeypatch.setattr(daily_reminders, 'send_sms_reminder', record('sms'))
+    monkeypatch.setattr(daily_reminders, 'send_google_chat_reminder', record('chat'))
+    monkeypatch.setattr(daily_reminders, 'REMINDER_PAGE_SIZE', 3)
+
+    result = daily_reminders._send_daily_reminders_impl()
+
+    assert result['status'] == 'completed', result
+    assert result['users_processed'] == 4
+    assert (result['successful_sends'], result['failed_sends']) == (3, 1)
+    assert sorted(delivered['sms']) == ['driver0', 'driver1', 'driver2', 'driver3']
+    assert sorted(delivered['chat']) == ['driver0', 'driver1', 'driver3']
+    assert all(name.startswith(('sms-sender', 'google-chat-sender')) for name in threads)
+
+
+def test_channel_queue_bounds_pending_items():
+    release = threading.Event()
+    started = []
+
+    def send(item):
+        started.append(item)
+        release.wait(5)
+
+    queue = ChannelQueue(send, max_workers=1)
+    with queue:
+        queue.add(1)
+        queue.add(2)
+        adder = threading.Thread(target=queue.add, args=(3,))
+        adder.start()
+        adder.join(0.2)
+        assert adder.is_alive()      # two items pending: the third add waits
+        release.set()
+        adder.join(5)
+    assert queue.sent == 3 and queue.failed == {}
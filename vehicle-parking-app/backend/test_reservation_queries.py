@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Reservation listing query-count regression tests
+/api/user/reservations and /api/user/parking-history must fetch reservation,
+spot and lot together, so the number of SQL statements per request stays the
+same however long the user's history is
+"""
+
+from datetime import datetime, timedelta
+
+from database import db
+
+
+def _add_history(user, lots, count):
+    from models.parking_spot import ParkingSpot
+    from models.reservation import Reservation
+
+    spots = ParkingSpot.query.filter(ParkingSpot.lot_id.in_([lot.id for lot in lots])).all()
+    start = datetime.utcnow() - timedelta(days=count)
+    for i in range(count):
+        parked = start + timedelta(days=i)
+        db.session.add(Reservation(
+            spot_id=spots[i % len(spots)].id,
+            user_id=user.id,
+            vehicle_number='KA01XY0001',
+            parking_timestamp=parked,
+            leaving_timestamp=parked + timedelta(hours=2),
+            total_hours=2,
+            parking_cost=20,
+            status='completed',
+            created_at=parked
+        ))
+    db.session.commit()
+
+
+def _statements_for(client, url, headers, count_queries):
+    with count_queries() as statements:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.get_json()
+    return len(statements), response.get_json()
+
+
+def test_reservation_listing_statement_count_is_constant(client, make_user, make_lot, auth_headers, count_queries):
+    light, heavy = make_user('light_user'), make_user('heavy_user')
+    lots = [make_lot(name=f'Lot {i}', spots=4) for i in range(3)]
+    _add_history(light, lots, 2)
+    _add_history(heavy, lots, 60)
+
+    light_count, light_data = _statements_for(client, '/api/user/reservations', auth_headers(light), count_queries)
+    heavy_count, heavy_data = _statements_for(client, '/api/user/reservations', auth_headers(heavy), count_queries)
+
+    assert len(light_data) == 2 and len(heavy_data) == 60
+    assert heavy_data[0]['parking_lot']['prime_location_name'].startswith('Lot ')
+    assert heavy_data[0]['parking_spot']['spot_number'].startswith('P')
+    assert light_count == heavy_count == 1
+
+
+def test_parking_history_statement_count_is_constant(client, make_user, make_lot, auth_headers, count_queries):
+    light, heavy = make_user('light_user'), make_user('heavy_user')
+    lots = [make_lot(name=f'Lot {i}', spots=4) for i in range(3)]
+    _add_history(light, lots, 2)
+    _add_history(heavy, lots, 60)
+
+    url = '/api/user/parking-history?per_page=50'
+    light_count, light_data = _statements_for(client, url, auth_headers(light), count_queries)
+    heavy_count, heavy_data = _statements_for(client, url, auth_headers(heavy), count_queries)
+
+    assert light_data['total'] == 2 and heavy_data['total'] == 60
+    assert len(heavy_data['reservations']) == 50
+    assert heavy_data['reservations'][0]['parking_spot']['lot_name'].startswith('Lot ')
+    # One COUNT for pagination plus one joined SELECT for the page
+    assert light_count == heavy_count == 2
+
+    lot_count, lot_data = _statements_for(
+        client, f'{url}&lot_id={lots[0].id}', auth_headers(heavy), count_queries
+    )
+    assert lot_count == 2
+    assert lot_data['total'] == 20
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Response cache tests
+cached_endpoint stores the full response (body, status, headers, ETag) and
+replays it without calling the view. The end-to-end test is skipped when no
+Redis server is reachable
+"""
+
+from flask import Flask, jsonify
+
+from testing_utils import requires_redis
+from utils.cache_enhanced import (
+    cached_endpoint, freeze_response, get_endpoint_cache_stats,
+    invalidate_cache, thaw_response
+)
+
+
+def test_frozen_response_round_trips():
+    app = Flask(__name__)
+    with app.test_request_context():
+        response = jsonify({'lots': [1, 2, 3], 'name': 'Café'})
+        response.headers['X-Total-Count'] = '3'
+        entry = freeze_response(response)
+
+    assert entry['status'] == 200
+    assert entry['encoding'] == 'utf-8'
+    assert all(name.lower() != 'content-length' for name, _ in entry['headers'])
+
+    replayed = thaw_response(entry)
+    assert replayed.get_data() == response.get_data()
+    assert replayed.headers['X-Total-Count'] == '3'
+    assert replayed.mimetype == 'application/json'
+    assert replayed.get_etag()[0] == entry['etag']
+
+
+def test_binary_bodies_are_preserved():
+    app = Flask(__name__)
+    with app.test_request_context():
+        response = app.response_class(b'\x89PNG\xff\x00', mimetype='image/png')
+        entry = freeze_response(response)
+    assert entry['encoding'] == 'base64'
+    assert thaw_response(entry).get_data() == b'\x89PNG\xff\x00'
+
+
+@requires_redis
+def test_hits_skip_the_view_and_errors_are_not_cached():
+    app = Flask(__name__)
+    calls = []
+
+    @app.route('/lots')
+    @cached_endpoint('parking_lots')
+    def lots():
+        calls.append(1)
+        if len(calls) == 1:
+            return jsonify({'error': 'boom'}), 500
+        return jsonify([{'id': 1}])
+
+    invalidate_cache('lots')
+    client = app.test_client()
+    assert client.get('/lots').status_code == 500
+    first = client.get('/lots')
+    second = client.get('/lots')
+    assert len(calls) == 2
+    assert second.get_json() == [{'id': 1}]
+    assert second.headers['ETag'] == first.headers['ETag']
+
+    not_modified = client.get('/lots', headers={'If-None-Match': first.headers['ETag']})
+    assert not_modified.status_code == 304
+    assert get_endpoint_cache_stats()['parking_lots']['hits'] >= 2
+    invalidate_cache('lots')
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Spot allocation concurrency tests
+Many threads book the same lot at once through /api/user/reservations; every
+spot must be handed out at most once and the lot counters must match
+"""
+
+import threading
+from collections import Counter
+
+from database import db
+
+THREADS = 12
+BOOKINGS_PER_THREAD = 8
+
+
+def _book_concurrently(app, lot_id, headers_list):
+    results = []
+    lock = threading.Lock()
+    start = threading.Barrier(len(headers_list))
+
+    def worker(headers):
+        client = app.test_client()
+        start.wait()
+        for _ in range(BOOKINGS_PER_THREAD):
+            response = client.post('/api/user/reservations', json={
+                'parking_lot_id': lot_id, 'vehicle_number': 'DL01CC0001'
+            }, headers=headers)
+            with lock:
+                results.append((response.status_code, response.get_json()))
+
+    threads = [threading.Thread(target=worker, args=(headers,)) for headers in headers_list]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_bookings_never_share_a_spot(app, make_user, make_lot, auth_headers):
+    from models.parking_lot import ParkingLot
+    from models.parking_spot import ParkingSpot
+    from models.reservation import Reservation
+
+    spots = 40
+    lot = make_lot(spots=spots)
+    headers_list = [auth_headers(make_user(f'driver_{i}')) for i in range(THREADS)]
+
+    results = _book_concurrently(app, lot.id, headers_list)
+
+    statuses = Counter(status for status, _ in results)
+    assert statuses[201] == spots
+    assert statuses[400] == THREADS * BOOKINGS_PER_THREAD - spots
+    assert set(statuses) == {201, 400}
+
+    db.session.expire_all()
+    booked = [r.spot_id for r in Reservation.query.filter_by(status='reserved').all()]
+    assert len(booked) == len(set(booked)) == spots
+    assert ParkingSpot.query.filter_by(lot_id=lot.id, status='R').count() == spots
+
+    lot = db.session.get(ParkingLot, lot.id)
+    assert (lot.available_count, lot.reserved_count, lot.occupied_count) == (0, spots, 0)
+
+
+def test_claim_spot_hands_out_each_spot_once(app, make_lot):
+    from models.allocation import claim_spot
+    from models.parking_spot import ParkingSpot
+
+    lot = make_lot(spots=2)
+    first = claim_spot(lot.id, to_status='R')
+    second = claim_spot(lot.id, to_status='O')
+    db.session.commit()
+
+    assert first.id != second.id
+    assert (first.status, second.status) == ('R', 'O')
+    assert claim_spot(lot.id) is None
+    assert ParkingSpot.query.filter_by(lot_id=lot.id, status='A').count() == 0
+
+
+def test_claim_spot_keeps_going_while_spots_are_free(app, make_lot, monkeypatch):
+    """Losing many races in a row must not end in 'no available spots'"""
+    from sqlalchemy import update
+    from models import allocation
+    from models.parking_spot import ParkingSpot
+
+    lot = make_lot(spots=60)
+    compare_and_set = allocation._compare_and_set
+    races = {'lost': 0}
+
+    def contended(session, spot_id, to_status):
+        # Another worker takes each of the first 50 candidates just before us
+        if races['lost'] < 50:
+            races['lost'] += 1
+            session.execute(update(ParkingSpot.__table__).where(ParkingSpot.__table__.c.id == spot_id)
+                            .values(status='R'))
+        return compare_and_set(session, spot_id, to_status)
+
+    monkeypatch.setattr(allocation, '_compare_and_set', contended)
+    spot = allocation.claim_spot(lot.id)
+    assert spot is not None and spot.status == 'R'
+    assert races['lost'] == 50
+
+
+def test_claim_spot_skips_spots_with_an_open_reservation(app, make_user, make_lot):
+    """A spot marked 'A' that an open reservation still points at is not free"""
+    from sqlalchemy import update
+    from models.allocation import _compare_and_set, claim_spot
+    from models.parking_spot import ParkingSpot
+    from models.reservation import Reservation
+
+    user, lot = make_user(), make_lot(spots=2)
+    stale, free = lot.parking_spots
+    db.session.add(Reservation(spot_id=stale.id, user_id=user.id, vehicle_number='KA01XY0001', status='active'))
+    db.session.commit()
+    # The spot row says 'A' while the reservation is still open
+    db.session.execute(update(ParkingSpot.__table__).where(ParkingSpot.__table__.c.id == stale.id)
+                       .values(status='A'))
+
+    assert not _compare_and_set(db.session, stale.id, 'R')
+    assert claim_spot(lot.id).id == free.id
+    assert claim_spot(lot.id) is None
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Bulk spot provisioning tests
+Creating and resizing lots through the admin API must use set-based
+statements, keep the lot counters right and refuse to remove booked spots.
+Includes a 10,000-spot benchmark that prints timings (run with -s to see them)
+"""
+
+import time
+
+from database import db
+
+LOT_FIELDS = {
+    'prime_location_name': 'City Garage',
+    'address': '12 Market Street',
+    'pin_code': '560001',
+    'price': 25,
+    'description': 'Multi-level garage'
+}
+
+
+def _lot_state(lot_id):
+    from models.parking_lot import ParkingLot
+    from models.parking_spot import ParkingSpot
+
+    db.session.expire_all()
+    lot = db.session.get(ParkingLot, lot_id)
+    spots = ParkingSpot.query.filter_by(lot_id=lot_id).count()
+    return lot.number_of_spots, spots, lot.available_count, lot.reserved_count
+
+
+def test_create_and_resize_lot(client, make_user, auth_headers):
+    headers = auth_headers(make_user('admin', role='admin'))
+
+    response = client.post('/api/admin/parking-lots', json={**LOT_FIELDS, 'number_of_spots': 5}, headers=headers)
+    assert response.status_code == 201, response.get_json()
+    lot = response.get_json()['parking_lot']
+    assert lot['prime_location_name'] == 'City Garage'
+    assert lot['available_spots'] == 5
+    assert _lot_state(lot['id']) == (5, 5, 5, 0)
+
+    response = client.put(f"/api/admin/parking-lots/{lot['id']}", json={'number_of_spots': 8, 'price': 30}, headers=headers)
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['parking_lot']['price'] == 30.0
+    assert _lot_state(lot['id']) == (8, 8, 8, 0)
+
+    from models.parking_spot import ParkingSpot
+    numbers = {s.spot_number for s in ParkingSpot.query.filter_by(lot_id=lot['id'])}
+    assert numbers == {f'P{i:03d}' for i in range(1, 9)}
+
+    response = client.put(f"/api/admin/parking-lots/{lot['id']}", json={'number_of_spots': 3}, headers=headers)
+    assert response.status_code == 200, response.get_json()
+    assert _lot_state(lot['id']) == (3, 3, 3, 0)
+
+
+def test_shrink_never_removes_booked_spots(client, make_user, auth_headers):
+    admin_headers = auth_headers(make_user('admin', role='admin'))
+    driver_headers = auth_headers(make_user('driver'))
+
+    response = client.post('/api/admin/parking-lots', json={**LOT_FIELDS, 'number_of_spots': 3}, headers=admin_headers)
+    lot_id = response.get_json()['parking_lot']['id']
+    for _ in range(2):
+        response = client.post('/api/user/reservations', json={
+            'parking_lot_id': lot_id, 'vehicle_number': 'GJ01AA0001'
+        }, headers=driver_headers)
+        assert response.status_code == 201
+
+    # Only one free spot is left, so shrinking by two must fail atomically
+    response = client.put(f'/api/admin/parking-lots/{lot_id}', json={'number_of_spots': 1}, headers=admin_headers)
+    assert response.status_code == 400
+    assert _lot_state(lot_id) == (3, 3, 1, 2)
+
+    response = client.put(f'/api/admin/parking-lots/{lot_id}', json={'number_of_spots': 2}, headers=admin_headers)
+    assert response.status_code == 200
+    assert _lot_state(lot_id) == (2, 2, 0, 2)
+
+
+def test_create_lot_validates_fields(client, make_user, auth_headers):
+    headers = auth_headers(make_user('admin', role='admin'))
+    response = client.post('/api/admin/parking-lots', json={**LOT_FIELDS, 'number_of_spots': 0}, headers=headers)
+    assert response.status_code == 400
+    response = client.post('/api/admin/parking-lots', json={'prime_location_name': 'X'}, headers=headers)
+    assert response.status_code == 400
+
+
+def test_benchmark_10k_spot_lot(client, make_user, auth_headers, count_queries):
+    headers = auth_headers(make_user('admin', role='admin'))
+
+    with count_queries() as statements:
+        started = time.perf_counter()
+        response = client.post('/api/admin/parking-lots', json={**LOT_FIELDS, 'number_of_spots': 10000}, headers=headers)
+        create_seconds = time.perf_counter() - started
+    assert response.status_code == 201
+    create_statements = len(statements)
+    lot_id = response.get_json()['parking_lot']['id']
+
+    with count_queries() as statements:
+        started = time.perf_counter()
+        response = client.put(f'/api/admin/parking-lots/{lot_id}', json={'number_of_spots': 20000}, headers=headers)
+        grow_seconds = time.perf_counter() - started
+    assert response.status_code == 200
+    grow_statements = len(statements)
+
+    with count_queries() as statements:
+        started = time.perf_counter()
+        response = client.put(f'/api/admin/parking-lots/{lot_id}', json={'number_of_spots': 10000}, headers=headers)
+        shrink_seconds = time.perf_counter() - started
+    assert response.status_code == 200
+    shrink_statements = len(statements)
+
+    print(f"\n10k-spot lot: create {create_seconds:.3f}s ({create_statements} statements), "
+          f"grow +10k {grow_seconds:.3f}s ({grow_statements}), "
+          f"shrink -10k {shrink_seconds:.3f}s ({shrink_statements})")
+
+    assert _lot_state(lot_id) == (10000, 10000, 10000, 0)
+    # Statement counts are independent of lot size (a few batched INSERTs at most)
+    assert create_statements < 15 and grow_statements < 15 and shrink_statements < 15
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Status count tests
+Spot and reservation status counts come from one GROUP BY per table, are
+computed once per request and table and are shared by the admin dashboard,
+analytics, public stats, the spot status listing and the admin daily summary.
+The cache test is skipped when no Redis server is reachable
+"""
+
+import re
+from datetime import datetime
+
+import pytest
+
+from database import db
+from testing_utils import requires_redis
+from utils.cache_enhanced import invalidate_cache
+from utils.status_counts import (RESERVATION_STATUS_COUNTS_KEY, SPOT_STATUS_COUNTS_KEY,
+                                 compute_reservation_status_counts, compute_spot_status_counts,
+                                 get_reservation_status_counts, get_spot_status_counts)
+
+# A count() of one status, as the call sites issued before
+PER_STATUS_COUNT = re.compile(r'count\(.*WHERE (parking_spots|reservations)\.status = ', re.S)
+
+
+@pytest.fixture
+def traffic(make_user, make_lot):
+    from models.reservation import Reservation
+
+    user = make_user()
+    lot = make_lot(spots=6)
+    spots = lot.parking_spots
+    spots[0].status, spots[1].status, spots[2].status = 'O', 'O', 'R'
+    spots[1].is_active = False
+    now = datetime.utcnow()
+    for spot, status, cost in ((spots[0], 'active', None), (spots[3], 'completed', 25.5),
+                               (spots[4], 'completed', 14.5), (spots[5], 'cancelled', None)):
+        db.session.add(Reservation(spot_id=spot.id, user_id=user.id, vehicle_number='KA01XY0001',
+                                   parking_timestamp=now, status=status, parking_cost=cost))
+    db.session.commit()
+    invalidate_cache(SPOT_STATUS_COUNTS_KEY)
+    invalidate_cache(RESERVATION_STATUS_COUNTS_KEY)
+    return user
+
+
+def test_counts_in_one_statement_per_table(app, traffic, count_queries):
+    with count_queries() as statements:
+        spot_counts = compute_spot_status_counts()
+    assert len(statements) == 1 and 'FROM parking_spots' in statements[0]
+    assert spot_counts == {
+        'spots': {'A': 3, 'O': 2, 'R': 1, 'total': 6},
+        'active_spots': {'A': 3, 'O': 1, 'R': 1, 'total': 5}
+    }
+
+    with count_queries() as statements:
+        reservation_counts = compute_reservation_status_counts()
+    assert len(statements) == 1 and 'FROM reservations' in statements[0]
+    assert reservation_counts == {
+        'reservations': {'active': 1, 'completed': 2, 'cancelled': 1, 'total': 4},
+        'completed_revenue': 40.0
+    }
+
+
+def test_counts_are_memoized_per_request(app, traffic, count_queries):
+    with app.test_request_context():
+        spots = get_spot_status_counts()
+        with count_queries() as statements:
+            assert get_spot_status_counts() is spots
+        assert statements == []
+
+        with count_queries() as statements:
+            reservations = get_reservation_status_counts()
+            assert get_reservation_status_counts() is reservations
+        assert len(statements) == 1
+
+
+@requires_redis
+def test_counts_are_cached_until_an_event(app, traffic, count_queries):
+    get_spot_status_counts()
+    get_reservation_status_counts()
+    with count_queries() as statements:
+        get_spot_status_counts()
+        get_reservation_status_counts()
+    assert statements == []
+
+    invalidate_cache('spot_status_changed')
+    with count_queries() as statements:
+        get_spot_status_counts()
+        get_reservation_status_counts()
+    assert len(statements) == 1
+
+    invalidate_cache('reservation_created')
+    with count_queries() as statements:
+        get_spot_status_counts()
+        get_reservation_status_counts()
+    assert len(statements) == 2
+
+
+@pytest.mark.parametrize('url, admin', [
+    ('/api/admin/dashboard', True),
+    ('/api/admin/analytics', True),
+    ('/api/public/stats', False),
+    ('/api/admin/parking-spots/status', True),
+])
+def test_call_sites_share_the_counts(client, make_user, auth_headers, count_queries, traffic, url, admin):
+    headers = auth_headers(make_user('admin', role='admin')) if admin else {}
+    with count_queries() as statements:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.get_json()
+    assert not any(PER_STATUS_COUNT.search(statement) for statement in statements)
+    assert sum('GROUP BY parking_spots.status' in statement for statement in statements) == 1
+    assert sum('GROUP BY reservations.status' in statement for statement in statements) <= 1
+
+
+@pytest.mark.parametrize('url', ['/api/admin/analytics', '/api/admin/parking-spots/status'])
+def test_spot_only_call_sites_skip_the_reservation_counts(client, make_user, auth_headers, count_queries,
+                                                          traffic, url):
+    headers = auth_headers(make_user('admin', role='admin'))
+    with count_queries() as statements:
+        assert client.get(url, headers=headers).status_code == 200
+    assert not any('GROUP BY reservations.status' in statement for statement in statements)
+
+
+def test_dashboard_and_public_stats_figures(client, make_user, auth_headers, traffic):
+    admin = make_user('admin', role='admin')
+    stats = client.get('/api/admin/dashboard', headers=auth_headers(admin)).get_json()['statistics']
+    assert (stats['total_spots'], stats['available_spots'], stats['occupied_spots'], stats['reserved_spots']) == (6, 3, 2, 1)
+    assert (stats['total_reservations'], stats['active_reservations'], stats['completed_reservations']) == (4, 1, 2)
+    assert stats['total_revenue'] == 40.0
+
+    public = client.get('/api/public/stats').get_json()
+    assert (public['total_parking_spots'], public['available_spots'], public['total_reservations']) == (6, 3, 4)
+    assert public['utilization_rate'] == 50.0
+
+
+def test_admin_daily_summary(app, traffic, make_user, count_queries, monkeypatch):
+    from config import Config
+    from tasks import daily_reminders
+
+    make_user('admin', role='admin')
+    sent = []
+    monkeypatch.setattr(Config, 'MAIL_SERVER', 'localhost')
+    monkeypatch.setattr(daily_reminders, 'send_admin_summary_email', lambda admin, stats: sent.append(stats))
+
+    with count_queries() as statements:
+        result = daily_reminders.send_admin_daily_summary.run()  # run() skips ContextTask's app context
+    assert result['status'] == 'completed', result
+    assert not any(PER_STATUS_COUNT.search(statement) for statement in statements)
+    assert sent[0]['active_reservations'] == 1
+    assert (sent[0]['total_spots'], sent[0]['occupied_spots'], sent[0]['occupancy_rate']) == (5, 1, 20.0)
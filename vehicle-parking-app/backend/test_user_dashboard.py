@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+User dashboard aggregation tests
+Checks the dashboard figures against a known history and that the number of
+SQL statements does not grow with the number of reservations
+"""
+
+from datetime import datetime, timedelta
+
+from database import db
+
+
+def _reserve(user, spot, created_at, status='completed', cost=10):
+    from models.reservation import Reservation
+    db.session.add(Reservation(
+        spot_id=spot.id,
+        user_id=user.id,
+        vehicle_number='MH12AB1234',
+        parking_timestamp=created_at,
+        leaving_timestamp=created_at + timedelta(hours=1) if status == 'completed' else None,
+        parking_cost=cost if status == 'completed' else None,
+        status=status,
+        created_at=created_at
+    ))
+
+
+def test_dashboard_figures(client, make_user, make_lot, auth_headers):
+    user = make_user()
+    mall, airport = make_lot(name='Mall', spots=2), make_lot(name='Airport', spots=2)
+    now = datetime.now()
+
+    _reserve(user, mall.parking_spots[0], now - timedelta(days=1), cost=30)
+    _reserve(user, mall.parking_spots[1], now - timedelta(days=2), cost=20)
+    _reserve(user, airport.parking_spots[0], now - timedelta(days=10), status='cancelled')
+    _reserve(user, airport.parking_spots[1], now - timedelta(hours=1), status='active')
+    db.session.commit()
+
+    response = client.get('/api/user/dashboard', headers=auth_headers(user))
+    assert response.status_code == 200
+    data = response.get_json()
+
+    assert data['statistics'] == {
+        'total_reservations': 4,
+        'completed_reservations': 2,
+        'total_spent': 50.0
+    }
+    assert data['active_reservation']['status'] == 'active'
+    assert {d['status']: d['count'] for d in data['status_distribution']} == {
+        'completed': 2, 'cancelled': 1, 'active': 1
+    }
+    assert data['most_used_lot'] == {'name': 'Mall', 'usage_count': 2}
+    assert data['lot_usage_stats'][0] == {'lot_name': 'Mall', 'reservations': 2, 'total_spent': 50.0}
+
+    assert len(data['monthly_stats']) == 6
+    assert data['monthly_stats'][0]['month'] == now.strftime('%B %Y')
+    assert sum(m['reservations'] for m in data['monthly_stats']) == 4
+    assert sum(m['amount_spent'] for m in data['monthly_stats']) == 50.0
+
+    assert [w['week'] for w in data['weekly_stats']] == ['Week 4', 'Week 3', 'Week 2', 'Week 1']
+    assert data['weekly_stats'][0]['reservations'] == 3
+    assert data['weekly_stats'][0]['amount_spent'] == 50.0
+    assert data['weekly_stats'][1]['reservations'] == 1
+
+    assert len(data['recent_activity']) == 4
+    assert data['recent_activity'][0]['lot_name'] == 'Airport'
+
+
+def test_dashboard_statement_count_is_flat(client, make_user, make_lot, auth_headers, count_queries):
+    light, heavy = make_user('light_user'), make_user('heavy_user')
+    lots = [make_lot(name=f'Lot {i}', spots=3) for i in range(4)]
+    spots = [spot for lot in lots for spot in lot.parking_spots]
+    now = datetime.now()
+
+    _reserve(light, spots[0], now - timedelta(days=1))
+    for i in range(400):
+        _reserve(heavy, spots[i % len(spots)], now - timedelta(hours=9 * i))
+    db.session.commit()
+
+    counts = []
+    for user in (light, heavy):
+        with count_queries() as statements:
+            response = client.get('/api/user/dashboard', headers=auth_headers(user))
+        assert response.status_code == 200
+        counts.append(len(statements))
+
+    # One user lookup in the auth decorator plus the four dashboard statements
+    assert counts[0] == counts[1] == 5
@@ -0,0 +1,26 @@
+"""
+Helpers shared by the self-contained backend tests.
+
+Test modules import these directly; conftest.py is loaded by pytest as a
+plugin and must not be imported from a test module, which would run it a
+second time.
+"""
+
+import pytest
+
+
+def _redis_reachable():
+    """Live PING of the cache's Redis.
+
+    Gate Redis-backed tests on this, never on cache_manager.is_available():
+    that only reads the circuit breaker, which reports available again once
+    its backoff has passed even with no server running.
+    """
+    from utils.cache_enhanced import cache_manager
+    try:
+        return cache_manager.redis_client is not None and bool(cache_manager.redis_client.ping())
+    except Exception:
+        return False
+
+
+requires_redis = pytest.mark.skipif(not _redis_reachable(), reason='Redis server not reachable')
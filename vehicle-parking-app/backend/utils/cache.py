@@ -71,15 +71,16 @@ class Cache:
     
     @staticmethod
     def clear_pattern(pattern):
-        """Clear cache keys matching pattern"""
+        """Clear cache keys matching pattern (incremental SCAN, never KEYS)"""
         if not REDIS_AVAILABLE:
             return False
         
         try:
-            keys = redis_client.keys(f"{Config.CACHE_KEY_PREFIX}{pattern}")
-            if keys:
-                return redis_client.delete(*keys)
-            return True
+            keys = list(redis_client.scan_iter(match=f"{Config.CACHE_KEY_PREFIX}{pattern}", count=500))
+            deleted = 0
+            for start in range(0, len(keys), 500):
+                deleted += redis_client.delete(*keys[start:start + 500])
+            return deleted or True
         except Exception as e:
             print(f"Cache clear pattern error: {e}")
             return False
@@ -4,23 +4,104 @@ Provides comprehensive caching functionality for API performance optimization
 """
 
 from functools import wraps
+from collections import defaultdict
+import base64
 import json
+import math
+import random
 import pickle
+import os
+import threading
+import time
+import uuid
 from datetime import datetime, timedelta
 import redis
 import hashlib
 import logging
-from flask import request
+from flask import request, current_app, Response
 from config import Config
+from utils.circuit_breaker import CircuitBreaker, CLOSED
+from utils.local_cache import LocalLRUCache
 
 logger = logging.getLogger(__name__)
 
+# Store a value and register it in its tag sets. A tag set never expires
+# before the entries it lists, so an invalidation can always find them.
+_SET_WITH_TAGS_LUA = """
+local ttl = tonumber(ARGV[1])
+redis.call('SETEX', KEYS[1], ttl, ARGV[2])
+for i = 2, #KEYS do
+    redis.call('SADD', KEYS[i], KEYS[1])
+    if redis.call('TTL', KEYS[i]) < ttl then
+        redis.call('EXPIRE', KEYS[i], ttl)
+    end
+end
+return 1
+"""
+
+# Delete every entry listed in the given tag sets, then the sets themselves.
+# Runs atomically, so an entry cached concurrently is either deleted or
+# registered in a fresh set - never silently orphaned.
+_INVALIDATE_TAGS_LUA = """
+local deleted = 0
+for i = 1, #KEYS do
+    local members = redis.call('SMEMBERS', KEYS[i])
+    for j = 1, #members, 500 do
+        deleted = deleted + redis.call('DEL', unpack(members, j, math.min(j + 499, #members)))
+    end
+    redis.call('DEL', KEYS[i])
+end
+return deleted
+"""
+
+# Errors that mean Redis itself is unreachable (as opposed to a bad command)
+_CONNECTION_ERRORS = (redis.ConnectionError, redis.TimeoutError)
+
+# Delete a lock only if it still holds our token (it may have expired and
+# been taken by another worker)
+_RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# acquire_lock result when Redis could not be asked, as opposed to None
+# (the lock is held by another worker)
+LOCK_UNAVAILABLE = 'unavailable'
+
 class CacheManager:
-    """Enhanced centralized cache management with Redis"""
+    """Enhanced centralized cache management with Redis
+    
+    Availability is tracked by a circuit breaker fed from the outcome of real
+    cache calls, so the hot path never spends a round trip on PING. While
+    Redis is down the breaker skips cache calls and a background probe
+    detects recovery.
+    
+    Hot endpoints can also use an in-process L1 (get_local/set_local). Every
+    invalidation is published on a Redis channel; each process listens on it
+    and only serves L1 entries while that subscription is live, so workers
+    never serve an entry another process has invalidated.
+    """
     
     def __init__(self):
         self.redis_client = None
-        self.is_connected = False
+        self._set_with_tags = None
+        self._invalidate_tags = None
+        self._release_lock = None
+        self.local = LocalLRUCache(max_entries=512, default_ttl=30)
+        self._invalidation_channel = f"{Config.CACHE_KEY_PREFIX}invalidations"
+        self._listener_thread = None
+        self._listener_pid = None
+        self._listener_ready = False
+        self._listener_lock = threading.Lock()
+        self.breaker = CircuitBreaker(
+            'redis-cache',
+            base_delay=1.0,
+            max_delay=60.0,
+            probe=self._probe,
+            probe_interval=5.0
+        )
         self._init_redis()
     
     def _init_redis(self):
@@ -35,34 +116,141 @@ class CacheManager:
                 socket_timeout=5,
                 retry_on_timeout=True
             )
-            # Test connection
+            self._set_with_tags = self.redis_client.register_script(_SET_WITH_TAGS_LUA)
+            self._invalidate_tags = self.redis_client.register_script(_INVALIDATE_TAGS_LUA)
+            self._release_lock = self.redis_client.register_script(_RELEASE_LOCK_LUA)
+            # Test connection once; afterwards real calls report health
             self.redis_client.ping()
-            self.is_connected = True
             logger.info("✅ Enhanced Redis cache initialized successfully")
         except Exception as e:
             logger.error(f"❌ Redis cache initialization failed: {e}")
-            self.redis_client = None
-            self.is_connected = False
+            self.breaker.record_failure(e)
+    
+    def _probe(self):
+        self.redis_client.ping()
+    
+    @property
+    def is_connected(self):
+        return self.breaker.state == CLOSED
     
     def is_available(self):
-        """Check if Redis cache is available"""
-        if not self.redis_client or not self.is_connected:
+        """Check if Redis cache calls may be attempted (no network I/O, claims nothing)"""
+        return self.redis_client is not None and not self.breaker.is_open()
+    
+    def _claim(self):
+        """Right before a Redis command: may it be sent? Claims the half-open trial"""
+        return self.redis_client is not None and self.breaker.allow_request()
+    
+    def _record_error(self, error):
+        """Open the circuit when Redis is unreachable; other errors are per-call"""
+        if isinstance(error, _CONNECTION_ERRORS):
+            self.breaker.record_failure(error)
+    
+    # L1 (in-process) cache
+    
+    def _listener_running(self):
+        return (
+            self._listener_pid == os.getpid()
+            and self._listener_thread is not None
+            and self._listener_thread.is_alive()
+        )
+    
+    def _local_enabled(self):
+        """True while this process is subscribed to invalidation messages"""
+        if self.redis_client is None:
             return False
+        if not self._listener_running():
+            self._start_listener()
+        return self._listener_ready
+    
+    def get_local(self, key):
+        """Decoded value from the in-process cache, or None"""
+        if not self._local_enabled():
+            return None
+        return self.local.get(key)
+    
+    def set_local(self, key, value, timeout=None, tags=None, generation=None):
+        """Keep an already decoded value in the in-process cache.
+        
+        Pass the ``local.generation`` read before fetching the value so a fill
+        that raced an invalidation is discarded.
+        """
+        if self._local_enabled():
+            self.local.set(key, value, timeout, tags or (), generation=generation)
+    
+    def _start_listener(self):
+        with self._listener_lock:
+            if self._listener_running():
+                return
+            # Threads do not survive a fork; each worker needs its own listener
+            self._listener_ready = False
+            self.local.clear()
+            self._listener_pid = os.getpid()
+            self._listener_thread = threading.Thread(
+                target=self._listen_for_invalidations, name='cache-invalidation-listener', daemon=True
+            )
+            self._listener_thread.start()
+    
+    def _listen_for_invalidations(self):
+        delay = 1
+        while self._listener_pid == os.getpid():
+            pubsub = None
+            try:
+                pubsub = self.redis_client.pubsub()
+                pubsub.subscribe(self._invalidation_channel)
+                # Only trust L1 once the subscription is confirmed
+                while pubsub.get_message(timeout=1.0) is None:
+                    pass
+                self._listener_ready = True
+                delay = 1
+                while True:
+                    message = pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message and message['type'] == 'message':
+                        self._apply_invalidation(message['data'])
+            except Exception as e:
+                logger.warning(f"Cache invalidation listener disconnected: {e}")
+            finally:
+                # Messages may have been missed; nothing in L1 can be trusted
+                self._listener_ready = False
+                self.local.clear()
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+            time.sleep(delay)
+            delay = min(delay * 2, 60)
+    
+    def _apply_invalidation(self, data):
         try:
-            self.redis_client.ping()
-            return True
-        except:
-            self.is_connected = False
-            return False
+            message = json.loads(data)
+        except (json.JSONDecodeError, TypeError):
+            return
+        if message.get('clear'):
+            self.local.clear()
+        if message.get('tags'):
+            self.local.invalidate_tags(message['tags'])
+        for key in message.get('keys', ()):
+            self.local.delete(key)
+    
+    def _publish_invalidation(self, **message):
+        """Evict locally and tell every other process to do the same"""
+        self._apply_invalidation(json.dumps(message))
+        try:
+            self.redis_client.publish(self._invalidation_channel, json.dumps(message))
+        except Exception as e:
+            self._record_error(e)
+            logger.error(f"Cache invalidation publish error: {e}")
     
     def get(self, key):
         """Get value from cache with JSON parsing"""
-        if not self.is_available():
+        if not self._claim():
             return None
         
         try:
             full_key = f"{Config.CACHE_KEY_PREFIX}{key}"
             value = self.redis_client.get(full_key)
+            self.breaker.record_success()
             if value is None:
                 return None
             
@@ -72,12 +260,16 @@ class CacheManager:
             except (json.JSONDecodeError, TypeError):
                 return value
         except Exception as e:
+            self._record_error(e)
             logger.error(f"Cache get error for key {key}: {e}")
             return None
     
-    def set(self, key, value, timeout=None):
-        """Set value in cache with optional timeout"""
-        if not self.is_available():
+    def _tag_key(self, tag):
+        return f"{Config.CACHE_KEY_PREFIX}tag:{tag}"
+    
+    def set(self, key, value, timeout=None, tags=None):
+        """Set value in cache with optional timeout and invalidation tags"""
+        if not self._claim():
             return False
         
         try:
@@ -105,50 +297,127 @@ class CacheManager:
             if isinstance(value, (dict, list, tuple)):
                 value = json.dumps(value, default=str)
             
-            self.redis_client.setex(full_key, timeout, value)
+            if tags:
+                tag_keys = [self._tag_key(tag) for tag in tags]
+                self._set_with_tags(keys=[full_key] + tag_keys, args=[timeout, value])
+            else:
+                self.redis_client.setex(full_key, timeout, value)
+            self.breaker.record_success()
             return True
         except Exception as e:
+            self._record_error(e)
             logger.error(f"Cache set error for key {key}: {e}")
             return False
     
     def delete(self, key):
         """Delete key from cache"""
-        if not self.is_available():
+        if not self._claim():
             return False
         
         try:
             full_key = f"{Config.CACHE_KEY_PREFIX}{key}"
             self.redis_client.delete(full_key)
+            self.breaker.record_success()
+            self._publish_invalidation(keys=[key])
             return True
         except Exception as e:
+            self._record_error(e)
             logger.error(f"Cache delete error for key {key}: {e}")
             return False
     
+    def acquire_lock(self, name, timeout):
+        """Try to take a short-lived lock.
+        
+        Returns a release token, None if another worker holds the lock, or
+        LOCK_UNAVAILABLE if Redis could not be asked (circuit open or error).
+        """
+        if not self._claim():
+            return LOCK_UNAVAILABLE
+        token = uuid.uuid4().hex
+        try:
+            acquired = self.redis_client.set(
+                f"{Config.CACHE_KEY_PREFIX}lock:{name}", token, nx=True, px=int(timeout * 1000)
+            )
+            self.breaker.record_success()
+            return token if acquired else None
+        except Exception as e:
+            self._record_error(e)
+            logger.error(f"Cache lock error for {name}: {e}")
+            return LOCK_UNAVAILABLE
+    
+    def release_lock(self, name, token):
+        """Release a lock taken with acquire_lock, if it is still ours"""
+        try:
+            self._release_lock(keys=[f"{Config.CACHE_KEY_PREFIX}lock:{name}"], args=[token])
+        except Exception as e:
+            self._record_error(e)
+            logger.error(f"Cache lock release error for {name}: {e}")
+    
+    def invalidate_tags(self, tags):
+        """Delete every entry registered under any of ``tags``.
+        
+        Costs O(entries in those tags) and never walks the keyspace.
+        Returns the number of entries deleted.
+        """
+        if not tags or not self._claim():
+            return 0
+        
+        try:
+            deleted = self._invalidate_tags(keys=[self._tag_key(tag) for tag in tags])
+            self.breaker.record_success()
+            self._publish_invalidation(tags=list(tags))
+            return deleted
+        except Exception as e:
+            self._record_error(e)
+            logger.error(f"Cache tag invalidation error for {tags}: {e}")
+            return 0
+    
     def delete_pattern(self, pattern):
-        """Delete all keys matching pattern"""
-        if not self.is_available():
-            return False
+        """Delete all keys matching pattern.
+        
+        Walks the keyspace incrementally with SCAN, so it does not block Redis,
+        but it is still O(keyspace); routine invalidation should use tags.
+        """
+        if not self._claim():
+            return 0
         
         try:
             full_pattern = f"{Config.CACHE_KEY_PREFIX}{pattern}"
-            keys = self.redis_client.keys(full_pattern)
-            if keys:
-                self.redis_client.delete(*keys)
-                logger.debug(f"Deleted {len(keys)} keys matching pattern: {pattern}")
-            return True
+            deleted = 0
+            batch = []
+            for key in self.redis_client.scan_iter(match=full_pattern, count=500):
+                batch.append(key)
+                if len(batch) >= 500:
+                    deleted += self.redis_client.delete(*batch)
+                    batch = []
+            if batch:
+                deleted += self.redis_client.delete(*batch)
+            logger.debug(f"Deleted {deleted} keys matching pattern: {pattern}")
+            self.breaker.record_success()
+            self._publish_invalidation(clear=True)
+            return deleted
         except Exception as e:
+            self._record_error(e)
             logger.error(f"Cache delete pattern error for {pattern}: {e}")
-            return False
+            return 0
     
     def get_stats(self):
         """Get detailed cache statistics"""
-        if not self.is_available():
-            return {'status': 'unavailable'}
+        if not self._claim():
+            return {
+                'status': 'unavailable',
+                'circuit': self.breaker.stats(),
+                'local': self.local.stats(),
+                'endpoints': get_endpoint_cache_stats()
+            }
         
         try:
             info = self.redis_client.info()
+            self.breaker.record_success()
             return {
                 'status': 'available',
+                'circuit': self.breaker.stats(),
+                'local': dict(self.local.stats(), subscribed=self._listener_ready),
                 'used_memory': info.get('used_memory_human', 'N/A'),
                 'connected_clients': info.get('connected_clients', 0),
                 'total_commands_processed': info.get('total_commands_processed', 0),
@@ -157,9 +426,11 @@ class CacheManager:
                 'hit_rate': round(
                     (info.get('keyspace_hits', 0) / 
                      max(info.get('keyspace_hits', 0) + info.get('keyspace_misses', 0), 1)) * 100, 2
-                ) if (info.get('keyspace_hits', 0) + info.get('keyspace_misses', 0)) > 0 else 0
+                ) if (info.get('keyspace_hits', 0) + info.get('keyspace_misses', 0)) > 0 else 0,
+                'endpoints': get_endpoint_cache_stats()
             }
         except Exception as e:
+            self._record_error(e)
             logger.error(f"Error getting cache stats: {e}")
             return {'status': 'error', 'error': str(e)}
 
@@ -207,41 +478,110 @@ except Exception as e:
     REDIS_AVAILABLE = False
 
 # Cache configuration for different endpoints
+#
+# Every cached entry is tagged with its endpoint's key_prefix, plus
+# "<prefix>:user_<id>" / "<prefix>:lot_<id>" and "user_<id>" when it is scoped
+# to a user or a lot. invalidate_cache() maps an event from 'invalidate_on' to
+# the narrowest matching tags, so invalidation never scans the keyspace.
 CACHE_CONFIG = {
     'parking_lots': {
         'timeout': 300,  # 5 minutes
         'key_prefix': 'lots',
-        'invalidate_on': ['lot_created', 'lot_updated', 'lot_deleted']
+        'local': True,   # also kept in the in-process L1
+        'invalidate_on': ['lot_created', 'lot_updated', 'lot_deleted', 'reservation_created',
+                          'reservation_updated', 'reservation_deleted', 'spot_status_changed']
+    },
+    'parking_lot_details': {
+        'timeout': 60,   # 1 minute (lists spots by status)
+        'key_prefix': 'lot_details',
+        'lot_specific': True,
+        'local': True,
+        'invalidate_on': ['lot_updated', 'lot_deleted', 'reservation_created',
+                          'reservation_updated', 'reservation_deleted', 'spot_status_changed']
+    },
+    'public_stats': {
+        'timeout': 60,   # 1 minute
+        'key_prefix': 'public_stats',
+        'local': True,
+        'invalidate_on': ['lot_created', 'lot_updated', 'lot_deleted', 'reservation_created',
+                          'reservation_updated', 'reservation_deleted', 'spot_status_changed']
     },
     'available_spots': {
         'timeout': 60,   # 1 minute (frequently changing)
         'key_prefix': 'spots',
+        'lot_specific': True,
         'invalidate_on': ['reservation_created', 'reservation_updated', 'spot_status_changed']
     },
     'user_reservations': {
         'timeout': 60,   # 1 minute (user needs quick updates)
         'key_prefix': 'reservations',
+        'user_specific': True,
         'invalidate_on': ['reservation_created', 'reservation_updated', 'reservation_deleted']
     },
     'dashboard_stats': {
         'timeout': 180,  # 3 minutes
-        'key_prefix': 'dashboard',
+        'key_prefix': 'dashboard_stats',
         'invalidate_on': ['reservation_updated', 'reservation_created']
     },
     'lot_occupancy': {
         'timeout': 30,   # 30 seconds (real-time data)
         'key_prefix': 'occupancy',
+        'lot_specific': True,
         'invalidate_on': ['reservation_created', 'reservation_updated']
     },
     'user_dashboard': {
         'timeout': 60,   # 1 minute (user needs quick updates for actions)
         'key_prefix': 'dashboard',
+        'user_specific': True,
         'invalidate_on': ['reservation_created', 'reservation_updated', 'reservation_deleted']
     },
     'user_parking_history': {
         'timeout': 300,  # 5 minutes (historical data changes less frequently)
         'key_prefix': 'parking_history',
-        'invalidate_on': ['reservation_updated', 'reservation_deleted']
+        'user_specific': True,
+        'invalidate_on': ['reservation_created', 'reservation_updated', 'reservation_deleted']
+    },
+    'admin_dashboard': {
+        'timeout': 180,  # 3 minutes
+        'key_prefix': 'admin_dashboard',
+        'invalidate_on': ['lot_created', 'lot_updated', 'lot_deleted', 'user_registered',
+                          'user_updated', 'reservation_created', 'reservation_updated',
+                          'reservation_deleted', 'spot_status_changed']
+    },
+    'admin_reservations': {
+        'timeout': 120,  # 2 minutes
+        'key_prefix': 'admin_reservations',
+        'invalidate_on': ['reservation_created', 'reservation_updated', 'reservation_deleted',
+                          'spot_status_changed']
+    },
+    'admin_users': {
+        'timeout': 300,  # 5 minutes
+        'key_prefix': 'admin_users',
+        'invalidate_on': ['user_registered', 'user_updated']
+    },
+    'admin_parking_spots_status': {
+        'timeout': 60,   # 1 minute
+        'key_prefix': 'admin_spots_status',
+        'invalidate_on': ['lot_created', 'lot_updated', 'lot_deleted', 'reservation_created',
+                          'reservation_updated', 'reservation_deleted', 'spot_status_changed']
+    },
+    'spot_status_counts': {
+        'timeout': 15,   # 15 seconds (shared by the dashboards, see utils/status_counts.py)
+        'key_prefix': 'spot_status_counts',
+        'invalidate_on': ['lot_created', 'lot_updated', 'lot_deleted', 'reservation_created',
+                          'reservation_updated', 'reservation_deleted', 'spot_status_changed']
+    },
+    'reservation_status_counts': {
+        'timeout': 15,   # 15 seconds (shared by the dashboards, see utils/status_counts.py)
+        'key_prefix': 'reservation_status_counts',
+        'invalidate_on': ['lot_deleted', 'reservation_created', 'reservation_updated',
+                          'reservation_deleted']
+    },
+    'admin_occupied_spots': {
+        'timeout': 30,   # 30 seconds (real-time data)
+        'key_prefix': 'admin_occupied_spots',
+        'invalidate_on': ['reservation_created', 'reservation_updated', 'reservation_deleted',
+                          'spot_status_changed']
     }
 }
 
@@ -272,13 +612,137 @@ def generate_cache_key(endpoint, **kwargs):
     
     return ':'.join(key_parts)
 
+def generate_cache_tags(endpoint, user_id=None, lot_id=None):
+    """Tags an endpoint's cached entry is registered under"""
+    prefix = CACHE_CONFIG[endpoint]['key_prefix']
+    tags = [prefix]
+    if user_id is not None:
+        tags.extend([f"{prefix}:user_{user_id}", f"user_{user_id}"])
+    if lot_id is not None:
+        tags.append(f"{prefix}:lot_{lot_id}")
+    return tags
+
+# Response headers that must not be replayed from the cache
+_UNCACHED_HEADERS = {'content-length', 'set-cookie', 'date'}
+
+# Stampede protection defaults (overridable per endpoint in CACHE_CONFIG)
+EARLY_REFRESH_BETA = 1.0   # >1 refreshes earlier, 0 disables early refresh
+REBUILD_LOCK_TIMEOUT = 10  # seconds one worker may hold a key's rebuild lock
+REBUILD_WAIT = 3           # seconds a cold miss waits for another worker's rebuild
+
+# Per-endpoint hit/miss counters for this process
+_endpoint_stats = defaultdict(lambda: {
+    'hits': 0, 'misses': 0, 'bypassed': 0, 'stale_hits': 0, 'early_refreshes': 0
+})
+_endpoint_stats_lock = threading.Lock()
+
+def record_cache_event(endpoint_name, outcome):
+    """Count a 'hits', 'misses', 'bypassed', 'stale_hits' or 'early_refreshes' outcome"""
+    with _endpoint_stats_lock:
+        _endpoint_stats[endpoint_name][outcome] += 1
+
+def get_endpoint_cache_stats():
+    """Hit/miss counters per cached endpoint (since this process started)"""
+    with _endpoint_stats_lock:
+        stats = {}
+        for endpoint_name, counts in _endpoint_stats.items():
+            lookups = counts['hits'] + counts['misses']
+            stats[endpoint_name] = dict(
+                counts,
+                hit_rate=round(counts['hits'] / lookups * 100, 2) if lookups else 0
+            )
+        return stats
+
+def freeze_response(response, created=None, compute_time=0.0):
+    """Serializable snapshot of a response: body, status, headers and ETag.
+    
+    ``created`` and ``compute_time`` (seconds the view took) drive
+    stale-while-revalidate and early refresh.
+    """
+    body = response.get_data()
+    try:
+        encoded, encoding = body.decode('utf-8'), 'utf-8'
+    except UnicodeDecodeError:
+        encoded, encoding = base64.b64encode(body).decode('ascii'), 'base64'
+    return {
+        'status': response.status_code,
+        'headers': [
+            [name, value] for name, value in response.headers.items()
+            if name.lower() not in _UNCACHED_HEADERS
+        ],
+        'body': encoded,
+        'encoding': encoding,
+        'etag': hashlib.sha1(body).hexdigest(),
+        'created': created if created is not None else time.time(),
+        'compute_time': compute_time
+    }
+
+def thaw_response(entry):
+    """Rebuild a response from freeze_response() output without re-running the view"""
+    if entry['encoding'] == 'utf-8':
+        body = entry['body'].encode('utf-8')
+    else:
+        body = base64.b64decode(entry['body'])
+    response = Response(body, status=entry['status'], headers=entry['headers'])
+    response.set_etag(entry['etag'])
+    return response
+
+def _is_cacheable(response):
+    return (
+        response.status_code == 200
+        and not response.is_streamed
+        and not response.direct_passthrough
+    )
+
+def entry_state(entry, timeout, beta=EARLY_REFRESH_BETA, now=None):
+    """Classify a cached entry as 'fresh', 'refresh' or 'stale'.
+    
+    'stale' entries are past their timeout but still inside the stale window.
+    'refresh' is probabilistic early expiry (XFetch): the closer an entry is
+    to expiring, and the longer it took to compute, the likelier one request
+    is picked to rebuild it before it actually expires.
+    """
+    now = now if now is not None else time.time()
+    created = entry.get('created')
+    if created is None:
+        return 'fresh'
+    expires_at = created + timeout
+    if now >= expires_at:
+        return 'stale'
+    compute_time = entry.get('compute_time') or 0
+    if beta and compute_time > 0:
+        if now - compute_time * beta * math.log(1.0 - random.random()) >= expires_at:
+            return 'refresh'
+    return 'fresh'
+
+def _wait_for_rebuild(cache_key, deadline):
+    """Poll for a value another worker is rebuilding; None on timeout"""
+    while time.time() < deadline:
+        time.sleep(0.05)
+        entry = cache_manager.get(cache_key)
+        if isinstance(entry, dict) and 'body' in entry:
+            return entry
+    return None
+
 def cached_endpoint(endpoint_name, **cache_kwargs):
-    """Decorator for caching API endpoints with performance monitoring"""
+    """Decorator that caches an endpoint's full response (body, status, headers, ETag).
+    
+    Hits are served straight from the stored body without calling the view or
+    re-serializing anything, and honour If-None-Match with a 304. Only 200
+    responses are stored, so errors are never replayed.
+    
+    Entries stay in Redis for ``stale_ttl`` seconds past their timeout. When an
+    entry goes stale (or is picked for early refresh) one worker takes a
+    per-key lock and rebuilds it while every other request keeps getting the
+    previous copy; on a cold miss the other requests wait briefly for that
+    rebuild instead of all running the view at once.
+    """
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
             # Skip caching if not available or if Redis/cache is unavailable
             if not cache_manager.is_available():
+                record_cache_event(endpoint_name, 'bypassed')
                 return func(*args, **kwargs)
                 
             # Skip caching for non-GET requests
@@ -289,46 +753,107 @@ def cached_endpoint(endpoint_name, **cache_kwargs):
                 # Not in request context, execute function directly
                 return func(*args, **kwargs)
             
+            config = CACHE_CONFIG.get(endpoint_name)
+            if not config:
+                return func(*args, **kwargs)
+            
             try:
-                # Handle user_specific caching
                 cache_key_kwargs = cache_kwargs.copy()
-                if cache_kwargs.get('user_specific', False):
+                timeout = cache_key_kwargs.pop('timeout', None) or config['timeout']
+                stale_ttl = config.get('stale_ttl', timeout)
+                beta = config.get('early_refresh_beta', EARLY_REFRESH_BETA)
+                
+                # Handle user_specific caching
+                user_specific = cache_key_kwargs.pop('user_specific', config.get('user_specific', False))
+                if user_specific:
                     try:
                         # Try to get user_id from request context
                         if hasattr(request, 'current_user_id'):
                             cache_key_kwargs['user_id'] = request.current_user_id
-                        # Remove user_specific flag as it's not needed in cache key
-                        cache_key_kwargs.pop('user_specific', None)
                     except:
                         pass  # If user context not available, proceed without user-specific caching
                 
+                # URL parameters (e.g. lot_id) are part of the key
+                cache_key_kwargs.update(kwargs)
+                
                 # Generate cache key
                 cache_key = generate_cache_key(endpoint_name, **cache_key_kwargs)
                 
-                # Try to get from cache
-                start_time = datetime.now()
-                cached_result = cache_manager.get(cache_key)
+                tags = generate_cache_tags(
+                    endpoint_name,
+                    user_id=cache_key_kwargs.get('user_id'),
+                    lot_id=kwargs.get('lot_id')
+                )
+                use_local = config.get('local', False)
+                generation = None
                 
-                if cached_result is not None:
-                    cache_time = (datetime.now() - start_time).total_seconds() * 1000
-                    logger.debug(f"✅ Cache HIT for {cache_key} ({cache_time:.2f}ms)")
-                    # Return cached result as JSON response
-                    from flask import jsonify
-                    return jsonify(cached_result)
+                def serve(entry):
+                    return thaw_response(entry).make_conditional(request)
                 
-                # Execute function and cache result
-                logger.debug(f"❌ Cache MISS for {cache_key}")
-                result = func(*args, **kwargs)
+                def rebuild():
+                    started = time.time()
+                    response = current_app.make_response(func(*args, **kwargs))
+                    if _is_cacheable(response):
+                        entry = freeze_response(response, compute_time=time.time() - started)
+                        response.set_etag(entry['etag'])
+                        cache_manager.set(cache_key, entry, timeout + stale_ttl, tags=tags)
+                        if use_local:
+                            cache_manager.set_local(cache_key, entry, timeout, tags, generation=generation)
+                        response = response.make_conditional(request)
+                    return response
+                
+                # Try the in-process L1 first, then Redis
+                if use_local:
+                    entry = cache_manager.get_local(cache_key)
+                    if entry is not None and entry_state(entry, timeout, beta) == 'fresh':
+                        record_cache_event(endpoint_name, 'hits')
+                        return serve(entry)
+                    generation = cache_manager.local.generation
                 
-                # Cache the result
-                if endpoint_name in CACHE_CONFIG:
-                    timeout = CACHE_CONFIG[endpoint_name]['timeout']
-                    cache_manager.set(cache_key, result, timeout)
+                entry = cache_manager.get(cache_key)
+                if not (isinstance(entry, dict) and 'body' in entry):
+                    entry = None
                 
-                exec_time = (datetime.now() - start_time).total_seconds() * 1000
-                logger.debug(f"⏱️  Function executed in {exec_time:.2f}ms")
+                if entry is not None:
+                    state = entry_state(entry, timeout, beta)
+                    if state == 'fresh':
+                        record_cache_event(endpoint_name, 'hits')
+                        if use_local:
+                            cache_manager.set_local(cache_key, entry, timeout, tags, generation=generation)
+                        logger.debug(f"✅ Cache HIT for {cache_key}")
+                        return serve(entry)
+                    
+                    # Stale or due for early refresh: one worker rebuilds,
+                    # everyone else keeps serving the copy they already have
+                    token = cache_manager.acquire_lock(cache_key, REBUILD_LOCK_TIMEOUT)
+                    if token is None or token == LOCK_UNAVAILABLE:
+                        record_cache_event(endpoint_name, 'hits')
+                        if state == 'stale':
+                            record_cache_event(endpoint_name, 'stale_hits')
+                        return serve(entry)
+                    
+                    record_cache_event(endpoint_name, 'early_refreshes' if state == 'refresh' else 'misses')
+                    try:
+                        return rebuild()
+                    finally:
+                        cache_manager.release_lock(cache_key, token)
                 
-                return result
+                # Cold miss: single-flight the rebuild across workers
+                record_cache_event(endpoint_name, 'misses')
+                logger.debug(f"❌ Cache MISS for {cache_key}")
+                token = cache_manager.acquire_lock(cache_key, REBUILD_LOCK_TIMEOUT)
+                if token == LOCK_UNAVAILABLE:
+                    # Nobody can publish a rebuild we could wait for
+                    return rebuild()
+                if token is None:
+                    entry = _wait_for_rebuild(cache_key, time.time() + REBUILD_WAIT)
+                    if entry is not None:
+                        return serve(entry)
+                try:
+                    return rebuild()
+                finally:
+                    if token is not None:
+                        cache_manager.release_lock(cache_key, token)
                 
             except Exception as e:
                 # If caching fails, execute function directly
@@ -337,22 +862,43 @@ def cached_endpoint(endpoint_name, **cache_kwargs):
         return wrapper
     return decorator
 
-def invalidate_cache(pattern):
-    """Invalidate cache based on pattern"""
+def tags_for_event(event, user_id=None, lot_id=None):
+    """Narrowest set of tags affected by ``event``.
+    
+    User- or lot-scoped endpoints only lose the entries of that user or lot
+    when the id is known; everything else loses its whole namespace. A name
+    that is not a configured event is treated as a tag itself, e.g.
+    ``invalidate_cache('user_42')`` or ``invalidate_cache('lots')``.
+    """
+    tags = set()
+    for config in CACHE_CONFIG.values():
+        if event not in config['invalidate_on']:
+            continue
+        prefix = config['key_prefix']
+        if config.get('user_specific') and user_id is not None:
+            tags.add(f"{prefix}:user_{user_id}")
+        elif config.get('lot_specific') and lot_id is not None:
+            tags.add(f"{prefix}:lot_{lot_id}")
+        else:
+            tags.add(prefix)
+    return tags or {event}
+
+def invalidate_cache(event, user_id=None, lot_id=None):
+    """Invalidate the cached entries affected by an event (or a single tag)"""
     if not cache_manager.is_available():
-        return
+        return 0
         
     try:
-        logger.info(f"🗑️ Invalidating cache pattern: {pattern}")
+        tags = sorted(tags_for_event(event, user_id=user_id, lot_id=lot_id))
+        logger.info(f"🗑️ Invalidating cache tags for {event}: {tags}")
         
-        # Use the cache manager to delete pattern
-        deleted_count = cache_manager.delete_pattern(pattern)
+        deleted_count = cache_manager.invalidate_tags(tags)
         
-        logger.info(f"Invalidated {deleted_count} cache entries for pattern: {pattern}")
+        logger.info(f"Invalidated {deleted_count} cache entries for {event}")
         return deleted_count
         
     except Exception as e:
-        logger.warning(f"Failed to invalidate cache pattern {pattern}: {e}")
+        logger.warning(f"Failed to invalidate cache for {event}: {e}")
         return 0
 
 def warm_cache():
@@ -361,23 +907,20 @@ def warm_cache():
     
     try:
         from models.parking_lot import ParkingLot
-        from models.parking_spot import ParkingSpot
         
         # Cache parking lots
         lots = ParkingLot.query.all()
         lots_data = [lot.to_dict() for lot in lots]
-        cache_manager.set('lots:all', lots_data, CACHE_CONFIG['parking_lots']['timeout'])
+        cache_manager.set('lots:all', lots_data, CACHE_CONFIG['parking_lots']['timeout'],
+                          tags=generate_cache_tags('parking_lots'))
         
-        # Cache available spots for each lot
+        # Cache available spots for each lot (read from the maintained counters)
         for lot in lots:
-            available_spots = ParkingSpot.query.filter_by(
-                lot_id=lot.id, 
-                status='A'
-            ).count()
             cache_manager.set(
                 f'spots:lot_{lot.id}:available', 
-                available_spots, 
-                CACHE_CONFIG['available_spots']['timeout']
+                lot.get_available_spots_count(), 
+                CACHE_CONFIG['available_spots']['timeout'],
+                tags=generate_cache_tags('available_spots', lot_id=lot.id)
             )
         
         logger.info("✅ Cache warmed successfully")
@@ -0,0 +1,137 @@
+"""
+Circuit breaker for optional backing services (Redis cache)
+
+Tracks the health of a dependency from the outcome of real calls instead of
+probing it before every call:
+
+  closed     calls go through; consecutive failures open the circuit
+  open       calls are skipped until the backoff delay has passed
+  half_open  one trial call is let through; success closes the circuit,
+             failure re-opens it with a longer (exponential) backoff
+
+``is_open`` only reads the state and is what callers gate on; the trial is
+claimed by ``allow_request`` in the code path that makes the call, so it
+always reaches the service and reports back.
+
+An optional background probe re-checks the service while the circuit is open,
+so recovery is noticed without sacrificing a request to find out.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Thread-safe circuit breaker with exponential backoff"""
+
+    def __init__(self, name, failure_threshold=1, base_delay=1.0, max_delay=60.0,
+                 probe=None, probe_interval=5.0, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.probe = probe
+        self.probe_interval = probe_interval
+        self.clock = clock
+
+        self.state = CLOSED
+        self.failures = 0
+        self.consecutive_opens = 0
+        self.retry_at = 0.0
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._probe_thread = None
+        self._probe_pid = None
+
+    def is_open(self):
+        """True while calls are being skipped (read-only: never claims the trial call)"""
+        if self.state == CLOSED:
+            return False
+        if self.state == HALF_OPEN:
+            return True
+        return self.clock() < self.retry_at
+
+    def allow_request(self):
+        """True if a call may be attempted now (no network I/O).
+
+        Past the backoff this claims the single half-open trial, so only call
+        it right before actually calling the service; use ``is_open`` to gate.
+        """
+        if self.state == CLOSED:
+            return True
+        with self._lock:
+            if self.state == OPEN and self.clock() >= self.retry_at:
+                # Let exactly one caller try the service
+                self.state = HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        if self.state == CLOSED and not self.failures:
+            return
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info(f"Circuit '{self.name}' closed, service recovered")
+            self.state = CLOSED
+            self.failures = 0
+            self.consecutive_opens = 0
+            self.last_error = None
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error) if error else None
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self._open()
+        self._ensure_probe()
+
+    def _open(self):
+        delay = min(self.max_delay, self.base_delay * (2 ** self.consecutive_opens))
+        # Jitter keeps many workers from retrying in lockstep
+        delay *= random.uniform(0.8, 1.2)
+        self.consecutive_opens += 1
+        self.state = OPEN
+        self.retry_at = self.clock() + delay
+        logger.warning(f"Circuit '{self.name}' open for {delay:.1f}s: {self.last_error}")
+
+    def _ensure_probe(self):
+        """Start the background probe (again after a fork) while the circuit is open"""
+        if self.probe is None:
+            return
+        with self._lock:
+            alive = self._probe_thread is not None and self._probe_thread.is_alive()
+            if alive and self._probe_pid == os.getpid():
+                return
+            self._probe_pid = os.getpid()
+            self._probe_thread = threading.Thread(
+                target=self._probe_loop, name=f'{self.name}-health-probe', daemon=True
+            )
+            self._probe_thread.start()
+
+    def _probe_loop(self):
+        while self.state != CLOSED:
+            time.sleep(self.probe_interval)
+            try:
+                self.probe()
+            except Exception as e:
+                with self._lock:
+                    self.last_error = str(e)
+                continue
+            self.record_success()
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'failures': self.failures,
+            'retry_in': max(0.0, round(self.retry_at - self.clock(), 1)) if self.state == OPEN else 0,
+            'last_error': self.last_error
+        }
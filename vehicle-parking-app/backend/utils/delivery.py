@@ -0,0 +1,63 @@
+"""
+Background delivery queue for notification channels without batching
+
+Email goes through utils.mailer's Outbox, which batches messages over pooled
+SMTP sessions. SMS and Google Chat are one HTTP request per recipient, so a
+broadcast hands them to a ChannelQueue instead: a few threads per channel
+deliver while the caller keeps reading the next page of recipients, and a
+slow webhook no longer holds up the emails or the SMS.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class ChannelQueue:
+    """Calls ``send(item)`` for every added item on ``max_workers`` threads.
+
+    Use as a context manager; leaving the block waits for every delivery.
+    Adding blocks while ``2 * max_workers`` items are pending, so memory stays
+    bounded. ``failed`` maps the key of each failed item to its error.
+    """
+
+    def __init__(self, send, max_workers=4, name='delivery'):
+        self.send = send
+        self.max_workers = max_workers
+        self.name = name
+        self.sent = 0
+        self.failed = {}
+        self._lock = threading.Lock()
+        self._pending = threading.BoundedSemaphore(max_workers * 2)
+        self._executor = None
+
+    def __enter__(self):
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix=f'{self.name}-sender')
+        return self
+
+    def add(self, item, key=None):
+        self._pending.acquire()
+        try:
+            self._executor.submit(self._deliver, item, key if key is not None else item)
+        except Exception:
+            self._pending.release()
+            raise
+
+    def _deliver(self, item, key):
+        try:
+            self.send(item)
+            with self._lock:
+                self.sent += 1
+        except Exception as e:
+            with self._lock:
+                self.failed[key] = str(e)
+        finally:
+            self._pending.release()
+
+    def __exit__(self, exc_type, exc, tb):
+        self._executor.shutdown(wait=True)
+        for key, error in self.failed.items():
+            logger.warning("%s delivery to %s failed: %s", self.name, key, error)
@@ -0,0 +1,50 @@
+"""
+Serving generated export files
+
+Downloads go through send_file, so Range requests (resuming a large export)
+and If-None-Match/If-Modified-Since are answered by Werkzeug. Export files
+are never rewritten in place - each version is renamed into place as a new
+file - so the ETag is derived from the file's identity rather than its
+mtime, which cleanup-avoiding touches would otherwise change.
+"""
+
+import hashlib
+import os
+
+from flask import request, send_file
+
+
+def export_etag(file_path):
+    """Strong ETag for an export file: name, size and inode"""
+    stat = os.stat(file_path)
+    identity = f"{os.path.basename(file_path)}:{stat.st_size}:{stat.st_ino}"
+    return hashlib.sha1(identity.encode()).hexdigest()[:20]
+
+
+def send_export_file(file_path, filename):
+    """Send an export file, using its pre-compressed ``.gz`` sibling if the client accepts gzip"""
+    from tasks.export_csv import export_mimetype
+
+    served_path = file_path
+    gz_path = f"{file_path}.gz"
+    compressed = (
+        not filename.endswith('.gz')
+        and request.accept_encodings['gzip'] > 0
+        and os.path.exists(gz_path)
+    )
+    if compressed:
+        served_path = gz_path
+
+    response = send_file(
+        served_path,
+        as_attachment=True,
+        download_name=filename,
+        mimetype=export_mimetype(filename),
+        etag=export_etag(served_path),
+        conditional=True
+    )
+    if compressed:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    response.cache_control.private = True
+    return response
@@ -0,0 +1,89 @@
+"""
+In-process L1 cache in front of Redis
+
+A small LRU map with per-entry TTL and invalidation tags. It holds already
+decoded values, so a hit costs a dict lookup instead of a Redis round trip and
+a json.loads. Entries are only served while this process is subscribed to the
+cache invalidation channel (see CacheManager), so another gunicorn worker or a
+Celery task that invalidates a tag evicts it here too.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class LocalLRUCache:
+    """Thread-safe size-bounded LRU cache with TTL and tag invalidation"""
+
+    def __init__(self, max_entries=512, default_ttl=30, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (value, expires_at, tags)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Bumped by every invalidation, so a fill that raced one can be dropped
+        self.generation = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at, _ = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None, tags=(), generation=None):
+        """Store ``value``; skipped if an invalidation happened since ``generation``"""
+        ttl = min(ttl or self.default_ttl, self.default_ttl)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return False
+            self._entries[key] = (value, self.clock() + ttl, frozenset(tags))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self.generation += 1
+            self._entries.pop(key, None)
+
+    def invalidate_tags(self, tags):
+        """Drop every entry carrying any of ``tags``; returns how many"""
+        tags = set(tags)
+        with self._lock:
+            self.generation += 1
+            doomed = [key for key, (_, _, entry_tags) in self._entries.items() if entry_tags & tags]
+            for key in doomed:
+                del self._entries[key]
+            return len(doomed)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups * 100, 2) if lookups else 0
+            }
@@ -0,0 +1,287 @@
+"""
+SMTP transport shared by reminders, reports and exports
+
+Opening an SMTP connection (TCP handshake, EHLO, STARTTLS, AUTH) costs far
+more than sending one message over it, so messages go through a small pool of
+persistent connections instead of a new smtplib.SMTP per email:
+
+  SMTPConnectionPool  reuses live sessions, recycles them after a number of
+                      messages or when idle for too long, drops broken ones
+  MailTransport       send() for one-off emails; outbox() for broadcasts,
+                      which groups messages into batches sent over a single
+                      session by a bounded number of sender threads while the
+                      caller keeps building the next messages
+
+get_mail_transport() returns the per-process transport configured from Config.
+"""
+
+import logging
+import os
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def _is_connection_error(error):
+    """True if the session cannot be trusted for the next message.
+
+    SMTPException derives from OSError, so a refused recipient must not be
+    mistaken for a socket error.
+    """
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class SMTPConnectionPool:
+    """Thread-safe pool of logged-in SMTP sessions"""
+
+    def __init__(self, host, port, use_tls=False, username=None, password=None,
+                 max_size=4, max_messages_per_connection=500, idle_timeout=30.0,
+                 timeout=30.0, smtp_factory=smtplib.SMTP, clock=time.monotonic):
+        self.host = host
+        self.port = port
+        self.use_tls = use_tls
+        self.username = username
+        self.password = password
+        self.max_size = max_size
+        self.max_messages_per_connection = max_messages_per_connection
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.smtp_factory = smtp_factory
+        self.clock = clock
+
+        self._idle = []  # [connection, messages_sent, returned_at]
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+
+    def _connect(self):
+        server = self.smtp_factory(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls()
+            # Local catchers like MailHog don't offer AUTH even when credentials are set
+            server.ehlo_or_helo_if_needed()
+            if self.username and self.password and server.has_extn('auth'):
+                server.login(self.username, self.password)
+        except Exception:
+            self._close(server)
+            raise
+        self.connections_opened += 1
+        return server
+
+    @staticmethod
+    def _close(server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def acquire(self):
+        """Take a session out of the pool (blocks while ``max_size`` are in use).
+
+        Returns ``[connection, messages_sent]``; hand it back with release().
+        """
+        self._slots.acquire()
+        try:
+            while True:
+                with self._lock:
+                    entry = self._idle.pop() if self._idle else None
+                if entry is None:
+                    return [self._connect(), 0]
+                server, sent, returned_at = entry
+                if self.clock() - returned_at < self.idle_timeout:
+                    return [server, sent]
+                # Servers drop idle sessions; don't find out halfway through a send
+                self._close(server)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, entry, broken=False):
+        server, sent = entry
+        try:
+            if broken or sent >= self.max_messages_per_connection:
+                self._close(server)
+            else:
+                with self._lock:
+                    self._idle.append([server, sent, self.clock()])
+        finally:
+            self._slots.release()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server, _, _ in idle:
+            self._close(server)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'idle_connections': len(self._idle),
+                'max_size': self.max_size,
+                'connections_opened': self.connections_opened
+            }
+
+
+class MailTransport:
+    """Sends messages over an SMTPConnectionPool"""
+
+    def __init__(self, pool, max_workers=4, batch_size=50):
+        self.pool = pool
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+
+    def send(self, msg):
+        """Send one message; retried once on a fresh session if the pooled one died"""
+        self.send_batch([msg], raise_errors=True)
+
+    def send_batch(self, messages, raise_errors=False):
+        """Send ``messages`` over one session.
+
+        Returns a list of (index, error) for the messages that failed. A
+        dropped connection is replaced and the message retried once; other
+        SMTP errors (e.g. a rejected recipient) only fail that message.
+        """
+        failures = []
+        entry = self.pool.acquire()
+        try:
+            index = 0
+            retried = False
+            while index < len(messages):
+                try:
+                    entry[0].send_message(messages[index])
+                    entry[1] += 1
+                except OSError as e:
+                    if not _is_connection_error(e):
+                        # e.g. a refused recipient: the session is still fine
+                        if raise_errors:
+                            raise
+                        failures.append((index, e))
+                        index += 1
+                        retried = False
+                        continue
+                    self.pool.release(entry, broken=True)
+                    entry = None
+                    if retried:
+                        # A fresh session failed too: give up on this message
+                        if raise_errors:
+                            raise
+                        failures.append((index, e))
+                        index += 1
+                    retried = not retried
+                    if index >= len(messages):
+                        break
+                    try:
+                        entry = self.pool.acquire()
+                    except Exception as connect_error:
+                        if raise_errors:
+                            raise
+                        failures.extend((i, connect_error) for i in range(index, len(messages)))
+                        return failures
+                    continue
+                index += 1
+                retried = False
+        finally:
+            if entry is not None:
+                self.pool.release(entry)
+        return failures
+
+    def outbox(self):
+        return Outbox(self)
+
+
+class Outbox:
+    """Collects messages and sends them in batches on background threads.
+
+    Use as a context manager; leaving the block waits for every batch. Adding
+    blocks while ``2 * max_workers`` batches are in flight, so memory stays
+    bounded when messages are produced faster than they can be sent.
+    """
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.sent = 0
+        self.failed = {}  # key -> error message
+        self._batch = []
+        self._futures = set()
+        self._lock = threading.Lock()
+        self._in_flight = threading.BoundedSemaphore(transport.max_workers * 2)
+        self._executor = None
+
+    def __enter__(self):
+        self._executor = ThreadPoolExecutor(max_workers=self.transport.max_workers,
+                                            thread_name_prefix='smtp-sender')
+        return self
+
+    def add(self, msg, key=None):
+        """Queue ``msg``; ``key`` (default the recipient) identifies it in ``failed``"""
+        self._batch.append((key if key is not None else msg['To'], msg))
+        if len(self._batch) >= self.transport.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+        self._in_flight.acquire()
+        future = self._executor.submit(self._send, batch)
+        self._futures.add(future)
+        future.add_done_callback(self._futures.discard)
+
+    def _send(self, batch):
+        try:
+            try:
+                failures = self.transport.send_batch([msg for _, msg in batch])
+            except Exception as e:
+                # Could not even get a session: the whole batch failed
+                failures = [(index, e) for index in range(len(batch))]
+            with self._lock:
+                self.sent += len(batch) - len(failures)
+                for index, error in failures:
+                    self.failed[batch[index][0]] = str(error)
+        finally:
+            self._in_flight.release()
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.flush()
+            wait(list(self._futures))
+        finally:
+            self._executor.shutdown(wait=True)
+        for key, error in self.failed.items():
+            logger.warning("Email to %s failed: %s", key, error)
+
+
+_transport = None
+_transport_pid = None
+_transport_lock = threading.Lock()
+
+
+def get_mail_transport():
+    """Per-process MailTransport built from Config (rebuilt after a fork)"""
+    global _transport, _transport_pid
+    with _transport_lock:
+        if _transport is None or _transport_pid != os.getpid():
+            pool = SMTPConnectionPool(
+                Config.MAIL_SERVER,
+                Config.MAIL_PORT,
+                use_tls=Config.MAIL_USE_TLS,
+                username=Config.MAIL_USERNAME,
+                password=Config.MAIL_PASSWORD,
+                max_size=Config.MAIL_POOL_SIZE
+            )
+            _transport = MailTransport(pool, max_workers=Config.MAIL_POOL_SIZE,
+                                       batch_size=Config.MAIL_BATCH_SIZE)
+            _transport_pid = os.getpid()
+        return _transport
@@ -0,0 +1,151 @@
+"""
+Occupied spots board
+Lists every occupied spot with its active reservation, the driver and the lot
+from one joined SELECT (spot ⨝ active reservation ⨝ user ⨝ lot) instead of
+three lookups per spot. Parking duration and the overstay flag are computed in
+SQL, and pages are read with a keyset cursor, so a page costs the same number
+of round trips wherever it is in the list:
+
+  1. one page of rows, longest parked first, after the cursor
+  2. board totals (occupied spots, overstays)
+"""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import and_, case, func, literal, or_
+
+from database import db
+
+OVERSTAY_HOURS = 24   # flag vehicles parked longer than this
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def _hours_between(start, end):
+    """SQL expression for the hours from ``start`` to ``end``"""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return func.extract('epoch', end - start) / 3600.0
+    return (func.julianday(end) - func.julianday(start)) * 24.0
+
+
+def encode_cursor(parking_timestamp, reservation_id):
+    return f"{parking_timestamp.isoformat()}~{reservation_id}"
+
+
+def decode_cursor(cursor):
+    """(parking_timestamp, reservation_id) of a cursor; ValueError if malformed"""
+    timestamp, _, reservation_id = cursor.rpartition('~')
+    return datetime.fromisoformat(timestamp), int(reservation_id)
+
+
+def _board_query(columns, now, lot_id=None):
+    from models.parking_spot import ParkingSpot
+    from models.parking_lot import ParkingLot
+    from models.reservation import Reservation
+    from models.user import User
+
+    query = db.session.query(*columns).select_from(ParkingSpot).join(
+        Reservation, and_(
+            Reservation.spot_id == ParkingSpot.id,
+            Reservation.leaving_timestamp.is_(None),
+            Reservation.status == 'active'
+        )
+    ).join(
+        User, Reservation.user_id == User.id
+    ).join(
+        ParkingLot, ParkingSpot.lot_id == ParkingLot.id
+    ).filter(ParkingSpot.status == 'O')
+    if lot_id is not None:
+        query = query.filter(ParkingSpot.lot_id == lot_id)
+    return query
+
+
+def _estimated_cost(hours, price):
+    """Same rule as Reservation.calculate_cost: at least one billable hour"""
+    billable_hours = max(1, hours)
+    return round(Decimal(str(billable_hours)) * Decimal(str(price or 0)), 2)
+
+
+def occupied_spots_page(after=None, limit=DEFAULT_PAGE_SIZE, lot_id=None, now=None):
+    """One page of the board plus its totals.
+
+    ``after`` is the ``next_cursor`` of the previous page (None for the first
+    page). Returns a dict with occupied_spots, total_occupied,
+    long_term_parked and next_cursor (None on the last page).
+    """
+    from models.parking_spot import ParkingSpot
+    from models.parking_lot import ParkingLot
+    from models.reservation import Reservation
+    from models.user import User
+
+    now = now or datetime.utcnow()
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    overstay_cutoff = now - timedelta(hours=OVERSTAY_HOURS)
+    overstay = Reservation.parking_timestamp < overstay_cutoff
+    duration = _hours_between(Reservation.parking_timestamp, literal(now, db.DateTime))
+
+    # Statement 1: the page, longest parked first
+    query = _board_query([
+        ParkingSpot.id.label('spot_id'),
+        ParkingSpot.spot_number,
+        ParkingLot.prime_location_name,
+        ParkingLot.address,
+        ParkingLot.price,
+        Reservation.id.label('reservation_id'),
+        Reservation.vehicle_number,
+        Reservation.parking_timestamp,
+        Reservation.status,
+        User.id.label('user_id'),
+        User.full_name,
+        User.phone_number,
+        User.email,
+        duration.label('duration_hours'),
+        case((overstay, True), else_=False).label('overstay_alert')
+    ], now, lot_id)
+    if after is not None:
+        after_timestamp, after_id = after
+        query = query.filter(or_(
+            Reservation.parking_timestamp > after_timestamp,
+            and_(Reservation.parking_timestamp == after_timestamp, Reservation.id > after_id)
+        ))
+    rows = query.order_by(Reservation.parking_timestamp, Reservation.id).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # Statement 2: totals of the whole board
+    total_occupied, long_term_parked = _board_query([
+        func.count(Reservation.id),
+        func.coalesce(func.sum(case((overstay, 1), else_=0)), 0)
+    ], now, lot_id).one()
+
+    occupied_spots = []
+    for row in rows:
+        hours = round(float(row.duration_hours), 2)
+        occupied_spots.append({
+            'spot_id': row.spot_id,
+            'spot_number': row.spot_number,
+            'lot_name': row.prime_location_name,
+            'lot_location': row.address,
+            'vehicle_number': row.vehicle_number,
+            'reservation_id': row.reservation_id,
+            'user_details': {
+                'id': row.user_id,
+                'full_name': row.full_name,
+                'phone_number': row.phone_number,
+                'email': row.email
+            },
+            'parking_since': row.parking_timestamp.isoformat(),
+            'duration_hours': hours,
+            'estimated_cost': float(_estimated_cost(hours, row.price)),
+            'hourly_rate': float(row.price or 0),
+            'status': row.status,
+            'overstay_alert': bool(row.overstay_alert)
+        })
+
+    return {
+        'occupied_spots': occupied_spots,
+        'total_occupied': total_occupied,
+        'long_term_parked': int(long_term_parked),
+        'next_cursor': encode_cursor(rows[-1].parking_timestamp, rows[-1].reservation_id) if has_more else None
+    }
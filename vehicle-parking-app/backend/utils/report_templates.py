@@ -0,0 +1,59 @@
+"""
+Jinja2 environment for the HTML reports sent by background tasks
+
+Reports are rendered outside any request, often thousands per Celery run, so
+they use their own environment rather than Flask's render_template:
+
+  - one Environment per process with auto_reload off, so each template is
+    compiled once and later renders never stat the file again
+  - a FileSystemBytecodeCache, so a freshly started worker loads the
+    compiled template instead of re-parsing it
+  - autoescaping, since usernames and lot names are user-supplied
+
+Templates live in backend/templates/reports/.
+"""
+
+import os
+import threading
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+
+from config import Config
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates', 'reports')
+
+_environment = None
+_environment_lock = threading.Lock()
+
+
+def create_report_environment(bytecode_cache_dir=None):
+    """Environment loading templates/reports with a filesystem bytecode cache.
+
+    ``bytecode_cache_dir`` defaults to Config.TEMPLATE_BYTECODE_CACHE_DIR, or
+    a per-user directory under the system temp dir when that is unset.
+    """
+    cache_dir = bytecode_cache_dir or Config.TEMPLATE_BYTECODE_CACHE_DIR
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+    return Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
+        bytecode_cache=FileSystemBytecodeCache(cache_dir) if cache_dir else FileSystemBytecodeCache(),
+        autoescape=select_autoescape(['html']),
+        auto_reload=False,
+        cache_size=50
+    )
+
+
+def get_report_environment():
+    """Per-process report Environment"""
+    global _environment
+    if _environment is None:
+        with _environment_lock:
+            if _environment is None:
+                _environment = create_report_environment()
+    return _environment
+
+
+def get_report_template(name):
+    """Compiled template ``name`` (cached by the environment after the first call)"""
+    return get_report_environment().get_template(name)
@@ -0,0 +1,100 @@
+"""
+Parking spot and reservation status counts
+The admin dashboard, analytics, public stats, spot status listing and the
+admin daily summary all show the same breakdown. It is read here with one
+GROUP BY per table instead of a count() per status:
+
+  1. parking_spots GROUP BY status, is_active   (get_spot_status_counts)
+  2. reservations GROUP BY status, with the     (get_reservation_status_counts)
+     completed revenue
+
+Each table's counts are memoized on the current request and cached briefly
+under their own CACHE_CONFIG entry, whose lot, spot and reservation events
+drop them before they expire, so a caller only pays for the table it reads.
+"""
+
+from flask import has_request_context, request
+from sqlalchemy import case, func
+
+from database import db
+
+SPOT_STATUSES = ('A', 'O', 'R')
+RESERVATION_STATUSES = ('active', 'completed', 'cancelled')
+
+SPOT_STATUS_COUNTS_KEY = 'spot_status_counts'
+RESERVATION_STATUS_COUNTS_KEY = 'reservation_status_counts'
+
+
+def _breakdown(statuses):
+    return dict({status: 0 for status in statuses}, total=0)
+
+
+def compute_spot_status_counts():
+    """Statement 1: spots per (status, is_active)"""
+    from models.parking_spot import ParkingSpot
+
+    spots, active_spots = _breakdown(SPOT_STATUSES), _breakdown(SPOT_STATUSES)
+    rows = db.session.query(
+        ParkingSpot.status, ParkingSpot.is_active, func.count(ParkingSpot.id)
+    ).group_by(ParkingSpot.status, ParkingSpot.is_active).all()
+    for status, is_active, count in rows:
+        for breakdown in (spots, active_spots) if is_active else (spots,):
+            breakdown[status] = breakdown.get(status, 0) + count
+            breakdown['total'] += count
+    return {'spots': spots, 'active_spots': active_spots}
+
+
+def compute_reservation_status_counts():
+    """Statement 2: reservations per status and the revenue of completed ones"""
+    from models.reservation import Reservation
+
+    reservations = _breakdown(RESERVATION_STATUSES)
+    revenue = 0.0
+    rows = db.session.query(
+        Reservation.status,
+        func.count(Reservation.id),
+        func.sum(case((Reservation.status == 'completed', Reservation.parking_cost)))
+    ).group_by(Reservation.status).all()
+    for status, count, status_revenue in rows:
+        reservations[status] = count
+        reservations['total'] += count
+        revenue += float(status_revenue or 0)
+    return {'reservations': reservations, 'completed_revenue': round(revenue, 2)}
+
+
+def _shared_counts(key, compute):
+    """``compute()``, memoized on the request and cached under ``key``"""
+    memoize = has_request_context()
+    if memoize and hasattr(request, key):
+        return getattr(request, key)
+
+    from utils.cache_enhanced import CACHE_CONFIG, cache_manager, generate_cache_tags
+
+    counts = cache_manager.get(key)
+    if not isinstance(counts, dict):
+        counts = compute()
+        cache_manager.set(key, counts, timeout=CACHE_CONFIG[key]['timeout'],
+                          tags=generate_cache_tags(key))
+
+    if memoize:
+        setattr(request, key, counts)
+    return counts
+
+
+def get_spot_status_counts():
+    """Spot status counts, at most a few seconds old.
+
+    Returns a dict with
+      spots / active_spots  {'A', 'O', 'R', 'total'} over all / active spots
+    """
+    return _shared_counts(SPOT_STATUS_COUNTS_KEY, compute_spot_status_counts)
+
+
+def get_reservation_status_counts():
+    """Reservation status counts, at most a few seconds old.
+
+    Returns a dict with
+      reservations          {'active', 'completed', 'cancelled', 'total'}
+      completed_revenue     sum of parking_cost of completed reservations
+    """
+    return _shared_counts(RESERVATION_STATUS_COUNTS_KEY, compute_reservation_status_counts)
@@ -0,0 +1,200 @@
+"""
+User dashboard aggregation
+Computes every figure on the user dashboard with grouped SQL instead of
+per-status, per-month and per-reservation queries, so the cost of building the
+dashboard does not grow with the size of the user's history.
+
+Statements issued per dashboard:
+  1. reservations GROUP BY lot, status     -> totals, status split, lot usage
+  2. one row of conditional aggregates     -> 6 monthly + 4 weekly buckets
+  3. active reservation lookup
+  4. 5 most recent reservations (spot and lot joined in)
+"""
+
+from datetime import datetime, timedelta
+from sqlalchemy import and_, case, func
+
+from database import db
+
+MONTHS_SHOWN = 6
+WEEKS_SHOWN = 4
+
+
+def _month_start(moment, months_back=0):
+    """First instant of the calendar month ``months_back`` months before ``moment``"""
+    month_index = moment.year * 12 + (moment.month - 1) - months_back
+    return datetime(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _lot_label(lot_id, lot_name):
+    return lot_name or f"Lot {lot_id}"
+
+
+def _lot_status_breakdown(user_id):
+    """Statement 1: reservation count and completed spend per (lot, status)"""
+    from models.reservation import Reservation
+    from models.parking_spot import ParkingSpot
+    from models.parking_lot import ParkingLot
+
+    completed_cost = case((Reservation.status == 'completed', Reservation.parking_cost))
+
+    return db.session.query(
+        ParkingLot.id,
+        ParkingLot.prime_location_name,
+        Reservation.status,
+        func.count(Reservation.id),
+        func.sum(completed_cost)
+    ).select_from(Reservation).outerjoin(
+        ParkingSpot, Reservation.spot_id == ParkingSpot.id
+    ).outerjoin(
+        ParkingLot, ParkingSpot.lot_id == ParkingLot.id
+    ).filter(
+        Reservation.user_id == user_id
+    ).group_by(
+        ParkingLot.id, ParkingLot.prime_location_name, Reservation.status
+    ).all()
+
+
+def _time_buckets(now):
+    """(label, start, end) windows for the monthly and weekly charts"""
+    months = []
+    for i in range(MONTHS_SHOWN):
+        start = _month_start(now, i)
+        end = _month_start(now, i - 1)
+        months.append((start.strftime('%B %Y'), start, end))
+
+    weeks = []
+    for i in range(WEEKS_SHOWN):
+        start = now - timedelta(days=7 * (i + 1))
+        end = now - timedelta(days=7 * i)
+        weeks.append((f"Week {WEEKS_SHOWN - i}", start, end))
+
+    return months, weeks
+
+
+def _bucket_totals(user_id, buckets):
+    """Statement 2: reservation count and completed spend for every window at once"""
+    from models.reservation import Reservation
+
+    columns = []
+    for _, start, end in buckets:
+        in_window = and_(Reservation.created_at >= start, Reservation.created_at < end)
+        columns.append(func.count(case((in_window, Reservation.id))))
+        columns.append(func.sum(case(
+            (and_(in_window, Reservation.status == 'completed'), Reservation.parking_cost)
+        )))
+
+    earliest = min(start for _, start, _ in buckets)
+    row = db.session.query(*columns).filter(
+        Reservation.user_id == user_id,
+        Reservation.created_at >= earliest
+    ).one()
+
+    return [
+        (row[2 * i] or 0, float(row[2 * i + 1] or 0))
+        for i in range(len(buckets))
+    ]
+
+
+def build_user_dashboard(user_id, now=None):
+    """Return the /api/user/dashboard payload for ``user_id``"""
+    from models.reservation import Reservation
+
+    now = now or datetime.now()
+
+    # Totals, status distribution and per-lot usage from one GROUP BY
+    total_reservations = 0
+    completed_reservations = 0
+    total_spent = 0.0
+    status_counts = {}
+    lot_stats = {}
+
+    for lot_id, lot_name, status, count, spent in _lot_status_breakdown(user_id):
+        spent = float(spent or 0)
+        total_reservations += count
+        status_counts[status] = status_counts.get(status, 0) + count
+        if status == 'completed':
+            completed_reservations += count
+            total_spent += spent
+
+        if lot_id is None:
+            continue
+        label = _lot_label(lot_id, lot_name)
+        stats = lot_stats.setdefault(label, {'reservations': 0, 'total_spent': 0.0})
+        stats['reservations'] += count
+        stats['total_spent'] += spent
+
+    ranked_lots = sorted(lot_stats.items(), key=lambda x: x[1]['reservations'], reverse=True)
+    most_used_lot = ranked_lots[0] if ranked_lots else None
+
+    # Monthly and weekly charts from one row of conditional aggregates
+    months, weeks = _time_buckets(now)
+    totals = _bucket_totals(user_id, months + weeks)
+    month_totals, week_totals = totals[:len(months)], totals[len(months):]
+
+    monthly_stats = [
+        {'month': label, 'reservations': count, 'amount_spent': spent}
+        for (label, _, _), (count, spent) in zip(months, month_totals)
+    ]
+    weekly_stats = [
+        {
+            'week': label,
+            'week_start': start.strftime('%Y-%m-%d'),
+            'reservations': count,
+            'amount_spent': spent
+        }
+        for (label, start, _), (count, spent) in zip(weeks, week_totals)
+    ]
+
+    active_reservation = Reservation.query.filter_by(
+        user_id=user_id,
+        status='active'
+    ).first()
+
+    recent_reservations = Reservation.query_with_spot_and_lot().filter_by(
+        user_id=user_id
+    ).order_by(Reservation.created_at.desc()).limit(5).all()
+
+    recent_activity = []
+    for reservation in recent_reservations:
+        spot = reservation.parking_spot
+        lot = spot.parking_lot if spot else None
+        recent_activity.append({
+            'id': reservation.id,
+            'spot_number': spot.spot_number if spot else reservation.spot_id,
+            'lot_name': _lot_label(lot.id, lot.prime_location_name) if lot else "Unknown Lot",
+            'status': reservation.status,
+            'start_time': reservation.parking_timestamp.isoformat() if reservation.parking_timestamp else None,
+            'end_time': reservation.leaving_timestamp.isoformat() if reservation.leaving_timestamp else None,
+            'parking_cost': float(reservation.parking_cost) if reservation.parking_cost else 0,
+            'created_at': reservation.created_at.isoformat() if reservation.created_at else None
+        })
+
+    return {
+        'active_reservation': active_reservation.to_dict() if active_reservation else None,
+        'statistics': {
+            'total_reservations': total_reservations,
+            'completed_reservations': completed_reservations,
+            'total_spent': float(total_spent)
+        },
+        'recent_reservations': [r.to_dict() for r in recent_reservations],
+        'monthly_stats': monthly_stats,
+        'weekly_stats': weekly_stats,
+        'status_distribution': [
+            {'status': status, 'count': count}
+            for status, count in status_counts.items()
+        ],
+        'lot_usage_stats': [
+            {
+                'lot_name': lot_name,
+                'reservations': stats['reservations'],
+                'total_spent': float(stats['total_spent'])
+            }
+            for lot_name, stats in ranked_lots[:5]
+        ],
+        'most_used_lot': {
+            'name': most_used_lot[0] if most_used_lot else None,
+            'usage_count': most_used_lot[1]['reservations'] if most_used_lot else 0
+        },
+        'recent_activity': recent_activity
+    }